@@ -247,6 +247,11 @@ RQ_QUEUES = {
     },
 }
 
+# Avanza las etapas de los synchronizers apenas terminan sus trabajos
+RQ = {
+    'WORKER_CLASS': 'django_datajsonar.worker.SynchronizerWorker',
+}
+
 DISTRIBUTION_INDEX_JOB_TIMEOUT = 100
 
 CATALOG_BLACKLIST = [
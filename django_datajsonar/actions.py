@@ -1,27 +1,55 @@
 #! coding: utf-8
+from collections import Counter, defaultdict
+from itertools import islice
+
 import six
 import unicodecsv
-import yaml
 
 from django_datajsonar.models import Catalog, Dataset
 from .strings import DATASET_STATUS, CATALOG_STATUS
+from .utils.utils import load_yaml
 
 CATALOG_HEADER = u'catalog_id'
 DATASET_ID_HEADER = u'dataset_identifier'
 
+# Máxima cantidad de parámetros de un IN, dentro del límite de SQLite
+FEDERATION_BATCH_SIZE = 900
+
 
 class DatasetIndexableToggler:
+    """Marca como federables los datasets de un archivo de federación. El
+    CSV se lee de a lotes de FEDERATION_BATCH_SIZE filas, y cada lote se
+    aplica con una consulta por catálogo para encontrar los datasets
+    existentes y otra para marcarlos
+    """
 
     def __init__(self):
         self.logs = []
-        self.catalogs = {}
-
-    def process(self, federation_file):
-        self.read_dataset_csv(federation_file)
-        self.update_database()
+        # Filas leídas, datasets marcados y filas con error
+        self.counts = Counter()
+        # Id de cada catálogo ya visto, o None si no existe
+        self.catalog_ids = {}
+        self.missing_catalogs = set()
+        # Pares (catálogo, dataset) ya marcados, para no contarlos dos veces
+        self.federated = set()
+
+    def process(self, federation_file, on_progress=None):
+        """Procesa el archivo y devuelve las líneas de log, una por fila.
+        Si se pasa on_progress, se llama con los contadores al terminar
+        cada lote
+        """
+        rows = self.read_dataset_csv(federation_file)
+        batch = list(islice(rows, FEDERATION_BATCH_SIZE))
+        while batch:
+            self.update_database(batch)
+            if on_progress is not None:
+                on_progress(self.counts)
+            batch = list(islice(rows, FEDERATION_BATCH_SIZE))
         return self.logs
 
-    def read_dataset_csv(self, federation_file):
+    @staticmethod
+    def read_dataset_csv(federation_file):
+        """Genera las filas del CSV como tuplas (catálogo, dataset)"""
         reader = unicodecsv.reader(federation_file)
 
         headers = six.next(reader)
@@ -30,35 +58,50 @@ class DatasetIndexableToggler:
 
         catalog_idx = headers.index(CATALOG_HEADER)
         dataset_id_idx = headers.index(DATASET_ID_HEADER)
-
-        # Struct con catalog identifiers como keys y listas de datasets como values
         for line in reader:
-            catalog = line[catalog_idx]
-            dataset_id = line[dataset_id_idx]
-            if catalog not in self.catalogs:  # Inicializo
-                self.catalogs[catalog] = []
-
-            self.catalogs[catalog].append(dataset_id)
-
-    def update_database(self):
-        for catalog, datasets in self.catalogs.items():
-            status = 'OK'
-            try:
-                dataset_models = Catalog.objects.get(identifier=catalog).dataset_set
-            except Catalog.DoesNotExist:
-                status = 'ERROR'
-                self.logs.append(CATALOG_STATUS.format(catalog, status))
+            yield line[catalog_idx], line[dataset_id_idx]
+
+    def update_database(self, rows):
+        """Marca como federables los datasets de las filas pasadas, y
+        agrega al log el estado de cada una en el orden del archivo
+        """
+        self._resolve_catalogs({catalog for catalog, _ in rows})
+        datasets_by_catalog = defaultdict(set)
+        for catalog, dataset in rows:
+            datasets_by_catalog[catalog].add(dataset)
+
+        existing = defaultdict(set)
+        for catalog, datasets in datasets_by_catalog.items():
+            if self.catalog_ids[catalog] is None:
                 continue
+            dataset_models = Dataset.objects.filter(catalog=self.catalog_ids[catalog],
+                                                    identifier__in=list(datasets))
+            existing[catalog].update(dataset_models.values_list('identifier', flat=True))
+            dataset_models.update(indexable=True)
+            federated = {(catalog, dataset) for dataset in existing[catalog]} - self.federated
+            self.federated.update(federated)
+            self.counts['federated'] += len(federated)
+
+        for catalog, dataset in rows:
+            self.counts['rows'] += 1
+            if self.catalog_ids[catalog] is None:
+                self.counts['errors'] += 1
+                if catalog not in self.missing_catalogs:
+                    self.missing_catalogs.add(catalog)
+                    self.logs.append(CATALOG_STATUS.format(catalog, 'ERROR'))
+                continue
+            status = 'OK' if dataset in existing[catalog] else 'ERROR'
+            if status == 'ERROR':
+                self.counts['errors'] += 1
+            self.logs.append(DATASET_STATUS.format(catalog, dataset, status))
 
-            for dataset in datasets:
-                try:
-                    dataset_model = dataset_models.get(identifier=dataset)
-                    dataset_model.indexable = True
-                    dataset_model.save()
-                except Dataset.DoesNotExist:
-                    status = 'ERROR'
-
-                self.logs.append(DATASET_STATUS.format(catalog, dataset, status))
+    def _resolve_catalogs(self, catalogs):
+        new_catalogs = [catalog for catalog in catalogs if catalog not in self.catalog_ids]
+        if not new_catalogs:
+            return
+        found = dict(Catalog.objects.filter(identifier__in=new_catalogs).values_list('identifier', 'id'))
+        for catalog in new_catalogs:
+            self.catalog_ids[catalog] = found.get(catalog)
 
 
 def process_node_register_file_action(register_file):
@@ -74,7 +117,7 @@ def confirm_delete(node, register_files):
     for register_file in register_files:
         indexing_file = register_file.indexing_file
         yml = indexing_file.read()
-        nodes = yaml.load(yml)
+        nodes = load_yaml(yml)
         if node.catalog_id in nodes and nodes[node.catalog_id].get('federado'):
             found = True
             break
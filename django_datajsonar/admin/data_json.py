@@ -5,6 +5,7 @@ from django import forms
 from django.conf.urls import url
 from django.contrib import admin
 from django.contrib.contenttypes.admin import GenericTabularInline
+from django.db.models import Q
 from django.utils import timezone
 from django.utils.html import format_html
 
@@ -38,11 +39,30 @@ class EnhancedMetaAdmin(GenericTabularInline):
         return False
 
 
+class IdentifierSearchMixin:
+    """Búsqueda por igualdad exacta de identificadores, resuelta en la base
+    con los índices de las columnas. search_fields queda solo para mostrar
+    la caja de búsqueda
+    """
+
+    # Campo comparado con el término buscado
+    identifier_lookup = 'identifier'
+
+    def get_search_results(self, _, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return queryset.filter(self.identifier_filter(search_term)), False
+
+    def identifier_filter(self, search_term):
+        return Q(**{self.identifier_lookup: search_term})
+
+
 @admin.register(Catalog)
-class CatalogAdmin(admin.ModelAdmin):
+class CatalogAdmin(IdentifierSearchMixin, admin.ModelAdmin):
     list_display = ('title', 'identifier', 'present', 'updated')
-    search_fields = ('identifier', 'present', 'updated')
-    readonly_fields = ('identifier',)
+    search_fields = ('identifier', )
+    readonly_fields = ('identifier', 'source_hash')
     list_filter = ('present', 'updated')
     list_select_related = True
 
@@ -50,30 +70,18 @@ class CatalogAdmin(admin.ModelAdmin):
         EnhancedMetaAdmin,
     )
 
-    def get_search_results(self, request, queryset, search_term):
-        queryset, distinct = \
-            super(CatalogAdmin, self).get_search_results(request, queryset, search_term)
-        if not search_term:
-            return queryset, distinct
-
-        ids_to_remove = []
-        for obj in queryset:
-            if search_term not in (obj.identifier,):
-                ids_to_remove.append(obj.id)
-
-        return queryset.exclude(id__in=ids_to_remove), distinct
-
 
 @admin.register(Dataset)
-class DatasetAdmin(admin.ModelAdmin):
+class DatasetAdmin(IdentifierSearchMixin, admin.ModelAdmin):
     list_display = ('title', 'identifier', 'catalogo', 'landing', 'starred', 'present', 'updated', 'indexable', 'reviewed', 'last_reviewed')
-    search_fields = ['identifier', 'catalog__identifier', 'present', 'updated', 'indexable']
-    readonly_fields = ('identifier', 'catalog', 'reviewed', 'last_reviewed', 'time_created')
+    search_fields = ('identifier', )
+    readonly_fields = ('identifier', 'catalog', 'reviewed', 'last_reviewed', 'time_created', 'source_hash',
+                       'checkpoint_task')
     actions = ['make_indexable', 'make_unindexable', 'generate_config_file',
                'mark_as_reviewed', 'mark_on_revision', 'mark_as_not_reviewed',
                'make_starred', 'make_not_starred']
 
-    list_filter = ('catalog__identifier', 'starred', 'present', 'indexable', 'reviewed')
+    list_filter = ('catalog__identifier', 'starred', 'present', 'indexable', 'reviewed', 'license')
     list_select_related = True
 
     class Media:
@@ -132,25 +140,12 @@ class DatasetAdmin(admin.ModelAdmin):
         extra_urls = [url(r'^federacion-config\.csv/$', config_csv, name='config_csv'), ]
         return extra_urls + urls
 
-    def get_search_results(self, request, queryset, search_term):
-        queryset, distinct = \
-            super(DatasetAdmin, self).get_search_results(request, queryset, search_term)
-        if not search_term:
-            return queryset, distinct
-
-        ids_to_remove = []
-        for obj in queryset:
-            if search_term not in (obj.identifier,):
-                ids_to_remove.append(obj.id)
-
-        return queryset.exclude(id__in=ids_to_remove), distinct
-
 
 @admin.register(Distribution)
-class DistributionAdmin(admin.ModelAdmin):
+class DistributionAdmin(IdentifierSearchMixin, admin.ModelAdmin):
     list_display = ('identifier', 'title', 'get_dataset_title', 'get_catalog_id', 'last_updated', 'present', 'updated')
-    search_fields = ('identifier', 'dataset__identifier', 'dataset__catalog__identifier')
-    list_filter = ('dataset__catalog__identifier', )
+    search_fields = ('identifier', 'dataset__identifier')
+    list_filter = ('dataset__catalog__identifier', 'format')
 
     inlines = (
         EnhancedMetaAdmin,
@@ -169,27 +164,16 @@ class DistributionAdmin(admin.ModelAdmin):
     get_catalog_id.short_description = 'Catalog'
     get_catalog_id.admin_order_field = 'dataset__catalog__identifier'
 
-    def get_search_results(self, request, queryset, search_term):
-        queryset, distinct = \
-            super(DistributionAdmin, self).get_search_results(request, queryset, search_term)
-        if not search_term:
-            return queryset, distinct
-
-        ids_to_remove = []
-        for obj in queryset:
-            if search_term not in (obj.identifier, obj.dataset.identifier):
-                ids_to_remove.append(obj.id)
-
-        return queryset.exclude(id__in=ids_to_remove), distinct
+    def identifier_filter(self, search_term):
+        return distributions_by_identifier(search_term)
 
 
 @admin.register(Field)
-class FieldAdmin(admin.ModelAdmin):
+class FieldAdmin(IdentifierSearchMixin, admin.ModelAdmin):
     list_display = ('get_title', 'identifier', 'get_distribution_title', 'get_dataset_title', 'get_catalog_id')
     search_fields = (
         'distribution__identifier',
         'distribution__dataset__identifier',
-        'distribution__dataset__catalog__identifier'
     )
     list_filter = (
         'distribution__dataset__catalog__identifier',
@@ -221,16 +205,16 @@ class FieldAdmin(admin.ModelAdmin):
         return obj.title or 'No title'
     get_title.short_description = 'Title'
 
-    def get_search_results(self, request, queryset, search_term):
-        queryset, distinct = \
-            super(FieldAdmin, self).get_search_results(request, queryset, search_term)
-        if not search_term:
-            return queryset, distinct
+    def identifier_filter(self, search_term):
+        distribution_ids = Distribution.objects.filter(
+            distributions_by_identifier(search_term)).values_list('pk', flat=True)
+        return Q(distribution__in=list(distribution_ids))
 
-        ids_to_remove = []
-        for obj in queryset:
-            if search_term not in (obj.distribution.identifier,
-                                   obj.distribution.dataset.identifier):
-                ids_to_remove.append(obj.id)
 
-        return queryset.exclude(id__in=ids_to_remove), distinct
+def distributions_by_identifier(search_term):
+    """Distribuciones con el identificador buscado o de un dataset con ese
+    identificador. Los datasets se resuelven antes, para que la consulta
+    use los índices de 'identifier' y 'dataset' sin joins
+    """
+    dataset_ids = Dataset.objects.filter(identifier=search_term).values_list('pk', flat=True)
+    return Q(identifier=search_term) | Q(dataset__in=list(dataset_ids))
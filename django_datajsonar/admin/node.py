@@ -7,6 +7,7 @@ from django_datajsonar.actions import process_node_register_file_action
 from django_datajsonar.models import NodeMetadata, DatasetIndexingFile, NodeRegisterFile, Node
 
 from django_datajsonar.tasks import bulk_whitelist
+from django_datajsonar.utils.nodes_cache import invalidate_nodes_exports
 
 
 class BaseRegisterFileAdmin(admin.ModelAdmin):
@@ -26,6 +27,9 @@ class BaseRegisterFileAdmin(admin.ModelAdmin):
 
 @admin.register(NodeRegisterFile)
 class NodeRegisterFileAdmin(BaseRegisterFileAdmin):
+    list_display = BaseRegisterFileAdmin.list_display + ('created_nodes', 'skipped_nodes', 'failed_nodes')
+    readonly_fields = BaseRegisterFileAdmin.readonly_fields + ('created_nodes', 'skipped_nodes',
+                                                               'failed_nodes')
 
     def process_register_file(self, _, queryset):
         for model in queryset:
@@ -37,10 +41,16 @@ class NodeRegisterFileAdmin(BaseRegisterFileAdmin):
 
 @admin.register(DatasetIndexingFile)
 class DatasetIndexingFileAdmin(BaseRegisterFileAdmin):
+    list_display = BaseRegisterFileAdmin.list_display + ('processed_rows', 'federated_datasets',
+                                                         'failed_rows')
+    readonly_fields = BaseRegisterFileAdmin.readonly_fields + ('processed_rows', 'federated_datasets',
+                                                               'failed_rows')
+
     def process_register_file(self, _, queryset):
         for model in queryset:
             model.state = DatasetIndexingFile.state = DatasetIndexingFile.PROCESSING
             model.logs = u'-'  # Valor default mientras se ejecuta
+            model.processed_rows = model.federated_datasets = model.failed_rows = 0
             model.save()
             bulk_whitelist.delay(model.id)
 
@@ -58,8 +68,10 @@ class NodeAdmin(admin.ModelAdmin):
 
     def make_unindexable(self, _, queryset):
         queryset.update(indexable=False)
+        invalidate_nodes_exports()
     make_unindexable.short_description = 'Marcar como no federable'
 
     def make_indexable(self, _, queryset):
         queryset.update(indexable=True)
+        invalidate_nodes_exports()
     make_indexable.short_description = 'Marcar como federable'
@@ -1,25 +1,32 @@
 #! coding: utf-8
 from __future__ import unicode_literals
 
+from collections import Counter
 from datetime import time
 
 from django.conf import settings
 from django.conf.urls import url
 from django.contrib import messages, admin
 from django.contrib.admin import helpers
+from django.contrib.contenttypes.models import ContentType
 from django.forms import formset_factory
 from django.shortcuts import render, redirect
+from django.urls import reverse
+from django.utils.html import format_html
 
 from django_datajsonar.admin.synchronizer import SynchronizerAdmin
 from django_datajsonar.forms.schedule_job_form import ScheduleJobForm
 from django_datajsonar.forms.stage_form import StageForm
 from django_datajsonar.forms.synchro_form import SynchroForm
-from django_datajsonar.models import ReadDataJsonTask, Synchronizer
-from django_datajsonar.tasks import read_datajson
+from django_datajsonar.models import NodeIndexingProgress, ReadDataJsonTask, Synchronizer, \
+    TaskLogEntry
+from django_datajsonar.tasks import read_datajson, resume_read_datajson
 
 
 class AbstractTaskAdmin(admin.ModelAdmin):
-    readonly_fields = ('status', 'created', 'finished', 'logs',)
+    readonly_fields = ('status', 'created', 'finished', 'get_log_entries_link', 'get_logs',)
+    # Los logs se muestran con get_logs, y solo se escriben desde la tarea
+    exclude = ('logs',)
     list_display = ('__unicode__', 'status')
 
     change_list_template = 'task_change_list.html'
@@ -40,6 +47,19 @@ class AbstractTaskAdmin(admin.ModelAdmin):
         super(AbstractTaskAdmin, self).save_model(request, obj, form, change)
         self.task.delay(obj)  # Ejecuta callable
 
+    def get_logs(self, obj):
+        return obj.get_logs() if obj.pk else ''
+    get_logs.short_description = 'Logs'
+
+    def get_log_entries_link(self, obj):
+        if not obj.pk:
+            return '-'
+        content_type = ContentType.objects.get_for_model(obj)
+        entries_url = '{}?content_type={}&object_id={}'.format(
+            reverse('admin:django_datajsonar_tasklogentry_changelist'), content_type.pk, obj.pk)
+        return format_html('<a href="{}">{} entradas</a>', entries_url, obj.log_entries.count())
+    get_log_entries_link.short_description = 'Log entries'
+
     def add_view(self, request, form_url='', extra_context=None):
         # Bloqueo la creación de nuevos modelos cuando está corriendo la tarea
         if self.model.objects.filter(status=self.model.RUNNING):
@@ -98,18 +118,67 @@ class AbstractTaskAdmin(admin.ModelAdmin):
         return render(request, 'scheduler.html', context)
 
 
+class NodeIndexingProgressInline(admin.TabularInline):
+    model = NodeIndexingProgress
+    extra = 0
+    can_delete = False
+    ordering = ('state', '-started')
+    fields = readonly_fields = ('node', 'state', 'started', 'finished', 'get_duration',
+                                'datasets', 'distributions', 'fields', 'bytes_downloaded')
+
+    def get_duration(self, obj):
+        duration = obj.duration()
+        return str(duration).split('.')[0] if duration is not None else '-'
+    get_duration.short_description = 'Duración'
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(ReadDataJsonTask)
 class DataJsonAdmin(AbstractTaskAdmin):
     model = ReadDataJsonTask
     task = read_datajson
     callable_str = 'django_datajsonar.tasks.schedule_metadata_read_task'
+    inlines = (NodeIndexingProgressInline, )
+    actions = ['resume_tasks']
 
     def get_readonly_fields(self, request, obj=None):
         if obj:
-            return self.readonly_fields + ('indexing_mode',)
+            return self.readonly_fields + ('indexing_mode', 'get_progress')
 
         return self.readonly_fields
 
+    def get_progress(self, obj):
+        states = Counter(obj.node_progress.values_list('state', flat=True))
+        done = states[NodeIndexingProgress.FINISHED] + states[NodeIndexingProgress.FAILED]
+        return '{}/{} nodos ({} fallidos, {} leyendo)'.format(
+            done, sum(states.values()), states[NodeIndexingProgress.FAILED],
+            states[NodeIndexingProgress.RUNNING])
+    get_progress.short_description = 'Progreso'
+
+    def resume_tasks(self, request, queryset):
+        for task in queryset:
+            resumed = resume_read_datajson(task)
+            if resumed:
+                messages.info(request, "Tarea {}: se reanudó la lectura de {} nodos".format(task, resumed))
+            else:
+                messages.warning(request, "Tarea {}: no hay lecturas para reanudar".format(task))
+    resume_tasks.short_description = 'Reanudar tareas interrumpidas'
+
+
+@admin.register(TaskLogEntry)
+class TaskLogEntryAdmin(admin.ModelAdmin):
+    list_display = ('created', 'level', 'node', 'content_type', 'object_id', 'msg')
+    list_filter = ('level', 'node')
+    list_select_related = ('node', 'content_type')
+    search_fields = ('msg', )
+    list_per_page = 200
+    readonly_fields = ('content_type', 'object_id', 'created', 'level', 'node', 'msg', 'written')
+
+    def has_add_permission(self, request):
+        return False
+
 
 def get_stage_name_from_callable_string(callable_str):
     for name, stage in settings.DATAJSONAR_STAGES.items():
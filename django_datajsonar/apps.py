@@ -1,5 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class DjangoDatajsonarConfig(AppConfig):
     name = 'django_datajsonar'
+
+    def ready(self):
+        from django_datajsonar.models import Jurisdiction, Language, Node, NodeMetadata, \
+            ProjectMetadata, Publisher, Spatial
+        from django_datajsonar.utils.nodes_cache import invalidate_nodes_exports
+
+        # Modelos que forman parte de las exportaciones de nodos (nodes.json, nodes.csv, ...)
+        for model in (Jurisdiction, NodeMetadata, Node, ProjectMetadata, Publisher, Language, Spatial):
+            post_save.connect(invalidate_nodes_exports, sender=model,
+                              dispatch_uid='invalidate_nodes_exports_save_{}'.format(model.__name__))
+            post_delete.connect(invalidate_nodes_exports, sender=model,
+                                dispatch_uid='invalidate_nodes_exports_delete_{}'.format(model.__name__))
@@ -11,7 +11,7 @@ class StageForm(forms.Form):
 
     class Meta:
         model = Stage
-        exclude = ('next_stage', 'status', 'name', 'callable_str', 'queue')
+        exclude = ('next_stage', 'status', 'name', 'callable_str', 'queue', 'enqueue_pending')
 
     def get_stage(self, name):
         task = self.cleaned_data['task']
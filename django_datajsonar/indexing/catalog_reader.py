@@ -3,71 +3,145 @@ from __future__ import division
 
 import json
 from django.conf import settings
+from django.db.models import Q
 from django_rq import job
-from pydatajson import DataJson
 from pydatajson.custom_exceptions import NonParseableCatalog
 
-from django_datajsonar.models import Dataset, Catalog, Distribution, Field
-from django_datajsonar.models import ReadDataJsonTask
+from django_datajsonar.models import Catalog, Distribution
+from django_datajsonar.models import NodeIndexingProgress, ReadDataJsonTask
 from django_datajsonar.models.config import IndexingConfig
 from django_datajsonar.utils.catalog_file_generator import CatalogFileGenerator
-from .database_loader import DatabaseLoader
+from django_datajsonar.utils.fetched_catalog import FetchedCatalog
+from .database_loader import BulkDatabaseLoader, DatabaseLoader
+from .split_jobs import enqueue_followup_jobs
 from .strings import READ_ERROR
-from .utils import log_exception
+from .utils import catalog_querysets, loader_settings, log_exception, source_hash
 
 
 class CatalogReader:
 
-    def __init__(self, read_local=False, whitelist=False, indexing_config=None):
+    def __init__(self, read_local=False, whitelist=False, indexing_config=None, resume=False):
         self.read_local = read_local
         self.whitelist = whitelist
+        # Si la lectura reanuda una tarea interrumpida
+        self.resume = resume
         if indexing_config is None:
             indexing_config = IndexingConfig.get_solo()
         self.indexing_config = indexing_config
+        self.failed = False
+        self.stats = {}
+        # Distribuciones a descargar en jobs separados, si la lectura los usa
+        self.deferred_downloads = None
 
     def index(self, node, task):
+        self.failed = False
+        self.stats = {}
+        self.deferred_downloads = None
+        progress = NodeIndexingProgress.start(task, node)
+        try:
+            with ReadDataJsonTask.log_buffer(task, node=node):
+                self._index(node, task)
+        except Exception:
+            self.failed = True
+            self._finish(progress, task)
+            raise
+
+        if self.deferred_downloads is None:
+            self._finish(progress, task)
+        else:
+            enqueue_followup_jobs(progress, self.deferred_downloads, self.read_local,
+                                  self._verify_ssl(node), self.failed, self.stats)
+
+    def _finish(self, progress, task):
+        progress.finish(failed=self.failed, **self.stats)
+        task.finish_if_complete()
+
+    def _index(self, node, task):
         self._reset_catalog_if_exists(node)
 
+        fetched_catalog = FetchedCatalog.from_node(node, self._verify_ssl(node))
         try:
-            catalog = DataJson(node.catalog_url,
-                               catalog_format=node.catalog_format,
-                               verify_ssl=self.indexing_config.verify_ssl)
+            catalog = fetched_catalog.data_json()
             catalog.generate_distribution_ids()
             node.catalog = json.dumps(catalog)
-            node.save()
+            node.save(update_fields=['catalog'])
         except NonParseableCatalog as e:
             self._set_catalog_as_errored(node)
-            ReadDataJsonTask.info(task, READ_ERROR.format(node.catalog_id, e))
+            ReadDataJsonTask.error(task, READ_ERROR.format(node.catalog_id, e))
+            self.failed = True
             return
 
-        self.reset_fields(node)
-
-        self._index_catalog(catalog, node, task)
+        fingerprint = self._fingerprint(catalog)
+        if task.indexing_mode == ReadDataJsonTask.METADATA_ONLY and \
+                Catalog.objects.filter(identifier=node.catalog_id, source_hash=fingerprint).exists():
+            self._refresh_unchanged_catalog(node, task)
+        else:
+            Catalog.objects.filter(identifier=node.catalog_id).update(source_hash='')
+            if self._index_catalog(catalog, node, task):
+                Catalog.objects.filter(identifier=node.catalog_id).update(source_hash=fingerprint)
+
+        file_generator = CatalogFileGenerator(node, fetched_catalog)
+        if self.indexing_config.split_jobs:
+            # El catalog.xlsx se genera en un job aparte, a partir del data.json guardado
+            file_generator.save_fetched_files()
+            self.deferred_downloads = self._indexable_distributions(node, task)
+            return
 
-        file_generator = CatalogFileGenerator(node)
         file_generator.generate_files()
 
+    def _verify_ssl(self, node):
+        return self.indexing_config.verify_ssl or node.verify_ssl
+
     def _index_catalog(self, catalog, node, task):
-        verify_ssl = self.indexing_config.verify_ssl or node.verify_ssl
+        verify_ssl = self._verify_ssl(node)
         try:
-            loader = DatabaseLoader(task, read_local=self.read_local,
-                                    default_whitelist=self.whitelist,
-                                    verify_ssl=verify_ssl)
+            loader_class = BulkDatabaseLoader if self.indexing_config.bulk_loading \
+                else DatabaseLoader
+            loader = loader_class(task, read_local=self.read_local,
+                                  default_whitelist=self.whitelist,
+                                  verify_ssl=verify_ssl,
+                                  atomic=self.indexing_config.transactional_loading,
+                                  read_files=not self.indexing_config.split_jobs)
             ReadDataJsonTask.info(task, u"Corriendo loader para catalogo {}".format(node.catalog_id))
-            loader.run(catalog, node.catalog_id)
+            try:
+                loader.run(catalog, node.catalog_id, resume=self.resume)
+            finally:
+                self.stats = loader.stats()
         except Exception as e:
             msg = u"Excepcion en catalogo {}: {}".format(node.catalog_id, e)
             log_exception(task, msg, Catalog, {'identifier': node.catalog_id})
-
-    def reset_fields(self, node):
-        fields = {'present': False,
-                  'updated': False,
-                  'error': False,
-                  'error_msg': '',
-                  'new': False}
-        Dataset.objects.filter(catalog__identifier=node.catalog_id).update(**fields)
-        Distribution.objects.filter(dataset__catalog__identifier=node.catalog_id).update(**fields)
-        Field.objects.filter(distribution__dataset__catalog__identifier=node.catalog_id).update(**fields)
+            self.failed = True
+            return False
+        # Con errores en datasets o distribuciones, la próxima corrida vuelve a cargar el catálogo
+        return not loader.counts['errors']
+
+    @staticmethod
+    def _indexable_distributions(node, task):
+        """Ids de las distribuciones presentes de datasets indexables del
+        catálogo, cuyos archivos se descargan en una tarea de indexación
+        """
+        if not task.indexing_mode:
+            return []
+        return list(Distribution.objects.filter(
+            dataset__catalog__identifier=node.catalog_id, dataset__indexable=True, present=True
+        ).exclude(download_url__isnull=True).exclude(download_url='').values_list('pk', flat=True))
+
+    def _fingerprint(self, catalog):
+        """Hash del catálogo y de la configuración que afecta a su carga"""
+        return source_hash(catalog, self.whitelist, *loader_settings())
+
+    def _refresh_unchanged_catalog(self, node, task):
+        """Actualiza las marcas del catálogo sin cambios desde la última carga,
+        sin correr el loader: todas sus entidades quedan como no actualizadas,
+        y la presencia y los errores se mantienen
+        """
+        ReadDataJsonTask.info(task, u"Catálogo {} sin cambios, se omite la carga".format(node.catalog_id))
+        catalog_model = Catalog.objects.get(identifier=node.catalog_id)
+        for queryset in catalog_querysets(catalog_model).values():
+            queryset.filter(Q(updated=True) | Q(new=True)).update(updated=False, new=False)
+        catalog_model.present = True
+        catalog_model.updated = False
+        catalog_model.save()
 
     def _set_catalog_as_errored(self, node):
         Catalog.objects.filter(identifier=node.catalog_id).update(present=False, error=True)
@@ -83,6 +157,6 @@ class CatalogReader:
 
 
 @job('indexing', timeout=getattr(settings, 'INDEX_CATALOG_TIMEOUT', 1800))
-def index_catalog(node, task, read_local=False, whitelist=False):
+def index_catalog(node, task, read_local=False, whitelist=False, resume=False):
     whitelist = whitelist or node.new_datasets_auto_indexable
-    CatalogReader(read_local, whitelist).index(node, task)
+    CatalogReader(read_local, whitelist, resume=resume).index(node, task)
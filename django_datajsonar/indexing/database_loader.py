@@ -1,12 +1,13 @@
 #! coding: utf-8
-import hashlib
 import json
 
-from tempfile import NamedTemporaryFile
+from collections import Counter, OrderedDict, defaultdict
+from contextlib import contextmanager
 
-import requests
 from django.conf import settings
 from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 from pydatajson import DataJson
 from pydatajson.time_series import distribution_has_time_index
@@ -14,33 +15,148 @@ from pydatajson.time_series import distribution_has_time_index
 from django_datajsonar.models import ReadDataJsonTask
 from django_datajsonar.models import Dataset, Catalog, Distribution, Field
 from . import constants
-from .utils import log_exception, update_model
+from .file_downloader import DistributionDownloader, hash_file
+from .utils import bulk_update, catalog_querysets, chunks, loader_settings, log_exception, \
+    no_transaction, source_hash, update_model
 
+# Máxima cantidad de parámetros de un IN, dentro del límite de SQLite
+RECONCILE_BATCH_SIZE = 900
 
-class DatabaseLoader:
-    """Carga la base de datos. No hace validaciones"""
 
-    def __init__(self, task, read_local=False, default_whitelist=False, verify_ssl=False):
+class DatabaseLoader:
+    """Carga la base de datos. No hace validaciones. Con 'atomic', cada
+    catálogo se carga en una única transacción, con un savepoint por dataset.
+    Con 'read_files' en False no se leen los archivos de las distribuciones
+    aunque la tarea sea de indexación: se leen luego con read_distribution_files
+    """
+
+    def __init__(self, task, read_local=False, default_whitelist=False, verify_ssl=False,
+                 atomic=False, read_files=True):
         self.task = task
         self.read_local = read_local
         self.default_whitelist = default_whitelist
-        self.verify_ssl = verify_ssl
+        self.atomic = atomic
+        self.read_files = read_files
+        # Errores de carga y bytes descargados en la corrida
+        self.counts = Counter()
         self.theme_taxonomy = {}
+        self.downloader = DistributionDownloader(verify_ssl=verify_ssl)
+        self.seen = defaultdict(set)
 
-    def run(self, catalog, catalog_id):
+    def run(self, catalog, catalog_id, resume=False):
         """Guarda la metadata del catalogo pasado por parametro
 
         Args:
             catalog (DataJson)
             catalog_id (str): Identificador único del catalogo a guardar
+            resume (bool): si la carga reanuda una tarea interrumpida, en
+                cuyo caso no se recargan los datasets que la tarea ya cargó
         Returns:
             Catalog: el modelo de catalogo creado o actualizado
         """
+        if resume and not self._commits_checkpoints():
+            ReadDataJsonTask.info(self.task, u"La carga en lotes o transaccional no guarda "
+                                             u"checkpoints: se recarga el catálogo {}".format(catalog_id))
+            resume = False
         self.init_theme(catalog)
-        catalog_model = self._catalog_model(catalog, catalog_id)
+        if self._reads_files() and not self.read_local:
+            self._start_downloads(catalog, catalog_id)
+        try:
+            with self._transaction():
+                catalog_model = self._catalog_model(catalog, catalog_id, resume)
+        finally:
+            self.downloader.close()
         return catalog_model
 
-    def _catalog_model(self, catalog, catalog_id):
+    def read_distribution_files(self, distributions):
+        """Lee los archivos de las distribuciones pasadas, fuera de la carga
+        de metadatos. Las que cambiaron quedan actualizadas, junto a su
+        dataset y su catálogo. Los errores se registran en cada distribución
+
+        Args:
+            distributions (iterable): modelos de Distribution
+        """
+        distributions = list(distributions)
+        if not self.read_local:
+            for distribution_model in distributions:
+                if distribution_model.download_url:
+                    self.downloader.submit(distribution_model.download_url, **self._conditional_headers(
+                        distribution_model.data_etag, distribution_model.data_last_modified,
+                        distribution_model.data_hash, distribution_model.data_file))
+        try:
+            for distribution_model in distributions:
+                self._read_deferred_file(distribution_model)
+        finally:
+            self.downloader.close()
+
+    def stats(self):
+        """Cantidades de entidades cargadas y bytes descargados en la corrida"""
+        return {'datasets': len(self.seen[Dataset]),
+                'distributions': len(self.seen[Distribution]),
+                'fields': len(self.seen[Field]),
+                'bytes_downloaded': self.counts['bytes_downloaded']}
+
+    def _start_downloads(self, catalog, catalog_id):
+        """Encola las descargas de los archivos de las distribuciones
+        indexables, que corren mientras se cargan los metadatos. _read_file
+        consume luego sus resultados
+        """
+        indexable_datasets = set(Dataset.objects.filter(
+            catalog__identifier=catalog_id, indexable=True
+        ).values_list('identifier', flat=True))
+        validators = {
+            download_url: self._conditional_headers(etag, last_modified, data_hash, data_file)
+            for download_url, etag, last_modified, data_hash, data_file in
+            Distribution.objects.filter(dataset__catalog__identifier=catalog_id).values_list(
+                'download_url', 'data_etag', 'data_last_modified', 'data_hash', 'data_file')
+        }
+        only_time_series = getattr(settings, 'DATAJSON_AR_TIME_SERIES_ONLY', False)
+        for dataset in catalog.get_datasets(only_time_series=only_time_series):
+            if not isinstance(dataset, dict):
+                continue
+            if not self.default_whitelist and dataset.get(constants.IDENTIFIER) not in indexable_datasets:
+                continue
+            distributions = dataset.get('distribution', [])
+            if not isinstance(distributions, list):
+                continue
+            for distribution in distributions:
+                download_url = distribution.get(constants.DOWNLOAD_URL) \
+                    if isinstance(distribution, dict) else None
+                if download_url:
+                    self.downloader.submit(download_url, **validators.get(download_url, {}))
+
+    def _reads_files(self):
+        """Si la carga lee los archivos de las distribuciones indexables"""
+        return self.read_files and bool(self.task.indexing_mode)
+
+    def _commits_checkpoints(self):
+        """Si el checkpoint de cada dataset queda guardado apenas termina su
+        carga. La carga atómica lo confirma recién al terminar el catálogo
+        """
+        return not self.atomic
+
+    def _transaction(self):
+        """Transacción (o savepoint, si ya hay una en curso) en la que
+        corre la carga, si el loader es atómico
+        """
+        return transaction.atomic() if self.atomic else no_transaction()
+
+    def _dataset_transaction(self):
+        """Savepoint de la carga de un dataset: si falla, se descartan sus
+        cambios sin afectar al resto del catálogo
+        """
+        return self._transaction()
+
+    @staticmethod
+    def _conditional_headers(etag, last_modified, data_hash, data_file):
+        """Validadores a enviar en la descarga condicional. Solo se usan si
+        hay un archivo descargado previamente contra el cual comparar
+        """
+        if not (data_hash and data_file):
+            return {}
+        return {'etag': etag, 'last_modified': last_modified}
+
+    def _catalog_model(self, catalog, catalog_id, resume=False):
         """Crea o actualiza el catalog model con el título pedido a partir
         de el diccionario de metadatos de un catálogo
         """
@@ -51,23 +167,29 @@ class DatabaseLoader:
             identifier=catalog_id,
             defaults={'title': trimmed_catalog.get('title', 'No Title')}
         )
+        self._clear_errors(catalog_model)
+        self.seen = defaultdict(set)
 
         only_time_series = getattr(settings, 'DATAJSON_AR_TIME_SERIES_ONLY', False)
         datasets = catalog.get_datasets(only_time_series=only_time_series)
+        self._prepare_catalog(catalog_model, datasets)
         updated_datasets = False
         issued_dates = []
         for dataset in datasets:
             try:
-                dataset_model = self._dataset_model(dataset, catalog_model)
+                with self._dataset_transaction():
+                    dataset_model = self._dataset_model(dataset, catalog_model, resume)
                 updated_datasets = updated_datasets or dataset_model.updated
                 issued_dates.append(dataset_model.issued.strftime("%Y-%m-%dT%H:%M:%S"))
             except Exception as e:
                 msg = u"Excepción en dataset {}: {}" \
                     .format(dataset.get('identifier'), e)
-                log_exception(self.task, msg, Dataset,
-                              {'identifier': dataset.get('identifier'),
-                               'catalog': catalog_model}
-                              )
+                self._log_exception(msg, Dataset,
+                                    {'identifier': dataset.get('identifier'),
+                                     'catalog': catalog_model})
+                # Fuerza a recargar el dataset completo en la próxima corrida
+                Dataset.objects.filter(catalog=catalog_model, identifier=dataset.get('identifier'))\
+                    .update(source_hash='')
                 continue
 
         if not datasets and only_time_series:
@@ -77,28 +199,43 @@ class DatabaseLoader:
         if not trimmed_catalog.get('issued') and issued_dates:
             trimmed_catalog['issued'] = min(issued_dates)
 
+        self._flush()
+        self._reconcile_presence(catalog_model)
         update_model(trimmed_catalog, catalog_model, updated_children=updated_datasets)
         return catalog_model
 
-    def _dataset_model(self, dataset, catalog_model):
+    def _dataset_model(self, dataset, catalog_model, resume=False):
         """Crea o actualiza el modelo del dataset a partir de un
-        diccionario que lo representa
+        diccionario que lo representa. Si el dataset (con sus distribuciones
+        y fields) no cambió desde la última carga y no hay archivos que
+        descargar, o si se reanuda la tarea que ya lo cargó, no recorre sus
+        distribuciones
         """
         trimmed_dataset = self._trim_dict_fields(
             dataset, settings.DATASET_BLACKLIST, constants.DISTRIBUTION)
-        identifier = trimmed_dataset[constants.IDENTIFIER]
-        dataset_model, created = Dataset.objects.update_or_create(
-            catalog=catalog_model,
-            identifier=identifier,
+        dataset_model = self._get_dataset(
+            catalog_model, trimmed_dataset[constants.IDENTIFIER],
             defaults={'title': trimmed_dataset.get('title', 'No Title'),
                       'landing_page':
                           trimmed_dataset.get('landingPage')}
         )
         self.assign_theme_fields(dataset, dataset_model)
-        updated_distributions = False
-        distributions = dataset.get('distribution', [])
         if self.default_whitelist:
             dataset_model.indexable = True
+        dataset_hash = source_hash(dataset, *loader_settings())
+        if resume and dataset_model.source_hash == dataset_hash and \
+                dataset_model.checkpoint_task == self.task.pk:
+            self._resume_dataset(dataset_model)
+            return dataset_model
+        if dataset_model.source_hash == dataset_hash and \
+                not (self._reads_files() and dataset_model.indexable):
+            self._skip_dataset(dataset_model)
+            return dataset_model
+
+        dataset_model.source_hash = ''
+        error_count = self.counts['errors']
+        updated_distributions = False
+        distributions = dataset.get('distribution', [])
         if getattr(settings, 'DATAJSON_AR_TIME_SERIES_ONLY', False):
             distributions = filter(distribution_has_time_index, distributions)
         issued_dates = []
@@ -110,19 +247,25 @@ class DatabaseLoader:
             except Exception as e:
                 msg = u"Excepción en distribución {}: {}" \
                     .format(distribution.get('identifier'), e)
-                log_exception(self.task, msg, Distribution,
-                              {'identifier': distribution.get('identifier'),
-                               'dataset': dataset_model})
+                self._log_exception(msg, Distribution,
+                                    {'identifier': distribution.get('identifier'),
+                                     'dataset': dataset_model})
                 continue
 
         if not trimmed_dataset.get('issued') and issued_dates:
             trimmed_dataset['issued'] = min(issued_dates)
 
-        update_model(trimmed_dataset, dataset_model, updated_children=updated_distributions)
+        # Solo se saltea en próximas corridas si se cargó sin errores
+        if self.counts['errors'] == error_count:
+            dataset_model.source_hash = dataset_hash
+            dataset_model.checkpoint_task = self.task.pk
+
+        self._update_model(trimmed_dataset, dataset_model,
+                           updated_children=updated_distributions)
         # Si se actualizó y está en revisión lo marco como no revisado
         if dataset_model.updated and dataset_model.reviewed == Dataset.ON_REVISION:
             dataset_model.reviewed = Dataset.NOT_REVIEWED
-            dataset_model.save()
+            self._save_model(dataset_model)
 
         return dataset_model
 
@@ -132,9 +275,8 @@ class DatabaseLoader:
         """
         trimmed_distribution = self._trim_dict_fields(
             distribution, settings.DISTRIBUTION_BLACKLIST, constants.FIELD)
-        distribution_model, created = Distribution.objects.update_or_create(
-            dataset=dataset_model,
-            identifier=trimmed_distribution[constants.IDENTIFIER],
+        distribution_model = self._get_distribution(
+            dataset_model, trimmed_distribution[constants.IDENTIFIER],
             defaults={
                 'title': trimmed_distribution.get(constants.TITLE, 'No Title'),
                 'download_url': trimmed_distribution.get(constants.DOWNLOAD_URL)
@@ -151,19 +293,19 @@ class DatabaseLoader:
                     .format(field.get('title'), e)
                 model_fields = {'identifier': field.get('identifier'),
                                 'distribution': distribution_model}
-                log_exception(self.task, msg, Field, model_fields)
+                self._log_exception(msg, Field, model_fields)
                 continue
 
         data_change = False
-        if self.task.indexing_mode and dataset_model.indexable:
+        if self._reads_files() and dataset_model.indexable:
             data_change = self._read_file(distribution_model)
 
         # En caso de que no descargue el archivo.
         if not distribution_model.download_url:
             raise ValueError("DownloadURL no encontrado")
 
-        update_model(trimmed_distribution, distribution_model,
-                     updated_children=updated_fields, data_change=data_change)
+        self._update_model(trimmed_distribution, distribution_model,
+                           updated_children=updated_fields, data_change=data_change)
         return distribution_model
 
     def _field_model(self, field, distribution_model):
@@ -171,20 +313,106 @@ class DatabaseLoader:
             field, settings.FIELD_BLACKLIST
         )
         field_meta = json.dumps(trimmed_field)
-        field_model, created = Field.objects.get_or_create(
-            distribution=distribution_model,
-            title=field.get('title'),
-            identifier=field.get('id'),
+        field_model = self._get_field(
+            distribution_model, field.get('title'), field.get('id'),
             defaults={'metadata': field_meta}
         )
-        update_model(trimmed_field, field_model)
+        self._update_model(trimmed_field, field_model)
+        return field_model
+
+    def _skip_dataset(self, dataset_model):
+        """Marca como presente y no actualizado al dataset sin cambios, y
+        como no actualizadas a sus distribuciones y fields, que mantienen la
+        presencia de la última carga
+        """
+        dataset_model.present = True
+        dataset_model.updated = False
+        dataset_model.new = False
+        self._save_model(dataset_model)
+        self.seen[Dataset].add(dataset_model.pk)
+        children = ((Distribution, Distribution.objects.filter(dataset=dataset_model)),
+                    (Field, Field.objects.filter(distribution__dataset=dataset_model)))
+        for model_class, queryset in children:
+            self.seen[model_class].update(queryset.filter(present=True).values_list('pk', flat=True))
+            queryset.filter(Q(updated=True) | Q(new=True)).update(updated=False, new=False)
+
+    def _resume_dataset(self, dataset_model):
+        """Cuenta como cargado al dataset que ya se cargó completo en esta
+        misma tarea, antes de que se interrumpiera su lectura. Mantiene las
+        marcas de esa carga
+        """
+        self.seen[Dataset].add(dataset_model.pk)
+        self._save_model(dataset_model)
+        children = ((Distribution, Distribution.objects.filter(dataset=dataset_model)),
+                    (Field, Field.objects.filter(distribution__dataset=dataset_model)))
+        for model_class, queryset in children:
+            self.seen[model_class].update(queryset.filter(present=True).values_list('pk', flat=True))
+
+    def _log_exception(self, msg, model, field_kw):
+        self.counts['errors'] += 1
+        return log_exception(self.task, msg, model, field_kw)
+
+    def _prepare_catalog(self, catalog_model, datasets):
+        """Punto de extensión llamado antes de cargar los datasets del
+        catálogo. La carga estándar no necesita preparación previa
+        """
+
+    def _flush(self):
+        """Punto de extensión llamado luego de cargar todos los datasets
+        del catálogo, antes de guardar el modelo del catálogo
+        """
+
+    def _get_dataset(self, catalog_model, identifier, defaults):
+        dataset_model, _ = Dataset.objects.update_or_create(
+            catalog=catalog_model, identifier=identifier, defaults=defaults)
+        return dataset_model
+
+    def _get_distribution(self, dataset_model, identifier, defaults):
+        distribution_model, _ = Distribution.objects.update_or_create(
+            dataset=dataset_model, identifier=identifier, defaults=defaults)
+        return distribution_model
+
+    def _get_field(self, distribution_model, title, identifier, defaults):
+        field_model, _ = Field.objects.get_or_create(
+            distribution=distribution_model, title=title,
+            identifier=identifier, defaults=defaults)
         return field_model
 
+    def _update_model(self, trimmed_dict, model, updated_children=False, data_change=False):
+        model.update_metadata(trimmed_dict, updated_children, data_change)
+        self._save_model(model)
+        self.seen[model.__class__].add(model.pk)
+
+    def _clear_errors(self, catalog_model):
+        """Limpia los errores de la corrida anterior. Solo toca las filas
+        marcadas con error; los errores de esta corrida los vuelve a marcar
+        log_exception
+        """
+        for queryset in catalog_querysets(catalog_model).values():
+            queryset.filter(error=True).update(error=False, error_msg='')
+
+    def _reconcile_presence(self, catalog_model):
+        """Marca como ausentes, no actualizadas y no nuevas a las entidades
+        del catálogo que no fueron cargadas en esta corrida, con un UPDATE
+        por tabla. Las cargadas ya quedaron marcadas por update_metadata
+        """
+        for model_class, queryset in catalog_querysets(catalog_model).items():
+            flagged = queryset.exclude(present=False, updated=False, new=False)
+            missing = set(flagged.values_list('pk', flat=True)) - self.seen[model_class]
+            for pks in chunks(sorted(missing), RECONCILE_BATCH_SIZE):
+                model_class.objects.filter(pk__in=pks).update(
+                    present=False, updated=False, new=False)
+
+    def _save_model(self, model):
+        model.save()
+
     def _read_file(self, distribution_model):
         """Descarga y lee el archivo de la distribución. Por razones
         de performance, NO hace un save() a la base de datos.
         Marca el modelo de distribución como 'indexable' si el archivo tiene datos
-        distintos a los actuales. El chequeo de cambios se hace hasheando el archivo entero
+        distintos a los actuales. El chequeo de cambios se hace hasheando el archivo entero,
+        salvo que el servidor responda 304 al pedido condicional con el ETag y
+        Last-Modified de la descarga anterior
         Args:
             distribution_model (Distribution)
         """
@@ -193,24 +421,30 @@ class DatabaseLoader:
             return False
         if self.read_local:  # Usado en debug y testing
             with open(file_url, 'rb') as f:
-                data_hash = hashlib.sha512(f.read()).hexdigest()
+                data_hash = hash_file(f)
             distribution_model.data_file = File(open(file_url, 'rb'))
 
         else:
-            user_agent = getattr(settings, 'DATAJSON_AR_USER_AGENT', 'aUserAgent')
-            headers = {'User-Agent': user_agent}
-            request = requests.get(file_url, headers=headers, stream=True, verify=self.verify_ssl)
-            request.raise_for_status()  # Excepción si es inválido
-
-            lf = NamedTemporaryFile()
-
-            lf.write(request.content)
+            validators = self._conditional_headers(
+                distribution_model.data_etag, distribution_model.data_last_modified,
+                distribution_model.data_hash, distribution_model.data_file)
+            downloaded = self.downloader.result(file_url, **validators)
+            if downloaded.not_modified and not validators:
+                # Validadores de otra distribución con la misma URL
+                downloaded = self.downloader.result(file_url)
+
+            distribution_model.data_etag = downloaded.etag
+            distribution_model.data_last_modified = downloaded.last_modified
+            if downloaded.not_modified:
+                return False
 
             if distribution_model.data_file:
                 distribution_model.data_file.delete()
 
-            distribution_model.data_file = File(lf)
-            data_hash = hashlib.sha512(request.content).hexdigest()
+            distribution_model.data_file = File(downloaded.file)
+            distribution_model.data_content_length = downloaded.content_length
+            self.counts['bytes_downloaded'] += downloaded.content_length or 0
+            data_hash = downloaded.data_hash
 
         changed = distribution_model.data_hash != data_hash
         if changed:
@@ -220,6 +454,19 @@ class DatabaseLoader:
 
         return changed
 
+    def _read_deferred_file(self, distribution_model):
+        try:
+            changed = self._read_file(distribution_model)
+        except Exception as e:
+            msg = u"Excepción en distribución {}: {}".format(distribution_model.identifier, e)
+            self._log_exception(msg, Distribution, {'pk': distribution_model.pk})
+            return
+        if changed:
+            distribution_model.updated = True
+            Dataset.objects.filter(pk=distribution_model.dataset_id).update(updated=True)
+            Catalog.objects.filter(dataset__pk=distribution_model.dataset_id).update(updated=True)
+        distribution_model.save()
+
     @staticmethod
     def _remove_blacklisted_fields(metadata, blacklist):
         """Borra los campos listados en 'blacklist' de el diccionario
@@ -252,3 +499,246 @@ class DatabaseLoader:
                 themes.append(theme)
 
         dataset_model.themes = json.dumps(themes)
+
+
+class BulkDatabaseLoader(DatabaseLoader):
+    """Carga la base de datos en lotes. Precarga en pocas consultas los
+    modelos existentes del catálogo, calcula los cambios en memoria y los
+    escribe con bulk_create/bulk_update, manteniendo la semántica de
+    'updated', 'new' y 'present' de DatabaseLoader
+    """
+
+    DATASET_FIELDS = ('title', 'landing_page', 'themes', 'indexable', 'reviewed', 'source_hash',
+                      'checkpoint_task', 'metadata', 'updated', 'new', 'present', 'issued') + \
+        tuple(Dataset.METADATA_COLUMNS)
+    DISTRIBUTION_FIELDS = ('title', 'download_url', 'data_hash', 'last_updated', 'data_file',
+                           'data_etag', 'data_last_modified', 'data_content_length',
+                           'metadata', 'updated', 'new', 'present', 'issued') + \
+        tuple(Distribution.METADATA_COLUMNS)
+    FIELD_FIELDS = ('metadata', 'updated', 'new', 'present', 'issued')
+
+    def __init__(self, task, batch_size=None, **kwargs):
+        super(BulkDatabaseLoader, self).__init__(task, **kwargs)
+        self.batch_size = batch_size or getattr(settings, 'DATAJSON_AR_BULK_BATCH_SIZE', 500)
+        self.datasets = {}
+        self.distributions = {}
+        self.fields = {}
+        self.fields_by_distribution = defaultdict(list)
+        self.distributions_by_dataset = defaultdict(list)
+        self.pending = {}
+
+    def _prepare_catalog(self, catalog_model, datasets):
+        """Trae los modelos existentes del catálogo y crea en lote los que
+        falten, de manera que la carga posterior no consulte la base por
+        cada entidad
+        """
+        self.pending = OrderedDict((model, OrderedDict()) for model in (Dataset, Distribution, Field))
+        self.fields_by_distribution = defaultdict(list)
+
+        self.datasets = self._fetch(Dataset.objects.filter(catalog=catalog_model),
+                                    self._dataset_key)
+        dataset_dicts = self._valid_children(datasets)
+        self._bulk_get_or_create(
+            self.datasets, self._dataset_key,
+            (Dataset(catalog=catalog_model,
+                     identifier=dataset[constants.IDENTIFIER],
+                     title=dataset.get('title', 'No Title'),
+                     landing_page=dataset.get('landingPage'))
+             for dataset in dataset_dicts),
+            lambda keys: Dataset.objects.filter(catalog=catalog_model, identifier__in=keys))
+
+        self.distributions = self._fetch(
+            Distribution.objects.filter(dataset__catalog=catalog_model), self._distribution_key)
+        distribution_dicts = [
+            (distribution, self.datasets[dataset[constants.IDENTIFIER]])
+            for dataset in dataset_dicts
+            if dataset[constants.IDENTIFIER] in self.datasets
+            for distribution in self._valid_children(self._dataset_distributions(dataset))
+        ]
+        self._bulk_get_or_create(
+            self.distributions, self._distribution_key,
+            (Distribution(dataset=dataset_model,
+                          identifier=distribution[constants.IDENTIFIER],
+                          title=distribution.get(constants.TITLE, 'No Title'),
+                          download_url=distribution.get(constants.DOWNLOAD_URL))
+             for distribution, dataset_model in distribution_dicts),
+            lambda keys: Distribution.objects.filter(
+                dataset_id__in={dataset_id for dataset_id, _ in keys}))
+
+        self.fields = self._fetch(
+            Field.objects.filter(distribution__dataset__catalog=catalog_model), self._field_key)
+        self._bulk_get_or_create(
+            self.fields, self._field_key,
+            (Field(distribution=distribution_model,
+                   title=field.get('title'),
+                   identifier=field.get('id'),
+                   metadata=json.dumps(self._trim_dict_fields(field, settings.FIELD_BLACKLIST)))
+             for distribution_model, distribution in self._distribution_models(distribution_dicts)
+             for field in self._valid_children(distribution.get('field', []), key=None)),
+            lambda keys: Field.objects.filter(
+                distribution_id__in={distribution_id for distribution_id, _, _ in keys}))
+        for field_model in self.fields.values():
+            self.fields_by_distribution[field_model.distribution_id].append(field_model)
+        self.distributions_by_dataset = defaultdict(list)
+        for distribution_model in self.distributions.values():
+            self.distributions_by_dataset[distribution_model.dataset_id].append(distribution_model)
+
+    def _distribution_models(self, distribution_dicts):
+        for distribution, dataset_model in distribution_dicts:
+            key = (dataset_model.pk, distribution[constants.IDENTIFIER])
+            if key in self.distributions:
+                yield self.distributions[key], distribution
+
+    def _flush(self):
+        bulk_update(Dataset, self.pending[Dataset].values(),
+                    self.DATASET_FIELDS, self.batch_size)
+        bulk_update(Distribution, self.pending[Distribution].values(),
+                    self.DISTRIBUTION_FIELDS, self.batch_size)
+        bulk_update(Field, self.pending[Field].values(),
+                    self.FIELD_FIELDS, self.batch_size)
+        for models in self.pending.values():
+            models.clear()
+
+    @contextmanager
+    def _dataset_transaction(self):
+        """Además del savepoint, separa los cambios pendientes del dataset,
+        que solo se suman a los del catálogo si su carga no falla
+        """
+        if not self.atomic:
+            yield
+            return
+        pending = self.pending
+        self.pending = OrderedDict((model, OrderedDict()) for model in pending)
+        try:
+            with transaction.atomic():
+                yield
+            for model_class, models in self.pending.items():
+                pending[model_class].update(models)
+        finally:
+            self.pending = pending
+
+    def _commits_checkpoints(self):
+        # Los checkpoints quedan pendientes hasta el próximo _flush
+        return False
+
+    def _skip_dataset(self, dataset_model):
+        dataset_model.present = True
+        dataset_model.updated = False
+        dataset_model.new = False
+        self._save_model(dataset_model)
+        self.seen[Dataset].add(dataset_model.pk)
+        for distribution_model in self.distributions_by_dataset[dataset_model.pk]:
+            for model in [distribution_model] + self.fields_by_distribution[distribution_model.pk]:
+                if model.present:
+                    self.seen[model.__class__].add(model.pk)
+                if model.updated or model.new:
+                    model.updated = False
+                    model.new = False
+                    self._save_model(model)
+
+    def _get_dataset(self, catalog_model, identifier, defaults):
+        return self._lookup(
+            self.datasets, identifier, defaults,
+            lambda: super(BulkDatabaseLoader, self)._get_dataset(
+                catalog_model, identifier, defaults))
+
+    def _get_distribution(self, dataset_model, identifier, defaults):
+        return self._lookup(
+            self.distributions, (dataset_model.pk, identifier), defaults,
+            lambda: super(BulkDatabaseLoader, self)._get_distribution(
+                dataset_model, identifier, defaults))
+
+    def _get_field(self, distribution_model, title, identifier, defaults):
+        key = (distribution_model.pk, title, identifier)
+        if key in self.fields:
+            return self.fields[key]
+        field_model = super(BulkDatabaseLoader, self)._get_field(
+            distribution_model, title, identifier, defaults)
+        self.fields[key] = field_model
+        self.fields_by_distribution[distribution_model.pk].append(field_model)
+        return field_model
+
+    def _save_model(self, model):
+        self.pending[model.__class__][model.pk] = model
+
+    def _read_file(self, distribution_model):
+        changed = super(BulkDatabaseLoader, self)._read_file(distribution_model)
+        if changed:
+            # Mantiene en memoria el update hecho en la base sobre los fields
+            for field_model in self.fields_by_distribution[distribution_model.pk]:
+                field_model.updated = True
+        return changed
+
+    def _lookup(self, cache, key, defaults, create):
+        model = cache.get(key)
+        if model is None:
+            model = cache[key] = create()
+        else:
+            for attr, value in defaults.items():
+                setattr(model, attr, value)
+        # Como update_or_create, los defaults se guardan aunque la carga falle después
+        self._save_model(model)
+        return model
+
+    def _bulk_get_or_create(self, cache, key, candidates, refetch):
+        """Crea con bulk_create los modelos de 'candidates' cuya clave no
+        esté en 'cache', y los agrega a éste. En las bases que no devuelven
+        los ids insertados, los modelos se releen con 'refetch'
+        """
+        missing = OrderedDict()
+        for model in candidates:
+            if key(model) not in cache:
+                missing.setdefault(key(model), model)
+        if not missing:
+            return
+
+        model_class = next(iter(missing.values())).__class__
+        created = model_class.objects.bulk_create(missing.values(), batch_size=self.batch_size)
+        if all(model.pk is not None for model in created):
+            cache.update((key(model), model) for model in created)
+            return
+
+        for keys in chunks(missing.keys(), self.batch_size):
+            for model in refetch(keys):
+                cache.setdefault(key(model), model)
+
+    @staticmethod
+    def _fetch(queryset, key):
+        models = {}
+        for model in queryset:
+            models.setdefault(key(model), model)
+        return models
+
+    @staticmethod
+    def _valid_children(children, key=constants.IDENTIFIER):
+        """Filtra los hijos mal formados. Los errores se registran luego,
+        al intentar cargarlos
+        """
+        try:
+            return [child for child in children
+                    if isinstance(child, dict) and (key is None or key in child)]
+        except TypeError:
+            return []
+
+    @staticmethod
+    def _dataset_distributions(dataset):
+        distributions = dataset.get('distribution', [])
+        if getattr(settings, 'DATAJSON_AR_TIME_SERIES_ONLY', False):
+            try:
+                return [distribution for distribution in distributions
+                        if distribution_has_time_index(distribution)]
+            except Exception:
+                return []
+        return distributions
+
+    @staticmethod
+    def _dataset_key(dataset_model):
+        return dataset_model.identifier
+
+    @staticmethod
+    def _distribution_key(distribution_model):
+        return distribution_model.dataset_id, distribution_model.identifier
+
+    @staticmethod
+    def _field_key(field_model):
+        return field_model.distribution_id, field_model.title, field_model.identifier
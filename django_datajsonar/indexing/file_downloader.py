@@ -0,0 +1,145 @@
+#! coding: utf-8
+import hashlib
+import threading
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import NamedTemporaryFile
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+
+from .strings import FILE_TOO_LARGE
+
+
+class DownloadedFile(namedtuple('DownloadedFile',
+                                ['file', 'data_hash', 'etag', 'last_modified', 'content_length'])):
+    """Resultado de una descarga. Si el servidor respondió 304, no hay
+    archivo ni hash, y los validadores son los conocidos previamente
+    """
+
+    @property
+    def not_modified(self):
+        return self.file is None
+
+
+def download_file(url, verify_ssl=False, etag='', last_modified=''):
+    """Descarga el archivo de 'url' a un archivo temporal de a bloques de
+    DATAJSON_AR_DOWNLOAD_BUFFER_SIZE bytes, calculando el hash a medida que
+    se escriben. Si el archivo supera DATAJSON_AR_DOWNLOAD_MAX_SIZE bytes,
+    aborta la descarga con un ValueError. Si se pasan 'etag' o
+    'last_modified', el pedido es condicional y ante un 304 no se descarga
+    el contenido
+
+    Returns:
+        DownloadedFile
+    """
+    user_agent = getattr(settings, 'DATAJSON_AR_USER_AGENT', 'aUserAgent')
+    buffer_size = getattr(settings, 'DATAJSON_AR_DOWNLOAD_BUFFER_SIZE', 64 * 1024)
+    max_size = getattr(settings, 'DATAJSON_AR_DOWNLOAD_MAX_SIZE', None)
+    headers = {'User-Agent': user_agent}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    with requests.get(url, headers=headers, stream=True, verify=verify_ssl) as request:
+        if request.status_code == requests.codes.not_modified:
+            return DownloadedFile(None, None,
+                                  request.headers.get('ETag', etag),
+                                  request.headers.get('Last-Modified', last_modified),
+                                  None)
+        request.raise_for_status()  # Excepción si es inválido
+        content_length = request.headers.get('Content-Length')
+        if max_size and content_length and content_length.isdigit() \
+                and int(content_length) > max_size:
+            raise ValueError(FILE_TOO_LARGE.format(url, max_size))
+
+        temp_file = NamedTemporaryFile()
+        data_hash = hashlib.sha512()
+        size = 0
+        try:
+            for chunk in request.iter_content(chunk_size=buffer_size):
+                size += len(chunk)
+                if max_size and size > max_size:
+                    raise ValueError(FILE_TOO_LARGE.format(url, max_size))
+                temp_file.write(chunk)
+                data_hash.update(chunk)
+        except Exception:
+            temp_file.close()
+            raise
+        temp_file.flush()
+        return DownloadedFile(temp_file, data_hash.hexdigest(),
+                              request.headers.get('ETag', ''),
+                              request.headers.get('Last-Modified', ''),
+                              size)
+
+
+def hash_file(file_obj):
+    """Calcula el hash sha512 de un archivo leyéndolo de a bloques"""
+    buffer_size = getattr(settings, 'DATAJSON_AR_DOWNLOAD_BUFFER_SIZE', 64 * 1024)
+    data_hash = hashlib.sha512()
+    for chunk in iter(lambda: file_obj.read(buffer_size), b''):
+        data_hash.update(chunk)
+    return data_hash.hexdigest()
+
+
+class DistributionDownloader:
+    """Descarga concurrentemente los archivos de distribuciones. Usa un
+    pool de threads por host, de a lo sumo 'max_workers_per_host' descargas
+    simultáneas cada uno, y limita a 'max_workers' las descargas en curso
+    entre todos los hosts
+    """
+
+    def __init__(self, verify_ssl=False, max_workers=None, max_workers_per_host=None):
+        self.verify_ssl = verify_ssl
+        self.max_workers = max_workers or \
+            getattr(settings, 'DATAJSON_AR_DOWNLOAD_WORKERS', 8)
+        self.max_workers_per_host = max_workers_per_host or \
+            getattr(settings, 'DATAJSON_AR_DOWNLOAD_WORKERS_PER_HOST', 2)
+        self.slots = threading.BoundedSemaphore(self.max_workers)
+        self.executors = {}
+        self.futures = {}
+
+    def submit(self, url, etag='', last_modified=''):
+        """Encola la descarga de 'url', si no fue encolada antes"""
+        if url not in self.futures:
+            host = urlparse(url).netloc
+            if host not in self.executors:
+                self.executors[host] = ThreadPoolExecutor(max_workers=self.max_workers_per_host)
+            self.futures[url] = self.executors[host].submit(
+                self._download, url, etag, last_modified)
+        return self.futures[url]
+
+    def result(self, url, etag='', last_modified=''):
+        """Espera y devuelve el resultado de la descarga de 'url'. Si no
+        había sido encolada, la descarga en el momento. Cada resultado
+        se entrega una sola vez
+
+        Returns:
+            DownloadedFile
+        """
+        future = self.futures.pop(url, None)
+        if future is None:
+            return download_file(url, self.verify_ssl, etag, last_modified)
+        return future.result()
+
+    def close(self):
+        """Cancela las descargas pendientes y descarta las no consumidas"""
+        for future in self.futures.values():
+            if not future.cancel():
+                # Si ya terminó se cierra en el momento; si está en curso, al terminar
+                future.add_done_callback(self._close_file)
+        self.futures = {}
+        for executor in self.executors.values():
+            executor.shutdown(wait=False)
+        self.executors = {}
+
+    @staticmethod
+    def _close_file(future):
+        if not future.exception() and not future.result().not_modified:
+            future.result().file.close()
+
+    def _download(self, url, etag, last_modified):
+        with self.slots:
+            return download_file(url, self.verify_ssl, etag, last_modified)
@@ -0,0 +1,59 @@
+#! coding: utf-8
+from __future__ import unicode_literals
+
+from django_datajsonar.models import NodeIndexingProgress, ReadDataJsonTask
+
+# Cantidad de tareas anteriores de las que se toman las duraciones
+HISTORY_TASKS = 10
+
+
+def previous_costs(nodes, exclude_task=None):
+    """Costo de la última lectura finalizada de cada nodo, como tupla
+    (segundos, entidades cargadas). Con 'exclude_task', solo se toman las
+    tareas anteriores de su mismo modo de indexación: las corridas de solo
+    metadatos no estiman a las completas. Los nodos sin lecturas anteriores
+    no figuran en el diccionario devuelto
+    """
+    tasks = ReadDataJsonTask.objects.order_by('-id')
+    if exclude_task is not None:
+        tasks = tasks.filter(indexing_mode=exclude_task.indexing_mode).exclude(pk=exclude_task.pk)
+    task_ids = list(tasks.values_list('id', flat=True)[:HISTORY_TASKS])
+
+    records = NodeIndexingProgress.objects\
+        .filter(task__in=task_ids, node__in=nodes, state=NodeIndexingProgress.FINISHED,
+                started__isnull=False)\
+        .order_by('-finished')\
+        .values_list('node', 'started', 'finished', 'datasets', 'distributions', 'fields')
+
+    costs = {}
+    for node_id, started, finished, datasets, distributions, fields in records:
+        if node_id not in costs:
+            seconds = (finished - started).total_seconds()
+            costs[node_id] = (seconds, datasets + distributions + fields)
+    return costs
+
+
+def plan_readings(nodes, queues, exclude_task=None):
+    """Ordena las lecturas de los nodos de la más larga a la más corta según
+    su lectura anterior, y las reparte entre las colas pasadas: cada una va a
+    la cola con menos tiempo estimado acumulado. Los nodos sin lecturas
+    anteriores van primero, estimados como el más largo conocido.
+
+    Returns:
+        list: tuplas (nodo, cola), en el orden en que se deben encolar
+    """
+    costs = previous_costs(nodes, exclude_task)
+    unknown = max(costs.values()) if costs else (0, 0)
+
+    def cost(node):
+        return costs.get(node.pk, unknown), node.pk not in costs
+
+    ordered = sorted(nodes, key=cost, reverse=True)
+    load = {queue: 0 for queue in queues}
+    plan = []
+    for node in ordered:
+        queue = min(queues, key=lambda name: (load[name], queues.index(name)))
+        # Toda lectura demora algo: sin historial, las colas se turnan
+        load[queue] += max(cost(node)[0][0], 1)
+        plan.append((node, queue))
+    return plan
@@ -0,0 +1,61 @@
+#! coding: utf-8
+"""Jobs posteriores a la carga de metadatos de un catálogo, cuando la
+lectura corre en jobs separados: descargas de distribuciones en lotes y
+generación del catalog.xlsx del catálogo. Cada job corre en su propia cola,
+con su propio timeout, y recibe solo ids, por lo que puede reencolarse
+"""
+from django.conf import settings
+from django_rq import job
+
+from django_datajsonar.models import Distribution, Node, NodeIndexingProgress, ReadDataJsonTask
+from django_datajsonar.utils.catalog_file_generator import CatalogFileGenerator
+from django_datajsonar.utils.fetched_catalog import FetchedCatalog
+from .database_loader import DatabaseLoader
+from .utils import chunks
+
+
+def enqueue_followup_jobs(progress, distribution_ids, read_local=False, verify_ssl=False,
+                          failed=False, stats=None):
+    """Encola los jobs posteriores a la carga de metadatos de la lectura
+    'progress': uno por lote de distribuciones a descargar y uno que genera
+    el catalog.xlsx a partir del data.json ya guardado. La lectura queda
+    corriendo hasta que terminan todos
+    """
+    batch_size = getattr(settings, 'DATAJSON_AR_DOWNLOAD_BATCH_SIZE', 20)
+    batches = list(chunks(distribution_ids, batch_size))
+    progress.defer(len(batches) + 1, failed=failed, **(stats or {}))
+    generate_catalog_files.delay(progress.pk)
+    for batch in batches:
+        download_distributions.delay(progress.pk, batch, read_local, verify_ssl)
+
+
+@job(getattr(settings, 'DATAJSON_AR_DOWNLOAD_QUEUE', 'indexing'),
+     timeout=getattr(settings, 'DOWNLOAD_DISTRIBUTIONS_TIMEOUT', 1800))
+def download_distributions(progress_id, distribution_ids, read_local=False, verify_ssl=False):
+    progress = NodeIndexingProgress.objects.select_related('task', 'node').get(pk=progress_id)
+    loader = DatabaseLoader(progress.task, read_local=read_local, verify_ssl=verify_ssl)
+    failed = True
+    try:
+        with ReadDataJsonTask.log_buffer(progress.task, node=progress.node):
+            loader.read_distribution_files(Distribution.objects.filter(pk__in=distribution_ids))
+        failed = bool(loader.counts['errors'])
+    finally:
+        _job_done(progress, failed, loader.counts['bytes_downloaded'])
+
+
+@job(getattr(settings, 'DATAJSON_AR_CATALOG_FILES_QUEUE', 'indexing'),
+     timeout=getattr(settings, 'GENERATE_CATALOG_FILES_TIMEOUT', 600))
+def generate_catalog_files(progress_id):
+    progress = NodeIndexingProgress.objects.select_related('task', 'node').get(pk=progress_id)
+    failed = True
+    try:
+        fetched_catalog = FetchedCatalog.from_file(progress.node.json_catalog_file, Node.JSON)
+        CatalogFileGenerator(progress.node, fetched_catalog).generate_derived_files()
+        failed = False
+    finally:
+        _job_done(progress, failed)
+
+
+def _job_done(progress, failed, bytes_downloaded=0):
+    if NodeIndexingProgress.job_done(progress.pk, failed, bytes_downloaded):
+        progress.task.finish_if_complete()
@@ -15,6 +15,7 @@ NO_SERIES_SCRAPPED = u"No fueron encontradas series de tiempo en este catálogo"
 DB_LOAD_START = u"Comienzo de la escritura a base de datos"
 DB_LOAD_END = u"Fin de la escritura a base de datos"
 DB_SERIES_ID_REPEATED = u"Serie ID {} en el catálogo {} ya existente. Desestimado"
+FILE_TOO_LARGE = u"El archivo {} supera el tamaño máximo de descarga ({} bytes)"
 
 # Indexer
 INDEX_START = u"Inicio de la indexación"
@@ -1,6 +1,8 @@
 #! coding: utf-8
-from django_rq import get_queue
-from django_datajsonar.models import ReadDataJsonTask
+from rq import get_current_job
+
+from django_datajsonar.models import NodeIndexingProgress, ReadDataJsonTask
+from django_datajsonar.utils.utils import indexing_stage_queues, queue_status
 
 
 # Para correr con el scheduler
@@ -9,6 +11,25 @@ def close_read_datajson_task():
     if task.status == task.FINISHED:
         return
 
-    if not get_queue('indexing').jobs:
+    statuses = {queue: queue_status(queue) for queue in indexing_stage_queues()}
+    pending_jobs = sum(status.pending for status in statuses.values())
+    if task.node_progress.exists():
+        NodeIndexingProgress.expire_stale(task, pending_jobs, running_jobs(statuses))
+        task.finish_if_complete()
+        return
+
+    # Sin registros de avance solo se miran los encolados: esta función suele correr en la misma cola
+    if not pending_jobs:
         task.status = task.FINISHED
         task.save()
+
+
+def running_jobs(statuses):
+    """Cantidad de trabajos corriendo en las colas de 'statuses', sin
+    contar al job actual si corre en una de ellas
+    """
+    running = sum(status.running for status in statuses.values())
+    current_job = get_current_job()
+    if current_job is not None and current_job.origin in statuses:
+        running -= 1
+    return running
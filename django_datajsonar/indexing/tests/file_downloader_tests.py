@@ -0,0 +1,174 @@
+#! coding: utf-8
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import requests_mock
+from django.test import TestCase
+
+try:
+    from mock import Mock, patch
+except ImportError:
+    from unittest.mock import Mock, patch
+
+from django_datajsonar.indexing.file_downloader import DistributionDownloader, \
+    DownloadedFile, download_file
+
+
+class ConcurrencyTracker:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = defaultdict(int)
+        self.max_running = defaultdict(int)
+
+    def download(self, url, *_args):
+        host = urlparse(url).netloc
+        self._add(host, 1)
+        time.sleep(0.05)
+        self._add(host, -1)
+        return None, url
+
+    def _add(self, host, amount):
+        with self.lock:
+            for key in (host, 'total'):
+                self.running[key] += amount
+                self.max_running[key] = max(self.max_running[key], self.running[key])
+
+
+class DistributionDownloaderTests(TestCase):
+
+    def test_result_has_file_and_hash(self):
+        content = b'indice_tiempo,valor\n2018-01-01,1\n'
+        with requests_mock.Mocker() as m:
+            m.get('http://fake.gob.ar/data.csv', content=content)
+            downloader = DistributionDownloader()
+            downloader.submit('http://fake.gob.ar/data.csv')
+            downloaded = downloader.result('http://fake.gob.ar/data.csv')
+            downloader.close()
+
+        downloaded.file.seek(0)
+        self.assertEqual(downloaded.file.read(), content)
+        self.assertEqual(downloaded.data_hash, hashlib.sha512(content).hexdigest())
+
+    def test_url_not_submitted_is_downloaded_on_result(self):
+        with requests_mock.Mocker() as m:
+            m.get('http://fake.gob.ar/data.csv', content=b'data')
+            downloader = DistributionDownloader()
+            downloaded = downloader.result('http://fake.gob.ar/data.csv')
+            downloader.close()
+
+        self.assertEqual(downloaded.data_hash, hashlib.sha512(b'data').hexdigest())
+        self.assertEqual(1, m.call_count)
+
+    def test_download_error_raised_on_result(self):
+        with requests_mock.Mocker() as m:
+            m.get('http://fake.gob.ar/data.csv', status_code=404)
+            downloader = DistributionDownloader()
+            downloader.submit('http://fake.gob.ar/data.csv')
+            with self.assertRaises(Exception):
+                downloader.result('http://fake.gob.ar/data.csv')
+            downloader.close()
+
+    def test_downloads_are_limited_per_host_and_overall(self):
+        tracker = ConcurrencyTracker()
+        downloader = DistributionDownloader(max_workers=3, max_workers_per_host=2)
+        urls = ['http://{}.gob.ar/{}.csv'.format(host, i)
+                for host in ('a', 'b', 'c') for i in range(4)]
+        with patch('django_datajsonar.indexing.file_downloader.download_file',
+                   tracker.download):
+            for url in urls:
+                downloader.submit(url)
+            results = [downloader.result(url)[1] for url in urls]
+            downloader.close()
+
+        self.assertEqual(urls, results)
+        self.assertEqual(3, tracker.max_running['total'])
+        for host in ('a.gob.ar', 'b.gob.ar', 'c.gob.ar'):
+            self.assertLessEqual(tracker.max_running[host], 2)
+
+    def test_file_of_running_download_closed_when_it_finishes(self):
+        started, release, closed = threading.Event(), threading.Event(), threading.Event()
+        temp_file = Mock()
+        temp_file.close.side_effect = closed.set
+
+        def slow_download(*_args):
+            started.set()
+            release.wait()
+            return DownloadedFile(temp_file, 'hash', '', '', 4)
+
+        downloader = DistributionDownloader()
+        with patch('django_datajsonar.indexing.file_downloader.download_file',
+                   slow_download):
+            downloader.submit('http://fake.gob.ar/data.csv')
+            started.wait()
+            downloader.close()
+            self.assertFalse(temp_file.close.called)
+            release.set()
+            self.assertTrue(closed.wait(5))
+
+        temp_file.close.assert_called_once_with()
+
+
+class DownloadFileTests(TestCase):
+
+    def test_file_streamed_in_chunks_has_full_content_and_hash(self):
+        content = b'indice_tiempo,valor\n' * 100
+        with requests_mock.Mocker() as m, \
+                self.settings(DATAJSON_AR_DOWNLOAD_BUFFER_SIZE=16):
+            m.get('http://fake.gob.ar/data.csv', content=content)
+            downloaded = download_file('http://fake.gob.ar/data.csv')
+
+        downloaded.file.seek(0)
+        self.assertEqual(downloaded.file.read(), content)
+        self.assertEqual(downloaded.data_hash, hashlib.sha512(content).hexdigest())
+        self.assertEqual(downloaded.content_length, len(content))
+
+    def test_download_aborted_if_content_length_exceeds_max_size(self):
+        with requests_mock.Mocker() as m, \
+                self.settings(DATAJSON_AR_DOWNLOAD_MAX_SIZE=10):
+            m.get('http://fake.gob.ar/data.csv', content=b'a' * 20,
+                  headers={'Content-Length': '20'})
+            with self.assertRaises(ValueError):
+                download_file('http://fake.gob.ar/data.csv')
+
+    def test_download_aborted_if_streamed_content_exceeds_max_size(self):
+        with requests_mock.Mocker() as m, \
+                self.settings(DATAJSON_AR_DOWNLOAD_MAX_SIZE=10,
+                              DATAJSON_AR_DOWNLOAD_BUFFER_SIZE=4):
+            m.get('http://fake.gob.ar/data.csv', content=b'a' * 20)
+            with self.assertRaises(ValueError):
+                download_file('http://fake.gob.ar/data.csv')
+
+    def test_file_under_max_size_is_downloaded(self):
+        with requests_mock.Mocker() as m, \
+                self.settings(DATAJSON_AR_DOWNLOAD_MAX_SIZE=20):
+            m.get('http://fake.gob.ar/data.csv', content=b'a' * 20)
+            downloaded = download_file('http://fake.gob.ar/data.csv')
+
+        self.assertEqual(downloaded.data_hash, hashlib.sha512(b'a' * 20).hexdigest())
+
+    def test_conditional_headers_sent_if_validators_known(self):
+        with requests_mock.Mocker() as m:
+            m.get('http://fake.gob.ar/data.csv', status_code=304)
+            downloaded = download_file('http://fake.gob.ar/data.csv', etag='"abc"',
+                                       last_modified='Wed, 21 Oct 2015 07:28:00 GMT')
+
+        headers = m.request_history[0].headers
+        self.assertEqual(headers['If-None-Match'], '"abc"')
+        self.assertEqual(headers['If-Modified-Since'], 'Wed, 21 Oct 2015 07:28:00 GMT')
+        self.assertTrue(downloaded.not_modified)
+        self.assertEqual(downloaded.etag, '"abc"')
+
+    def test_validators_returned_on_full_download(self):
+        with requests_mock.Mocker() as m:
+            m.get('http://fake.gob.ar/data.csv', content=b'data',
+                  headers={'ETag': '"abc"', 'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT'})
+            downloaded = download_file('http://fake.gob.ar/data.csv')
+
+        self.assertNotIn('If-None-Match', m.request_history[0].headers)
+        self.assertFalse(downloaded.not_modified)
+        self.assertEqual(downloaded.etag, '"abc"')
+        self.assertEqual(downloaded.last_modified, 'Wed, 21 Oct 2015 07:28:00 GMT')
@@ -1,8 +1,11 @@
 #! coding: utf-8
+import hashlib
 import json
 import os
 import shutil
 
+import requests_mock
+
 from django.conf import settings
 from django.test import TestCase
 from pydatajson import DataJson
@@ -15,7 +18,7 @@ except ImportError:
 
 from django_datajsonar.models import Catalog, Dataset, Distribution, Field
 from django_datajsonar.models import ReadDataJsonTask, Node
-from django_datajsonar.indexing.database_loader import DatabaseLoader
+from django_datajsonar.indexing.database_loader import BulkDatabaseLoader, DatabaseLoader
 from .reader_tests import SAMPLES_DIR, CATALOG_ID
 
 dir_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'samples')
@@ -24,6 +27,7 @@ dir_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'samples')
 class DatabaseLoaderTests(TestCase):
 
     catalog_id = 'test_catalog'
+    loader_class = DatabaseLoader
 
     def setUp(self):
         self.task = ReadDataJsonTask()
@@ -35,7 +39,7 @@ class DatabaseLoaderTests(TestCase):
         self.node.save()
 
         self.init_datasets(self.node)
-        self.loader = DatabaseLoader(self.task, read_local=True, default_whitelist=True)
+        self.loader = self.loader_class(self.task, read_local=True, default_whitelist=True)
 
     @staticmethod
     def init_datasets(node, whitelist=True):
@@ -101,7 +105,7 @@ class DatabaseLoaderTests(TestCase):
         catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
         self.node.catalog = json.dumps(catalog)
         self.init_datasets(self.node, whitelist=False)
-        loader = DatabaseLoader(self.task, read_local=True, default_whitelist=False)
+        loader = self.loader_class(self.task, read_local=True, default_whitelist=False)
         loader.run(catalog, self.catalog_id)
         dataset = Catalog.objects.get(identifier=CATALOG_ID).dataset_set
 
@@ -116,7 +120,7 @@ class DatabaseLoaderTests(TestCase):
         models = [Catalog, Dataset, Distribution, Field]
         for model in models:
             model.objects.all().update(present=False, updated=False)
-        loader = DatabaseLoader(self.task, read_local=True, default_whitelist=True)
+        loader = self.loader_class(self.task, read_local=True, default_whitelist=True)
         loader.run(catalog, self.catalog_id)
 
         # Al cambiar identificadores, se duplican los modelos, pero solo uno queda presente
@@ -124,6 +128,29 @@ class DatabaseLoaderTests(TestCase):
         self.assertEqual(Field.objects.filter(identifier="212.1_PSCIOS_IOS_0_0_25",
                                               present=True, updated=True).count(), 1)
 
+    def test_missing_entities_marked_absent_after_load(self):
+        catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
+        self.loader.run(catalog, self.catalog_id)
+        catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data_changed_distribution.json'))
+        loader = self.loader_class(self.task, read_local=True, default_whitelist=True)
+        loader.run(catalog, self.catalog_id)
+
+        fields = Field.objects.filter(identifier="212.1_PSCIOS_IOS_0_0_25")
+        self.assertEqual(fields.filter(present=True).count(), 1)
+        self.assertTrue(fields.filter(present=False, updated=False, new=False).exists())
+        self.assertEqual(Distribution.objects.filter(present=False).count(), 1)
+        self.assertFalse(Dataset.objects.get(identifier='99db6631-d1c9-470b-a73e-c62daa32c777').present)
+        self.assertTrue(Dataset.objects.get(identifier='300').present)
+
+    def test_previous_errors_cleared_on_successful_load(self):
+        catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
+        self.loader.run(catalog, self.catalog_id)
+        Distribution.objects.update(error=True, error_msg='Error anterior')
+        self.loader.run(catalog, self.catalog_id)
+
+        self.assertFalse(Distribution.objects.filter(error=True).exists())
+        self.assertFalse(Distribution.objects.exclude(error_msg='').exists())
+
     def test_same_dataset_identifier_only_one_error(self):
         catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
         catalog1 = self.loader.run(catalog, self.catalog_id + "1")
@@ -161,7 +188,7 @@ class DatabaseLoaderTests(TestCase):
         # Pero igualmente crea los fields
         self.assertEqual(4, Field.objects.filter(distribution=invalid_distribution).count())
 
-    @patch('django_datajsonar.indexing.database_loader.requests', autospec=True)
+    @patch('django_datajsonar.indexing.file_downloader.requests', autospec=True)
     def test_loader_downloads_resource_if_full_run(self, request_mock):
         request_mock.get.return_value = {'content': 'aFile'}
         catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
@@ -170,6 +197,39 @@ class DatabaseLoaderTests(TestCase):
         self.loader.run(catalog, self.catalog_id)
         request_mock.get.assert_called()
 
+    def test_loader_downloads_each_resource_once_if_full_run(self):
+        catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
+        catalog.distributions[0]['downloadURL'] = 'http://fake.gob.ar/data.csv'
+        self.task.indexing_mode = ReadDataJsonTask.COMPLETE_RUN
+        self.loader.read_local = False
+        with requests_mock.Mocker() as m:
+            m.get('http://fake.gob.ar/data.csv', content=b'indice_tiempo,valor')
+            self.loader.run(catalog, self.catalog_id)
+
+        self.assertEqual(1, m.call_count)
+        distribution = Distribution.objects.get(identifier='212.1')
+        self.assertEqual(hashlib.sha512(b'indice_tiempo,valor').hexdigest(), distribution.data_hash)
+
+    def test_not_modified_resource_is_not_considered_changed(self):
+        catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
+        catalog.distributions[0]['downloadURL'] = 'http://fake.gob.ar/data.csv'
+        self.task.indexing_mode = ReadDataJsonTask.COMPLETE_RUN
+        self.loader.read_local = False
+        with requests_mock.Mocker() as m:
+            m.get('http://fake.gob.ar/data.csv', content=b'indice_tiempo,valor',
+                  headers={'ETag': '"v1"'})
+            self.loader.run(catalog, self.catalog_id)
+            m.get('http://fake.gob.ar/data.csv', status_code=304)
+            Distribution.objects.update(updated=False)
+            self.loader.run(catalog, self.catalog_id)
+
+        self.assertEqual('"v1"', m.request_history[1].headers['If-None-Match'])
+        distribution = Distribution.objects.get(identifier='212.1')
+        self.assertFalse(distribution.updated)
+        self.assertEqual('"v1"', distribution.data_etag)
+        self.assertEqual(len(b'indice_tiempo,valor'), distribution.data_content_length)
+        self.assertEqual(hashlib.sha512(b'indice_tiempo,valor').hexdigest(), distribution.data_hash)
+
     def test_loader_doesnt_download_resource_if_metadata_only_run(self):
         catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
         self.task.indexing_mode = ReadDataJsonTask.METADATA_ONLY
@@ -230,6 +290,7 @@ class DatabaseLoaderTests(TestCase):
         Distribution.objects.update(updated=False)
         Field.objects.update(updated=False)
 
+        # Nueva corrida
         catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
         self.loader.run(catalog, self.catalog_id)
 
@@ -257,6 +318,24 @@ class DatabaseLoaderTests(TestCase):
         self.assertEqual(len(themes), 3)
         self.assertTrue(isinstance(themes, list))
 
+    def test_metadata_columns_match_metadata(self):
+        catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
+        self.loader.run(catalog, self.catalog_id)
+
+        catalog_model = Catalog.objects.get(identifier=self.catalog_id)
+        self.assertEqual(catalog_model.publisher_name, catalog['publisher']['name'])
+        for dataset in Dataset.objects.filter(catalog=catalog_model):
+            metadata = dataset.get_metadata()
+            self.assertEqual(dataset.publisher_name, metadata['publisher']['name'])
+            self.assertEqual(dataset.license, metadata.get('license'))
+            self.assertEqual(dataset.super_theme, ','.join(metadata['superTheme']))
+        distributions = Distribution.objects.filter(dataset__catalog=catalog_model)
+        self.assertTrue(distributions)
+        for distribution in distributions:
+            metadata = distribution.get_metadata()
+            self.assertEqual(distribution.format, metadata.get('format'))
+            self.assertEqual(distribution.access_url, metadata.get('accessURL'))
+
     def test_distribution_downloadurl_error_msg(self):
         catalog = DataJson(os.path.join(SAMPLES_DIR, 'distribution_missing_downloadurl.json'))
         self.loader.run(catalog, self.catalog_id)
@@ -287,3 +366,155 @@ class DatabaseLoaderTests(TestCase):
 
         landing_page = Dataset.objects.first().landing_page
         self.assertIsNone(landing_page)
+
+    def metadata_loader(self):
+        task = ReadDataJsonTask.objects.create(indexing_mode=ReadDataJsonTask.METADATA_ONLY)
+        return self.loader_class(task, read_local=True, default_whitelist=True)
+
+    def test_unchanged_dataset_subtree_is_skipped(self):
+        catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
+        self.metadata_loader().run(catalog, self.catalog_id)
+        Field.objects.update(updated=True)
+
+        with patch.object(Distribution, 'update_metadata') as distribution_update, \
+                patch.object(Field, 'update_metadata') as field_update:
+            self.metadata_loader().run(catalog, self.catalog_id)
+
+        distribution_update.assert_not_called()
+        field_update.assert_not_called()
+        self.assertFalse(Dataset.objects.get().updated)
+        self.assertFalse(Field.objects.filter(updated=True).exists())
+        self.assertFalse(Field.objects.filter(present=False).exists())
+        self.assertTrue(Distribution.objects.get().present)
+
+    def test_changed_dataset_subtree_is_loaded(self):
+        catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
+        self.metadata_loader().run(catalog, self.catalog_id)
+        catalog.datasets[0]['distribution'][0]['field'][1]['description'] = 'Nueva descripcion'
+
+        self.metadata_loader().run(catalog, self.catalog_id)
+
+        self.assertTrue(Dataset.objects.get().updated)
+        self.assertEqual(Field.objects.filter(updated=True).count(), 1)
+
+    def test_dataset_with_errors_is_not_skipped(self):
+        catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
+        del catalog.datasets[0]['distribution'][0]['downloadURL']
+        self.metadata_loader().run(catalog, self.catalog_id)
+
+        self.assertFalse(Dataset.objects.get().source_hash)
+        self.metadata_loader().run(catalog, self.catalog_id)
+        self.assertTrue(Distribution.objects.get().error)
+
+    def test_dataset_loaded_in_same_task_is_resumed(self):
+        catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
+        self.loader.run(catalog, self.catalog_id)
+        self.assertEqual(Dataset.objects.get().checkpoint_task, self.task.pk)
+        Field.objects.update(updated=True)
+
+        loader = DatabaseLoader(self.task, read_local=True, default_whitelist=True)
+        with patch.object(DatabaseLoader, '_read_file') as read_file:
+            loader.run(catalog, self.catalog_id, resume=True)
+
+        read_file.assert_not_called()
+        self.assertFalse(Field.objects.filter(updated=False).exists())
+        self.assertFalse(Field.objects.filter(present=False).exists())
+
+    def test_dataset_loaded_in_same_task_is_reloaded_without_resume(self):
+        catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
+        self.loader.run(catalog, self.catalog_id)
+
+        loader = self.loader_class(self.task, read_local=True, default_whitelist=True)
+        with patch.object(self.loader_class, '_read_file', return_value=False) as read_file:
+            loader.run(catalog, self.catalog_id)
+
+        read_file.assert_called()
+
+    def test_atomic_load_does_not_resume_datasets(self):
+        catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
+        self.loader.run(catalog, self.catalog_id)
+
+        loader = self.loader_class(self.task, read_local=True, default_whitelist=True, atomic=True)
+        with patch.object(self.loader_class, '_read_file', return_value=False) as read_file:
+            loader.run(catalog, self.catalog_id, resume=True)
+
+        read_file.assert_called()
+
+    def test_dataset_loaded_in_other_task_is_not_resumed(self):
+        catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
+        self.loader.run(catalog, self.catalog_id)
+
+        loader = self.loader_class(ReadDataJsonTask.objects.create(), read_local=True,
+                                   default_whitelist=True)
+        with patch.object(self.loader_class, '_read_file', return_value=False) as read_file:
+            loader.run(catalog, self.catalog_id, resume=True)
+
+        read_file.assert_called()
+
+    def test_atomic_load_rolls_back_failed_dataset_only(self):
+        catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
+        self.loader.run(catalog, self.catalog_id)
+        catalog.datasets[0]['distribution'][0]['title'] = 'Nuevo titulo'
+        catalog['title'] = 'Nuevo catalogo'
+
+        update_model = self.loader_class._update_model
+
+        def fail_on_dataset(loader, trimmed_dict, model, *args, **kwargs):
+            if isinstance(model, Dataset):
+                raise ValueError('Falla en dataset')
+            return update_model(loader, trimmed_dict, model, *args, **kwargs)
+
+        loader = self.loader_class(self.task, read_local=True, default_whitelist=True, atomic=True)
+        with patch.object(self.loader_class, '_update_model', fail_on_dataset):
+            loader.run(catalog, self.catalog_id)
+
+        self.assertNotEqual('Nuevo titulo', Distribution.objects.get().title)
+        self.assertTrue(Dataset.objects.get().error)
+        self.assertEqual('Nuevo catalogo', Catalog.objects.get().title)
+
+    def test_atomic_load_rolls_back_whole_catalog_on_error(self):
+        catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
+        self.loader.run(catalog, self.catalog_id)
+        catalog.datasets[0]['title'] = 'Nuevo titulo'
+
+        loader = self.loader_class(self.task, read_local=True, default_whitelist=True, atomic=True)
+        with patch.object(self.loader_class, '_reconcile_presence', side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                loader.run(catalog, self.catalog_id)
+
+        self.assertNotEqual('Nuevo titulo', Dataset.objects.get().title)
+
+
+class BulkDatabaseLoaderTests(DatabaseLoaderTests):
+    loader_class = BulkDatabaseLoader
+
+    def test_bulk_load_does_not_resume_datasets(self):
+        catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
+        self.loader.run(catalog, self.catalog_id)
+
+        loader = BulkDatabaseLoader(self.task, read_local=True, default_whitelist=True)
+        with patch.object(BulkDatabaseLoader, '_read_file', return_value=False) as read_file:
+            loader.run(catalog, self.catalog_id, resume=True)
+
+        read_file.assert_called()
+        self.assertIn('checkpoints', ReadDataJsonTask.objects.get(pk=self.task.pk).get_logs())
+
+    def test_reload_query_count_does_not_grow_with_entities(self):
+        catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
+        self.task.indexing_mode = ReadDataJsonTask.METADATA_ONLY
+        self.loader.run(catalog, self.catalog_id)
+        catalog.datasets[0]['title'] = 'Nuevo titulo'
+
+        # update_or_create del catálogo (4), limpieza de errores (3),
+        # precarga de 3 tablas, 3 bulk_update, conciliación de presencia (3)
+        # y guardado final del catálogo
+        with self.assertNumQueries(17):
+            self.loader.run(catalog, self.catalog_id)
+
+    def test_new_fields_are_bulk_created(self):
+        catalog = DataJson(os.path.join(SAMPLES_DIR, 'full_ts_data.json'))
+        self.loader.run(catalog, self.catalog_id)
+
+        fields = Field.objects.filter(distribution__identifier='212.1')
+        self.assertEqual(fields.count(), 4)
+        self.assertFalse(fields.filter(present=False).exists())
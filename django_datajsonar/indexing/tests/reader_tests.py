@@ -5,7 +5,7 @@ from django.test import TestCase
 from django.conf import settings
 
 from django_datajsonar.models import Catalog, Distribution, Field
-from django_datajsonar.models import ReadDataJsonTask, Node
+from django_datajsonar.models import ReadDataJsonTask, Node, TaskLogEntry
 from django_datajsonar.indexing.catalog_reader import index_catalog
 
 
@@ -36,7 +36,17 @@ class ReaderTests(TestCase):
         self.node.save()
         index_catalog(self.node, self.task, read_local=True, whitelist=True)
 
-        self.assertGreater(len(ReadDataJsonTask.objects.get(id=self.task.id).logs), 10)
+        self.assertGreater(len(ReadDataJsonTask.objects.get(id=self.task.id).get_logs()), 10)
+
+    def test_error_distribution_log_entries_have_node_and_level(self):
+        catalog = os.path.join(SAMPLES_DIR, 'distribution_missing_downloadurl.json')
+        self.node.catalog_url = catalog
+        self.node.save()
+        index_catalog(self.node, self.task, read_local=True, whitelist=True)
+
+        errors = self.task.log_entries.filter(level=TaskLogEntry.ERROR)
+        self.assertTrue(errors.exists())
+        self.assertFalse(errors.exclude(node=self.node).exists())
 
     def test_index_only_time_series_if_specified(self):
         settings.DATAJSON_AR_TIME_SERIES_ONLY = True
@@ -0,0 +1,67 @@
+#! coding: utf-8
+from __future__ import unicode_literals
+
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from django_datajsonar.indexing.scheduling import plan_readings, previous_costs
+from django_datajsonar.models import Node, NodeIndexingProgress, ReadDataJsonTask
+
+
+class PlanReadingsTests(TestCase):
+
+    def setUp(self):
+        self.nodes = [Node.objects.create(catalog_id=catalog_id,
+                                          catalog_url='http://{}.com'.format(catalog_id),
+                                          indexable=True)
+                      for catalog_id in ('small', 'big', 'medium', 'new')]
+        self.small, self.big, self.medium, self.new = self.nodes
+        self.previous = ReadDataJsonTask.objects.create()
+        self.record_run(self.small, minutes=1, datasets=5)
+        self.record_run(self.big, minutes=60, datasets=500)
+        self.record_run(self.medium, minutes=10, datasets=50)
+
+    def record_run(self, node, minutes, datasets, task=None):
+        finished = timezone.now()
+        NodeIndexingProgress.objects.create(
+            task=task or self.previous, node=node, state=NodeIndexingProgress.FINISHED,
+            started=finished - timedelta(minutes=minutes), finished=finished, datasets=datasets)
+
+    def test_previous_costs_from_last_finished_reading(self):
+        costs = previous_costs(self.nodes)
+        self.assertEqual(costs[self.big.pk], (3600, 500))
+        self.assertNotIn(self.new.pk, costs)
+
+    def test_failed_readings_ignored(self):
+        task = ReadDataJsonTask.objects.create()
+        NodeIndexingProgress.objects.create(task=task, node=self.new,
+                                            state=NodeIndexingProgress.FAILED,
+                                            started=timezone.now())
+        self.assertNotIn(self.new.pk, previous_costs(self.nodes))
+
+    def test_longest_first_with_unknown_nodes_ahead(self):
+        plan = plan_readings(self.nodes, ['indexing'])
+        self.assertEqual([node for node, _ in plan], [self.new, self.big, self.medium, self.small])
+        self.assertEqual({queue for _, queue in plan}, {'indexing'})
+
+    def test_current_task_not_used_as_history(self):
+        task = ReadDataJsonTask.objects.create()
+        self.record_run(self.small, minutes=120, datasets=5, task=task)
+        plan = plan_readings(self.nodes, ['indexing'], exclude_task=task)
+        self.assertEqual(plan[-1][0], self.small)
+
+    def test_history_from_same_indexing_mode_only(self):
+        other_mode = ReadDataJsonTask.objects.create(indexing_mode=not self.previous.indexing_mode)
+        self.record_run(self.big, minutes=0, datasets=500, task=other_mode)
+        task = ReadDataJsonTask.objects.create(indexing_mode=self.previous.indexing_mode)
+        costs = previous_costs(self.nodes, exclude_task=task)
+        self.assertEqual(costs[self.big.pk], (3600, 500))
+
+    def test_readings_balanced_across_queues(self):
+        nodes = [self.big, self.medium, self.small]
+        plan = dict(plan_readings(nodes, ['indexing', 'indexing_small']))
+        self.assertEqual(plan[self.big], 'indexing')
+        self.assertEqual(plan[self.medium], 'indexing_small')
+        self.assertEqual(plan[self.small], 'indexing_small')
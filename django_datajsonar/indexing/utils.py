@@ -1,10 +1,20 @@
 #! coding: utf-8
+import hashlib
 import json
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, Value, When
+from django.db.models.functions import Cast
+
 from django_datajsonar.models import ReadDataJsonTask
+from django_datajsonar.models import Dataset, Distribution, Field
 
 
 def log_exception(task, msg, model, field_kw):
-    ReadDataJsonTask.info(task, msg)
+    ReadDataJsonTask.error(task, msg)
     try:
         error_model = model.objects.get(**field_kw)
         error_model.error = True
@@ -15,6 +25,81 @@ def log_exception(task, msg, model, field_kw):
         return None
 
 
+def catalog_querysets(catalog_model):
+    """Querysets de los datasets, distribuciones y fields del catálogo"""
+    return OrderedDict((
+        (Dataset, Dataset.objects.filter(catalog=catalog_model)),
+        (Distribution, Distribution.objects.filter(dataset__catalog=catalog_model)),
+        (Field, Field.objects.filter(distribution__dataset__catalog=catalog_model)),
+    ))
+
+
+def loader_settings():
+    """Settings que afectan a lo que el loader guarda de un catálogo"""
+    return (getattr(settings, 'DATAJSON_AR_TIME_SERIES_ONLY', False),
+            settings.CATALOG_BLACKLIST, settings.DATASET_BLACKLIST,
+            settings.DISTRIBUTION_BLACKLIST, settings.FIELD_BLACKLIST)
+
+
+def source_hash(source, *extra):
+    """Hash de la forma canónica (claves ordenadas, sin las claves listadas en
+    DATAJSON_AR_VOLATILE_KEYS) del diccionario 'source' y de los valores 'extra'
+    que afectan a su carga
+    """
+    volatile_keys = set(getattr(settings, 'DATAJSON_AR_VOLATILE_KEYS', []))
+    canonical = json.dumps([_without_keys(source, volatile_keys), extra],
+                           sort_keys=True, default=str)
+    return hashlib.sha512(canonical.encode('utf-8')).hexdigest()
+
+
+def _without_keys(value, keys):
+    if isinstance(value, dict):
+        return {key: _without_keys(item, keys)
+                for key, item in value.items() if key not in keys}
+    if isinstance(value, list):
+        return [_without_keys(item, keys) for item in value]
+    return value
+
+
 def update_model(trimmed_dict, model, updated_children=False, data_change=False):
     model.update_metadata(trimmed_dict, updated_children, data_change)
     model.save()
+
+
+@contextmanager
+def no_transaction():
+    """Contexto vacío, para correr sin transacción donde opcionalmente
+    se usaría transaction.atomic()
+    """
+    yield
+
+
+def chunks(items, size):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def bulk_update(model, objs, field_names, batch_size):
+    """Actualiza los campos 'field_names' de todas las instancias 'objs'
+    con un UPDATE ... SET campo = CASE pk WHEN ... por lote, en lugar de
+    un save() por instancia. Los valores se obtienen con pre_save, por lo
+    que los FileField no guardados se suben al storage igual que en save()
+    """
+    objs = [obj for obj in objs if obj.pk is not None]
+    if not objs:
+        return
+    fields = [model._meta.get_field(name) for name in field_names]
+    # Cada fila agrega un parámetro al filtro por pk y dos por campo (pk y valor)
+    max_batch_size = connection.ops.bulk_batch_size(['pk'] * (2 * len(fields) + 1), objs)
+    batch_size = min(batch_size, max_batch_size) if batch_size else max_batch_size
+    for batch in chunks(objs, max(batch_size, 1)):
+        updates = {}
+        for field in fields:
+            whens = [When(pk=obj.pk, then=Value(field.pre_save(obj, False), output_field=field))
+                     for obj in batch]
+            case = Case(*whens, output_field=field)
+            if connection.vendor == 'postgresql':
+                case = Cast(case, output_field=field)
+            updates[field.attname] = case
+        model.objects.filter(pk__in=[obj.pk for obj in batch]).update(**updates)
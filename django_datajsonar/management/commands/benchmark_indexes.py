@@ -0,0 +1,113 @@
+#! coding: utf-8
+import time
+from itertools import islice
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from django_datajsonar.models import Catalog, Dataset, Distribution, Field
+
+EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN',
+    'postgresql': 'EXPLAIN',
+    'mysql': 'EXPLAIN',
+}
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """Mide las consultas de los caminos críticos del loader y del admin
+    sobre una base sintética, y muestra su plan de ejecución. Los datos se
+    crean dentro de una transacción que se descarta al terminar"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--distributions', type=int, default=100000)
+        parser.add_argument('--distributions-per-dataset', type=int, default=10)
+        parser.add_argument('--fields-per-distribution', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            catalog = create_synthetic_catalog(options['distributions'],
+                                               options['distributions_per_dataset'],
+                                               options['fields_per_distribution'])
+            for name, queryset in hot_queries(catalog):
+                self.report(name, queryset, options['repeat'])
+            transaction.set_rollback(True)
+
+    def report(self, name, queryset, repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - start) / repeat
+        self.stdout.write('{}: {:.2f} ms, {} consultas'.format(
+            name, elapsed * 1000, len(queries) // repeat))
+        for line in explain(queryset):
+            self.stdout.write('    ' + line)
+
+
+def create_synthetic_catalog(distributions, distributions_per_dataset, fields_per_distribution):
+    """Catálogo con la cantidad pedida de distribuciones, repartidas en
+    datasets, y sus fields. Devuelve el modelo del catálogo
+    """
+    catalog = Catalog.objects.create(identifier='benchmark', title='benchmark', metadata='{}')
+    dataset_count = max(distributions // distributions_per_dataset, 1)
+    bulk_insert(Dataset, (
+        Dataset(catalog=catalog, identifier=str(i), title=str(i), metadata='{}',
+                indexable=i % 2 == 0, present=i % 10 != 0)
+        for i in range(dataset_count)))
+    dataset_ids = list(Dataset.objects.filter(catalog=catalog).values_list('pk', flat=True))
+    bulk_insert(Distribution, (
+        Distribution(dataset_id=dataset_ids[i % dataset_count], identifier='{}.{}'.format(i % dataset_count, i),
+                     title=str(i), download_url='http://benchmark.org/{}.csv'.format(i), metadata='{}')
+        for i in range(distributions)))
+    distribution_ids = Distribution.objects.filter(dataset__catalog=catalog).values_list('pk', flat=True)
+    bulk_insert(Field, (
+        Field(distribution_id=distribution_id, identifier=str(i), title='field_{}'.format(i), metadata='{}')
+        for distribution_id in distribution_ids.iterator() for i in range(fields_per_distribution)))
+    return catalog
+
+
+def bulk_insert(model, objs):
+    """bulk_create de a BATCH_SIZE instancias, sin armar la lista completa"""
+    objs = iter(objs)
+    batch = list(islice(objs, BATCH_SIZE))
+    while batch:
+        model.objects.bulk_create(batch)
+        batch = list(islice(objs, BATCH_SIZE))
+
+
+def hot_queries(catalog):
+    """Consultas del loader y del admin, como tuplas (nombre, queryset)"""
+    dataset = Dataset.objects.filter(catalog=catalog).order_by('-pk').first()
+    distribution = Distribution.objects.filter(dataset=dataset).first()
+    return [
+        ('loader: dataset por identificador',
+         Dataset.objects.filter(catalog=catalog, identifier=dataset.identifier)),
+        ('loader: distribución por identificador',
+         Distribution.objects.filter(dataset=dataset, identifier=distribution.identifier)),
+        ('loader: field por título e identificador',
+         Field.objects.filter(distribution=distribution, title='field_0', identifier='0')),
+        ('loader: distribuciones presentes del dataset',
+         Distribution.objects.filter(dataset=dataset, present=True)),
+        ('admin: datasets federados del catálogo',
+         Dataset.objects.filter(catalog=catalog, indexable=True, present=True).order_by('-pk')[:100]),
+        ('admin: datasets en revisión',
+         Dataset.objects.filter(reviewed=Dataset.ON_REVISION).order_by('-pk')[:100]),
+        ('admin: búsqueda de distribución',
+         Distribution.objects.filter(identifier=distribution.identifier)),
+    ]
+
+
+def explain(queryset):
+    """Plan de ejecución de la consulta del queryset, como líneas de texto"""
+    prefix = EXPLAIN_PREFIXES.get(connection.vendor)
+    if prefix is None:
+        return []
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('{} {}'.format(prefix, sql), params)
+        return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 18:31
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_datajsonar', '0021_merge_20191105_1658'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indexingconfig',
+            name='bulk_loading',
+            field=models.BooleanField(default=False, help_text='Carga los catálogos con bulk_create/bulk_update en lugar de guardar cada dataset, distribución y field por separado', verbose_name='Bulk loading'),
+        ),
+    ]
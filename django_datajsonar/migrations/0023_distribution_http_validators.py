@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 18:36
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_datajsonar', '0022_indexingconfig_bulk_loading'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='distribution',
+            name='data_content_length',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='distribution',
+            name='data_etag',
+            field=models.CharField(blank=True, default='', max_length=512),
+        ),
+        migrations.AddField(
+            model_name='distribution',
+            name='data_last_modified',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 18:41
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('django_datajsonar', '0023_distribution_http_validators'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskLogEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('level', models.CharField(choices=[('INFO', 'Info'), ('ERROR', 'Error')], default='INFO', max_length=10)),
+                ('msg', models.TextField()),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType')),
+                ('node', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='django_datajsonar.Node')),
+            ],
+            options={
+                'verbose_name': 'Task log entries',
+                'verbose_name_plural': 'Task log entries',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='tasklogentry',
+            index_together=set([('content_type', 'object_id')]),
+        ),
+    ]
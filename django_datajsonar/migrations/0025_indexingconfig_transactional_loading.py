@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 18:46
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_datajsonar', '0024_tasklogentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indexingconfig',
+            name='transactional_loading',
+            field=models.BooleanField(default=False, help_text='Carga cada catálogo en una única transacción, con un savepoint por dataset, de manera que no se vean catálogos cargados a medias', verbose_name='Transactional loading'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 18:48
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_datajsonar', '0025_indexingconfig_transactional_loading'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalog',
+            name='source_hash',
+            field=models.CharField(blank=True, default='', max_length=128),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 18:57
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_datajsonar', '0027_dataset_source_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NodeIndexingProgress',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('state', models.CharField(choices=[('PENDING', 'Encolado'), ('RUNNING', 'Leyendo catálogo'), ('FINISHED', 'Finalizado'), ('FAILED', 'Fallido')], default='PENDING', max_length=20)),
+                ('enqueued', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started', models.DateTimeField(blank=True, null=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                ('datasets', models.PositiveIntegerField(default=0)),
+                ('distributions', models.PositiveIntegerField(default=0)),
+                ('fields', models.PositiveIntegerField(default=0)),
+                ('bytes_downloaded', models.BigIntegerField(default=0)),
+                ('node', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='django_datajsonar.Node')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='node_progress', to='django_datajsonar.ReadDataJsonTask')),
+            ],
+            options={
+                'verbose_name': 'Node indexing progress',
+                'verbose_name_plural': 'Node indexing progress',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='nodeindexingprogress',
+            unique_together=set([('task', 'node')]),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 19:07
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_datajsonar', '0028_nodeindexingprogress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indexingconfig',
+            name='split_jobs',
+            field=models.BooleanField(default=False, help_text='Descarga los archivos de las distribuciones y genera los archivos del catálogo en jobs separados de la carga de metadatos, en sus propias colas', verbose_name='Split jobs'),
+        ),
+        migrations.AddField(
+            model_name='nodeindexingprogress',
+            name='failed_jobs',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='nodeindexingprogress',
+            name='pending_jobs',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
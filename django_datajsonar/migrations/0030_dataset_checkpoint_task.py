@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 19:11
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_datajsonar', '0029_split_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='checkpoint_task',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 19:22
+from __future__ import unicode_literals
+
+import json
+
+from django.db import migrations, models
+
+from django_datajsonar.models.data_json_entity_mixin import metadata_column_values
+
+BATCH_SIZE = 500
+
+METADATA_COLUMNS = {
+    'Catalog': {'publisher_name': ('publisher', 'name')},
+    'Dataset': {
+        'description': ('description',),
+        'publisher_name': ('publisher', 'name'),
+        'publisher_mbox': ('publisher', 'mbox'),
+        'source': ('source',),
+        'theme': ('theme',),
+        'super_theme': ('superTheme',),
+        'license': ('license',),
+    },
+    'Distribution': {
+        'description': ('description',),
+        'access_url': ('accessURL',),
+        'type': ('type',),
+        'format': ('format',),
+    },
+}
+
+
+def fill_metadata_columns(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    for model_name, columns in METADATA_COLUMNS.items():
+        model = apps.get_model('django_datajsonar', model_name)
+        queryset = model.objects.using(db_alias).exclude(metadata='').order_by('pk')
+        last_pk = 0
+        while True:
+            rows = list(queryset.filter(pk__gt=last_pk).values_list('pk', 'metadata')[:BATCH_SIZE])
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            for pk, metadata in rows:
+                try:
+                    metadata = json.loads(metadata)
+                except ValueError:
+                    continue
+                if isinstance(metadata, dict):
+                    model.objects.using(db_alias).filter(pk=pk).update(
+                        **metadata_column_values(model._meta, columns, metadata))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_datajsonar', '0030_dataset_checkpoint_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalog',
+            name='publisher_name',
+            field=models.CharField(blank=True, db_index=True, max_length=300, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='license',
+            field=models.CharField(blank=True, db_index=True, max_length=300, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='publisher_mbox',
+            field=models.CharField(blank=True, max_length=300, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='publisher_name',
+            field=models.CharField(blank=True, db_index=True, max_length=300, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='source',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='super_theme',
+            field=models.CharField(blank=True, db_index=True, max_length=300, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='theme',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='distribution',
+            name='access_url',
+            field=models.URLField(blank=True, max_length=1024, null=True),
+        ),
+        migrations.AddField(
+            model_name='distribution',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='distribution',
+            name='format',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='distribution',
+            name='type',
+            field=models.CharField(blank=True, db_index=True, max_length=50, null=True),
+        ),
+        migrations.RunPython(fill_metadata_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 19:29
+from __future__ import unicode_literals
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def remove_duplicates(apps, schema_editor):
+    """Borra las filas repetidas antes de agregar las restricciones de
+    unicidad, conservando la más antigua de cada clave
+    """
+    db_alias = schema_editor.connection.alias
+    for model_name, key in (('Dataset', ('catalog', 'identifier')),
+                            ('Distribution', ('dataset', 'identifier'))):
+        model = apps.get_model('django_datajsonar', model_name)
+        duplicates = model.objects.using(db_alias).values(*key)\
+            .annotate(count=Count('id'), first=Min('id')).filter(count__gt=1)
+        for duplicate in duplicates:
+            lookup = {field: duplicate[field] for field in key}
+            model.objects.using(db_alias).filter(**lookup).exclude(id=duplicate['first']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_datajsonar', '0032_identifier_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 19:29
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_datajsonar', '0033_remove_duplicate_entities'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='dataset',
+            unique_together=set([('catalog', 'identifier')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='distribution',
+            unique_together=set([('dataset', 'identifier')]),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=models.Index(fields=['catalog', 'indexable', 'present'], name='dataset_federation_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=models.Index(fields=['reviewed', 'last_reviewed'], name='dataset_reviewed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='distribution',
+            index=models.Index(fields=['dataset', 'present'], name='distribution_present_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='field',
+            index=models.Index(fields=['distribution', 'title', 'identifier'], name='field_lookup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='field',
+            index=models.Index(fields=['distribution', 'present'], name='field_present_idx'),
+        ),
+    ]
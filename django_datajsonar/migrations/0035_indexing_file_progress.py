@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 19:35
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_datajsonar', '0034_loader_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasetindexingfile',
+            name='failed_rows',
+            field=models.PositiveIntegerField(default=0, verbose_name='filas con error'),
+        ),
+        migrations.AddField(
+            model_name='datasetindexingfile',
+            name='federated_datasets',
+            field=models.PositiveIntegerField(default=0, verbose_name='datasets federados'),
+        ),
+        migrations.AddField(
+            model_name='datasetindexingfile',
+            name='processed_rows',
+            field=models.PositiveIntegerField(default=0, verbose_name='filas procesadas'),
+        ),
+    ]
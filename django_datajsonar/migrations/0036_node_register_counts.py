@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 19:38
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_datajsonar', '0035_indexing_file_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='noderegisterfile',
+            name='created_nodes',
+            field=models.PositiveIntegerField(default=0, verbose_name='nodos creados'),
+        ),
+        migrations.AddField(
+            model_name='noderegisterfile',
+            name='failed_nodes',
+            field=models.PositiveIntegerField(default=0, verbose_name='nodos con error'),
+        ),
+        migrations.AddField(
+            model_name='noderegisterfile',
+            name='skipped_nodes',
+            field=models.PositiveIntegerField(default=0, verbose_name='nodos omitidos'),
+        ),
+    ]
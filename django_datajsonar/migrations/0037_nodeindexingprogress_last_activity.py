@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 19:56
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_datajsonar', '0036_node_register_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nodeindexingprogress',
+            name='last_activity',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 20:00
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_datajsonar', '0037_nodeindexingprogress_last_activity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tasklogentry',
+            name='written',
+            field=models.BooleanField(default=False),
+        ),
+    ]
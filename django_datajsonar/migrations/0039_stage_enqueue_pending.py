@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 20:13
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_datajsonar', '0038_tasklogentry_written'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stage',
+            name='enqueue_pending',
+            field=models.BooleanField(default=False),
+        ),
+    ]
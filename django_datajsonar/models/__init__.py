@@ -2,7 +2,7 @@
 from .utils import filepath, get_distribution_storage
 from .data_json import Catalog, Dataset, Distribution, Field
 from .metadata import Metadata, ProjectMetadata, Language, Publisher, Spatial
-from .tasks import ReadDataJsonTask, AbstractTask
+from .tasks import ReadDataJsonTask, AbstractTask, TaskLogEntry, NodeIndexingProgress
 from .synchronizer import Synchronizer
 from .stage import Stage
 from .node import Node, NodeMetadata, NodeRegisterFile,\
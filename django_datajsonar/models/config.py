@@ -1,3 +1,4 @@
+#! coding: utf-8
 from django.db import models
 from solo.models import SingletonModel
 
@@ -5,3 +6,15 @@ from solo.models import SingletonModel
 class IndexingConfig(SingletonModel):
 
     verify_ssl = models.BooleanField(default=False, verbose_name='Verify SSL')
+    bulk_loading = models.BooleanField(
+        default=False, verbose_name='Bulk loading',
+        help_text='Carga los catálogos con bulk_create/bulk_update en lugar de '
+                  'guardar cada dataset, distribución y field por separado')
+    transactional_loading = models.BooleanField(
+        default=False, verbose_name='Transactional loading',
+        help_text='Carga cada catálogo en una única transacción, con un savepoint '
+                  'por dataset, de manera que no se vean catálogos cargados a medias')
+    split_jobs = models.BooleanField(
+        default=False, verbose_name='Split jobs',
+        help_text='Descarga los archivos de las distribuciones y genera los archivos del '
+                  'catálogo en jobs separados de la carga de metadatos, en sus propias colas')
@@ -13,6 +13,12 @@ class Catalog(DataJsonEntityMixin):
     title = models.CharField(max_length=200)
     identifier = models.CharField(max_length=200, unique=True)
     enhanced_meta = GenericRelation(Metadata, null=True)
+    # Hash del catálogo fuente cargado en la última corrida exitosa
+    source_hash = models.CharField(max_length=128, blank=True, default='')
+
+    publisher_name = models.CharField(max_length=300, blank=True, null=True, db_index=True)
+
+    METADATA_COLUMNS = {'publisher_name': ('publisher', 'name')}
 
     def __unicode__(self):
         return u'%s (%s)' % (self.title, self.identifier)
@@ -22,6 +28,12 @@ class Catalog(DataJsonEntityMixin):
 
 
 class Dataset(DataJsonEntityMixin):
+    class Meta:
+        unique_together = ('catalog', 'identifier')
+        indexes = [
+            models.Index(fields=['catalog', 'indexable', 'present'], name='dataset_federation_idx'),
+            models.Index(fields=['reviewed', 'last_reviewed'], name='dataset_reviewed_idx'),
+        ]
 
     REVIEWED = "REVIEWED"
     ON_REVISION = "ON_REVISION"
@@ -34,7 +46,7 @@ class Dataset(DataJsonEntityMixin):
     )
 
     title = models.CharField(max_length=200)
-    identifier = models.CharField(max_length=200)
+    identifier = models.CharField(max_length=200, db_index=True)
     catalog = models.ForeignKey(to=Catalog, on_delete=models.CASCADE)
     landing_page = models.URLField(blank=True, null=True)
     indexable = models.BooleanField(default=False, verbose_name='federable')
@@ -45,6 +57,28 @@ class Dataset(DataJsonEntityMixin):
     last_reviewed = models.DateField(null=True, blank=True, default=None)
 
     themes = models.TextField(blank=True, null=True)
+    # Hash del dataset fuente (con sus distribuciones y fields) de la última carga sin errores
+    source_hash = models.CharField(max_length=128, blank=True, default='')
+    # Id de la ReadDataJsonTask que cargó completo al dataset por última vez
+    checkpoint_task = models.PositiveIntegerField(null=True, blank=True)
+
+    description = models.TextField(blank=True, null=True)
+    publisher_name = models.CharField(max_length=300, blank=True, null=True, db_index=True)
+    publisher_mbox = models.CharField(max_length=300, blank=True, null=True)
+    source = models.TextField(blank=True, null=True)
+    theme = models.TextField(blank=True, null=True)
+    super_theme = models.CharField(max_length=300, blank=True, null=True, db_index=True)
+    license = models.CharField(max_length=300, blank=True, null=True, db_index=True)
+
+    METADATA_COLUMNS = {
+        'description': ('description',),
+        'publisher_name': ('publisher', 'name'),
+        'publisher_mbox': ('publisher', 'mbox'),
+        'source': ('source',),
+        'theme': ('theme',),
+        'super_theme': ('superTheme',),
+        'license': ('license',),
+    }
 
     enhanced_meta = GenericRelation(Metadata)
 
@@ -56,12 +90,22 @@ class Dataset(DataJsonEntityMixin):
 
 
 class Distribution(DataJsonEntityMixin):
-    identifier = models.CharField(max_length=200)
+    class Meta:
+        unique_together = ('dataset', 'identifier')
+        indexes = [
+            models.Index(fields=['dataset', 'present'], name='distribution_present_idx'),
+        ]
+
+    identifier = models.CharField(max_length=200, db_index=True)
     title = models.CharField(max_length=200)
     dataset = models.ForeignKey(to=Dataset, on_delete=models.CASCADE)
     download_url = models.URLField(max_length=1024, null=True)
     data_hash = models.CharField(max_length=128, default='')
     last_updated = models.DateTimeField(blank=True, null=True)
+    # Validadores HTTP de la última descarga, para pedidos condicionales
+    data_etag = models.CharField(max_length=512, blank=True, default='')
+    data_last_modified = models.CharField(max_length=64, blank=True, default='')
+    data_content_length = models.BigIntegerField(blank=True, null=True)
 
     data_file = models.FileField(
         storage=get_distribution_storage(),
@@ -69,6 +113,19 @@ class Distribution(DataJsonEntityMixin):
         upload_to=filepath,
         blank=True
     )
+
+    description = models.TextField(blank=True, null=True)
+    access_url = models.URLField(max_length=1024, blank=True, null=True)
+    type = models.CharField(max_length=50, blank=True, null=True, db_index=True)
+    format = models.CharField(max_length=100, blank=True, null=True, db_index=True)
+
+    METADATA_COLUMNS = {
+        'description': ('description',),
+        'access_url': ('accessURL',),
+        'type': ('type',),
+        'format': ('format',),
+    }
+
     enhanced_meta = GenericRelation(Metadata)
 
     def __unicode__(self):
@@ -79,6 +136,12 @@ class Distribution(DataJsonEntityMixin):
 
 
 class Field(DataJsonEntityMixin):
+    class Meta:
+        indexes = [
+            models.Index(fields=['distribution', 'title', 'identifier'], name='field_lookup_idx'),
+            models.Index(fields=['distribution', 'present'], name='field_present_idx'),
+        ]
+
     title = models.CharField(max_length=200, null=True)
     identifier = models.CharField(max_length=200, null=True)
     distribution = models.ForeignKey(to=Distribution, on_delete=models.CASCADE)
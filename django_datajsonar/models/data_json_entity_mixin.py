@@ -21,6 +21,10 @@ class DataJsonEntityMixin(models.Model):
 
     issued = models.DateTimeField(null=True, blank=True)
 
+    # Columnas que replican claves de uso frecuente de 'metadata', para
+    # leerlas sin parsear el JSON: {columna: ruta de claves en el diccionario}
+    METADATA_COLUMNS = {}
+
     def update_metadata(self, new_metadata: dict, updated_children=False, data_change=False):
         previous_meta = self.get_metadata()
         updated = (new_metadata != previous_meta or data_change or updated_children)
@@ -34,6 +38,33 @@ class DataJsonEntityMixin(models.Model):
                                              default_timezone=dateutil.tz.gettz(DEFAULT_TIME_ZONE))
         else:
             self.issued = timezone.now()
+        self.update_metadata_columns(new_metadata)
+
+    def update_metadata_columns(self, metadata: dict):
+        for column, value in metadata_column_values(self._meta, self.METADATA_COLUMNS,
+                                                    metadata).items():
+            setattr(self, column, value)
 
     def get_metadata(self):
         return json.loads(self.metadata or '{}')
+
+
+def metadata_column_values(model_meta, metadata_columns, metadata: dict):
+    """Valores de las columnas de metadata_columns ({columna: ruta de
+    claves}) tomados de metadata. Las listas se guardan separadas por comas,
+    y los textos se recortan al largo máximo de la columna
+    """
+    result = {}
+    for column, path in metadata_columns.items():
+        value = metadata
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        if isinstance(value, list):
+            value = ','.join(str(item) for item in value)
+        elif value is not None:
+            value = str(value)
+        max_length = model_meta.get_field(column).max_length
+        if value is not None and max_length:
+            value = value[:max_length]
+        result[column] = value
+    return result
@@ -47,6 +47,11 @@ class BaseRegisterFile(models.Model):
 
 
 class NodeRegisterFile(BaseRegisterFile):
+    # Resultado del último procesamiento del archivo
+    created_nodes = models.PositiveIntegerField(default=0, verbose_name='nodos creados')
+    skipped_nodes = models.PositiveIntegerField(default=0, verbose_name='nodos omitidos')
+    failed_nodes = models.PositiveIntegerField(default=0, verbose_name='nodos con error')
+
     def __unicode__(self):
         return "Node register file: {}".format(self.created)
 
@@ -58,6 +63,16 @@ class DatasetIndexingFile(BaseRegisterFile):
     class Meta:
         verbose_name = 'Dataset federation file'
 
+    # Avance del procesamiento, actualizado al terminar cada lote de filas
+    processed_rows = models.PositiveIntegerField(default=0, verbose_name='filas procesadas')
+    federated_datasets = models.PositiveIntegerField(default=0, verbose_name='datasets federados')
+    failed_rows = models.PositiveIntegerField(default=0, verbose_name='filas con error')
+
+    def update_progress(self, counts):
+        DatasetIndexingFile.objects.filter(pk=self.pk).update(
+            processed_rows=counts['rows'], federated_datasets=counts['federated'],
+            failed_rows=counts['errors'])
+
     def __unicode__(self):
         return "Indexing file: {}".format(self.created)
 
@@ -3,7 +3,7 @@
 from __future__ import unicode_literals
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
 
 from django_datajsonar.models import AbstractTask
 from django_datajsonar.utils.utils import import_string, pending_or_running_jobs
@@ -26,6 +26,8 @@ class Stage(models.Model):
     next_stage = models.ForeignKey('self', null=True, blank=True,
                                    on_delete=models.SET_NULL)
     task = models.CharField(max_length=200, blank=True)
+    # La etapa se abrió pero su job todavía no se encoló: no puede darse por terminada
+    enqueue_pending = models.BooleanField(default=False)
 
     def get_running_task(self):
         if self.task:
@@ -39,10 +41,23 @@ class Stage(models.Model):
             return None
 
     def open_stage(self, node=None):
+        """Encola el job de la etapa. Dentro de una transacción se encola
+        recién al confirmarla, para que el worker no lo tome antes de que
+        se guarde el estado, y para que no quede encolado si se revierte.
+        Hasta entonces la etapa queda con enqueue_pending, para que otro
+        proceso no la vea con la cola vacía y la dé por terminada
+        """
         job = import_string(self.callable_str)
-        job.delay(node)
+
+        def enqueue():
+            job.delay(node)
+            self.enqueue_pending = False
+            Stage.objects.filter(pk=self.pk).update(enqueue_pending=False)
+
         self.status = Stage.ACTIVE
+        self.enqueue_pending = True
         self.save()
+        transaction.on_commit(enqueue)
 
     def close_stage(self):
         task = self.get_running_task()
@@ -54,7 +69,7 @@ class Stage(models.Model):
         self.save()
 
     def check_completion(self):
-        return not pending_or_running_jobs(self.queue)
+        return not self.enqueue_pending and not pending_or_running_jobs(self.queue)
 
     def clean(self):
         errors = {}
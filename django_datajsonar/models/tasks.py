@@ -1,13 +1,108 @@
 #! coding: utf-8
 from __future__ import unicode_literals
 
+import threading
+from datetime import timedelta
+
 from django.conf import settings
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
+from django.contrib.contenttypes.models import ContentType
 from django.db import models, transaction
+from django.db.models import Value
+from django.db.models.functions import Concat
 from django.utils import timezone
 
 from django_datajsonar.models.node import Node
 
 
+class TaskLogEntry(models.Model):
+    """Línea de log de una tarea. Se insertan sin tocar la fila de la
+    tarea, por lo que varios jobs concurrentes pueden loguear en la misma
+    tarea sin bloquearse entre sí
+    """
+    class Meta:
+        verbose_name = verbose_name_plural = 'Task log entries'
+        ordering = ('id',)
+        index_together = ('content_type', 'object_id')
+
+    INFO = "INFO"
+    ERROR = "ERROR"
+
+    LEVEL_CHOICES = (
+        (INFO, "Info"),
+        (ERROR, "Error"),
+    )
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    task = GenericForeignKey()
+
+    created = models.DateTimeField(default=timezone.now)
+    level = models.CharField(max_length=10, choices=LEVEL_CHOICES, default=INFO)
+    node = models.ForeignKey(to=Node, null=True, blank=True, on_delete=models.SET_NULL)
+    msg = models.TextField()
+    # Si la entrada ya se agregó al campo 'logs' de su tarea
+    written = models.BooleanField(default=False)
+
+    def __unicode__(self):
+        return self.msg
+
+    def __str__(self):
+        return self.__unicode__()
+
+
+class TaskLogBuffer:
+    """Acumula las entradas de log de una tarea y las inserta con
+    bulk_create cada 'size' entradas y al salir del bloque with. Mientras
+    está activo, AbstractTask.info de esa tarea escribe en el buffer, y las
+    entradas sin nodo explícito se asocian a 'node'
+    """
+    _active = threading.local()
+
+    def __init__(self, task, node=None, size=None):
+        self.task = task
+        self.node = node
+        self.size = size or getattr(settings, 'DATAJSON_AR_TASK_LOG_BUFFER_SIZE', 100)
+        self.entries = []
+        self.previous = None
+
+    @classmethod
+    def get_active(cls, task):
+        buffers = getattr(cls._active, 'buffers', {})
+        return buffers.get(cls._key(task))
+
+    def add(self, entry):
+        if entry.node is None:
+            entry.node = self.node
+        self.entries.append(entry)
+        if len(self.entries) >= self.size:
+            self.flush()
+
+    def flush(self):
+        TaskLogEntry.objects.bulk_create(self.entries)
+        self.entries = []
+
+    def __enter__(self):
+        if not hasattr(self._active, 'buffers'):
+            self._active.buffers = {}
+        self.previous = self._active.buffers.get(self._key(self.task))
+        self._active.buffers[self._key(self.task)] = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self.flush()
+        finally:
+            if self.previous is None:
+                del self._active.buffers[self._key(self.task)]
+            else:
+                self._active.buffers[self._key(self.task)] = self.previous
+
+    @staticmethod
+    def _key(task):
+        return task.__class__, task.pk
+
+
 class AbstractTask(models.Model):
 
     DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
@@ -26,13 +121,26 @@ class AbstractTask(models.Model):
 
     node = models.ForeignKey(to=Node, default=None, null=True, blank=True)
 
+    log_entries = GenericRelation(TaskLogEntry)
+
     def save(self, force_insert=False, force_update=False, using=None,
              update_fields=None):
         if not self.pk:  # first time only
             self.status = self.RUNNING
 
+        finishing = False
+        if self.pk and not self._state.adding:
+            finishing = self.status == self.FINISHED and self.__class__.objects\
+                .filter(pk=self.pk).exclude(status=self.FINISHED).exists()
+            if update_fields is None:
+                # 'logs' solo se escribe con write_logs: la copia en memoria puede estar desactualizada
+                update_fields = [field.name for field in self._meta.concrete_fields
+                                 if not field.primary_key and field.name != 'logs']
+
         super(AbstractTask, self).save(force_insert, force_update,
                                        using, update_fields)
+        if finishing:
+            self.write_logs()
 
     def __unicode__(self):
         return "Task at %s" % self._format_date(self.created)
@@ -44,11 +152,44 @@ class AbstractTask(models.Model):
         return timezone.localtime(date).strftime(self.DATE_FORMAT)
 
     @classmethod
-    def info(cls, task, msg):
+    def info(cls, task, msg, node=None, level=TaskLogEntry.INFO):
+        entry = TaskLogEntry(content_type=ContentType.objects.get_for_model(task),
+                             object_id=task.pk, node=node, level=level, msg=msg)
+        log_buffer = TaskLogBuffer.get_active(task)
+        if log_buffer is not None:
+            log_buffer.add(entry)
+        else:
+            entry.save()
+
+    @classmethod
+    def error(cls, task, msg, node=None):
+        cls.info(task, msg, node=node, level=TaskLogEntry.ERROR)
+
+    @classmethod
+    def log_buffer(cls, task, node=None):
+        return TaskLogBuffer(task, node)
+
+    def get_logs(self):
+        """Arma el texto completo de los logs: el campo 'logs' seguido de
+        las entradas de TaskLogEntry que todavía no se escribieron en él
+        """
+        entries = self.log_entries.filter(written=False).order_by('id').values_list('msg', flat=True)
+        return self.logs + ''.join(msg + '\n' for msg in entries.iterator())
+
+    def write_logs(self):
+        """Agrega al campo 'logs' las entradas de TaskLogEntry que todavía
+        no se escribieron en él. Se llama al finalizar la tarea
+        """
         with transaction.atomic():
-            task = cls.objects.select_for_update().get(id=task.id)
-            task.logs += msg + '\n'
-            task.save()
+            entries = self.log_entries.select_for_update().filter(written=False).order_by('id')
+            rows = list(entries.values_list('id', 'msg'))
+            if not rows:
+                return
+            text = ''.join(msg + '\n' for _, msg in rows)
+            entries.filter(id__lte=rows[-1][0]).update(written=True)
+            self.__class__.objects.filter(pk=self.pk).update(
+                logs=Concat('logs', Value(text), output_field=models.TextField()))
+        self.logs += text
 
     class Meta:
         abstract = True
@@ -67,3 +208,133 @@ class ReadDataJsonTask(AbstractTask):
     default_mode = getattr(settings, 'DATAJSON_AR_DOWNLOAD_RESOURCES', True)
     indexing_mode = models.BooleanField(choices=INDEXING_CHOICES,
                                         default=default_mode)
+
+    def finish_if_complete(self):
+        """Marca la tarea como finalizada si ya terminaron las lecturas de
+        todos sus nodos. Devuelve True si la tarea quedó finalizada
+        """
+        unfinished = (NodeIndexingProgress.PENDING, NodeIndexingProgress.RUNNING)
+        if self.node_progress.filter(state__in=unfinished).exists():
+            return False
+        now = timezone.now()
+        finished = ReadDataJsonTask.objects.filter(pk=self.pk, status=self.RUNNING)\
+            .update(status=self.FINISHED, finished=now)
+        self.refresh_from_db(fields=['status', 'finished'])
+        if finished:
+            self.write_logs()
+        return True
+
+
+class NodeIndexingProgress(models.Model):
+    """Avance de la lectura de un nodo dentro de una ReadDataJsonTask"""
+    class Meta:
+        verbose_name = verbose_name_plural = 'Node indexing progress'
+        unique_together = ('task', 'node')
+
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    FINISHED = "FINISHED"
+    FAILED = "FAILED"
+
+    STATE_CHOICES = (
+        (PENDING, "Encolado"),
+        (RUNNING, "Leyendo catálogo"),
+        (FINISHED, "Finalizado"),
+        (FAILED, "Fallido"),
+    )
+
+    task = models.ForeignKey(to=ReadDataJsonTask, on_delete=models.CASCADE,
+                             related_name='node_progress')
+    node = models.ForeignKey(to=Node, on_delete=models.CASCADE)
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default=PENDING)
+    enqueued = models.DateTimeField(default=timezone.now)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    # Último avance: inicio de la lectura, fin de la carga de metadatos o de un job posterior
+    last_activity = models.DateTimeField(null=True, blank=True)
+
+    datasets = models.PositiveIntegerField(default=0)
+    distributions = models.PositiveIntegerField(default=0)
+    fields = models.PositiveIntegerField(default=0)
+    bytes_downloaded = models.BigIntegerField(default=0)
+    # Jobs posteriores a la carga de metadatos (descargas y archivos del catálogo)
+    pending_jobs = models.PositiveIntegerField(default=0)
+    failed_jobs = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def start(cls, task, node):
+        now = timezone.now()
+        progress, _ = cls.objects.update_or_create(
+            task=task, node=node,
+            defaults={'state': cls.RUNNING, 'started': now, 'last_activity': now, 'finished': None})
+        return progress
+
+    def finish(self, failed=False, **stats):
+        """Guarda el estado final y las cantidades de entidades cargadas y
+        bytes descargados
+        """
+        self.state = self.FAILED if failed else self.FINISHED
+        self.finished = timezone.now()
+        for name, value in stats.items():
+            setattr(self, name, value)
+        self.save()
+
+    def defer(self, pending_jobs, failed=False, **stats):
+        """Guarda las cantidades cargadas y deja la lectura corriendo hasta
+        que terminen sus 'pending_jobs' jobs posteriores
+        """
+        self.pending_jobs = pending_jobs
+        self.failed_jobs = int(failed)
+        self.last_activity = timezone.now()
+        for name, value in stats.items():
+            setattr(self, name, value)
+        self.save()
+
+    @classmethod
+    def job_done(cls, progress_id, failed=False, bytes_downloaded=0):
+        """Registra el fin de un job posterior de la lectura. El último en
+        terminar finaliza la lectura, como fallida si falló alguno.
+        Devuelve True si la lectura quedó finalizada
+        """
+        with transaction.atomic():
+            progress = cls.objects.select_for_update().get(pk=progress_id)
+            progress.pending_jobs = max(progress.pending_jobs - 1, 0)
+            progress.failed_jobs += int(failed)
+            progress.bytes_downloaded += bytes_downloaded
+            progress.last_activity = timezone.now()
+            if progress.pending_jobs or progress.state != cls.RUNNING:
+                progress.save()
+                return False
+            progress.finish(failed=bool(progress.failed_jobs))
+        return True
+
+    @classmethod
+    def expire_stale(cls, task, pending_jobs, running_jobs=0):
+        """Marca como fallidas las lecturas que no van a terminar: las que
+        no avanzan hace más que el timeout del job, las que tienen jobs
+        posteriores sin terminar si ya no quedan trabajos encolados, y las
+        encoladas si tampoco quedan trabajos corriendo (un worker puede
+        haber tomado el job sin haber empezado la lectura todavía)
+        """
+        now = timezone.now()
+        limit = now - timedelta(seconds=getattr(settings, 'INDEX_CATALOG_TIMEOUT', 1800))
+        timed_out = models.Q(state=cls.RUNNING) & (
+            models.Q(last_activity__lt=limit) |
+            models.Q(last_activity__isnull=True, started__lt=limit))
+        stale = timed_out & models.Q(pending_jobs=0)
+        if not pending_jobs:
+            stale |= timed_out
+            if not running_jobs:
+                stale |= models.Q(state=cls.PENDING)
+        task.node_progress.filter(stale).update(state=cls.FAILED, finished=now)
+
+    def duration(self):
+        if self.started is None:
+            return None
+        return (self.finished or timezone.now()) - self.started
+
+    def __unicode__(self):
+        return '{} ({})'.format(self.node, self.get_state_display())
+
+    def __str__(self):
+        return self.__unicode__()
@@ -2,6 +2,10 @@
 CATALOG_STATUS = u"Catalogo {}, status: {}"
 DATASET_STATUS = u"Dataset ({}, {}) status: {}"
 FILE_READ_ERROR = u"Error en la lectura del archivo de entrada"
+NODE_SAVED = u" - Guardado Node Indexing File {}"
+NODE_SAVE_ERROR = u" - Error guardando Node Indexing File {} - {}"
+NODE_SKIPPED = u" - Omitido Node Indexing File {}"
+NODE_REGISTER_COUNTS = u"Nodos creados: {}, omitidos: {}, con error: {}"
 
 SYNCHRO_DAILY_FREQUENCY = 'every day'
 SYNCHRO_WEEK_DAYS_FREQUENCY = 'week days'
@@ -2,10 +2,11 @@
 from __future__ import unicode_literals
 
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 
 from django_datajsonar.task_closer import TaskCloser
-from django_datajsonar.utils.utils import import_string
+from django_datajsonar.utils.utils import import_string, queue_group, queue_status
 from .models import Synchronizer, Stage
 
 
@@ -16,14 +17,36 @@ def upkeep():
     """
     start_synchros()
 
-    synchronizers = Synchronizer.objects.filter(status=Synchronizer.RUNNING)
-    for synchro in synchronizers:
-        if synchro.check_completion():
-            synchro.next_stage()
+    advance_synchros(Synchronizer.objects.filter(status=Synchronizer.RUNNING))
 
     close_opened_tasks()
 
 
+def on_job_finished(queue_name):
+    """Llamada por el worker al terminar cada trabajo de la cola 'queue_name'.
+    Si la cola (y las que comparten su etapa) quedó sin trabajos pendientes ni corriendo, avanza a la
+    siguiente etapa a los synchronizers cuya etapa actual corre en esas colas
+    """
+    queues = queue_group(queue_name)
+    if not all(queue_status(queue).idle for queue in queues):
+        return
+
+    advance_synchros(Synchronizer.objects.filter(status=Synchronizer.RUNNING,
+                                                 actual_stage__queue__in=queues))
+
+
+def advance_synchros(synchronizers):
+    """Avanza de etapa a los synchronizers cuya etapa actual terminó. Cada
+    uno se bloquea mientras se chequea, para que el upkeep y los workers
+    no lo avancen dos veces
+    """
+    for synchro_id in synchronizers.values_list('id', flat=True):
+        with transaction.atomic():
+            synchro = Synchronizer.objects.select_for_update().get(id=synchro_id)
+            if synchro.status == Synchronizer.RUNNING and synchro.check_completion():
+                synchro.next_stage()
+
+
 def close_opened_tasks():
     task_closer = TaskCloser()
     for stage_settings in settings.DATAJSONAR_STAGES.values():
@@ -9,7 +9,10 @@ class TaskCloser:
 
     def close_all_opened(self, task_model):
         if not self.has_jobs_in_queue(task_model):
+            running = list(task_model.objects.filter(status=AbstractTask.RUNNING))
             task_model.objects.update(status=AbstractTask.FINISHED)
+            for task in running:
+                task.write_logs()
 
     def has_jobs_in_queue(self, task_model):
         return self.task_jobs(task_model)
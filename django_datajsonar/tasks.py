@@ -1,17 +1,22 @@
 #! coding: utf-8
 
 import logging
-import yaml
+from collections import Counter
 
 from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
 
-from django_rq import job
+from django_rq import get_queue, job
 
 from django_datajsonar.actions import DatasetIndexableToggler
+from django_datajsonar.indexing.scheduling import plan_readings
 from django_datajsonar.indexing.tasks import close_read_datajson_task
 from django_datajsonar.models import Node, DatasetIndexingFile, NodeRegisterFile, \
-    ReadDataJsonTask
-from django_datajsonar.strings import FILE_READ_ERROR
+    NodeIndexingProgress, ReadDataJsonTask
+from django_datajsonar.strings import FILE_READ_ERROR, NODE_REGISTER_COUNTS, NODE_SAVED, \
+    NODE_SAVE_ERROR, NODE_SKIPPED
+from django_datajsonar.utils.utils import indexing_queues, load_yaml, pending_or_running_jobs
 from .indexing.catalog_reader import index_catalog
 
 logger = logging.getLogger(__name__)
@@ -22,20 +27,61 @@ def read_datajson(task, whitelist=False, read_local=False):
     """Tarea raíz de indexación. Itera sobre todos los nodos indexables (federados) e
     inicia la tarea de indexación sobre cada uno de ellos
     """
-    nodes = [task.node] if task.node else Node.objects.filter(indexable=True)
+    nodes = [task.node] if task.node else list(Node.objects.filter(indexable=True))
 
-    for node in nodes:
-        index_one_catalog(task, node, read_local, whitelist)
+    # Se crean todos los registros de avance antes de encolar, para que la
+    # tarea no se dé por terminada al finalizar la lectura del primer nodo
+    NodeIndexingProgress.objects.bulk_create(
+        [NodeIndexingProgress(task=task, node=node) for node in nodes])
+    for node, queue in plan_readings(nodes, indexing_queues(), exclude_task=task):
+        index_one_catalog(task, node, read_local, whitelist, queue)
+
+    task.finish_if_complete()
+
+    if not settings.RQ_QUEUES['indexing'].get('ASYNC'):
+        close_read_datajson_task()
+
+
+def resume_read_datajson(task, whitelist=False, read_local=False):
+    """Reanuda una lectura interrumpida (por ejemplo, por la caída de un
+    worker): vuelve a encolar las lecturas de los nodos que no finalizaron.
+    Los datasets que la tarea ya cargó completos no se vuelven a cargar,
+    salvo con la carga en lotes o transaccional.
+    Las lecturas encoladas o corriendo solo se reanudan si no quedan trabajos
+    en las colas de indexación. Devuelve la cantidad de nodos reanudados
+    """
+    unfinished = task.node_progress.exclude(state=NodeIndexingProgress.FINISHED)
+    if pending_or_running_jobs('indexing'):
+        unfinished = unfinished.filter(state=NodeIndexingProgress.FAILED)
+    nodes = [progress.node for progress in unfinished.select_related('node')]
+    if not nodes:
+        return 0
+
+    NodeIndexingProgress.objects.filter(task=task, node__in=nodes).update(
+        state=NodeIndexingProgress.PENDING, enqueued=timezone.now(), started=None, finished=None,
+        pending_jobs=0, failed_jobs=0)
+    ReadDataJsonTask.objects.filter(pk=task.pk).update(status=ReadDataJsonTask.RUNNING, finished=None)
+    task.refresh_from_db(fields=['status', 'finished'])
+    ReadDataJsonTask.info(task, u"Reanudando la lectura de {} nodos".format(len(nodes)))
+    for node, queue in plan_readings(nodes, indexing_queues(), exclude_task=task):
+        index_one_catalog(task, node, read_local, whitelist, queue, resume=True)
 
     if not settings.RQ_QUEUES['indexing'].get('ASYNC'):
         close_read_datajson_task()
+    return len(nodes)
 
 
-def index_one_catalog(task, node, read_local, whitelist):
+def index_one_catalog(task, node, read_local, whitelist, queue='indexing', resume=False):
     try:
-        index_catalog.delay(node, task, read_local, whitelist)
+        if queue == 'indexing':
+            index_catalog.delay(node, task, read_local, whitelist, resume)
+        else:
+            get_queue(queue).enqueue_call(index_catalog, args=(node, task, read_local, whitelist, resume),
+                                          timeout=getattr(settings, 'INDEX_CATALOG_TIMEOUT', 1800))
     except Exception as e:
         logger.error(u"Excepción leyendo nodo %s: %s", node.id, e)
+        NodeIndexingProgress.objects.filter(task=task, node=node)\
+            .update(state=NodeIndexingProgress.FAILED, finished=timezone.now())
 
 
 @job('indexing')
@@ -46,10 +92,9 @@ def bulk_whitelist(indexing_file_id):
     indexing_file_model = DatasetIndexingFile.objects.get(id=indexing_file_id)
     toggler = DatasetIndexableToggler()
     try:
-        logs_list = toggler.process(indexing_file_model.indexing_file)
-        logs = ''
-        for log in logs_list:
-            logs += log + '\n'
+        logs_list = toggler.process(indexing_file_model.indexing_file,
+                                    on_progress=indexing_file_model.update_progress)
+        logs = ''.join(log + '\n' for log in logs_list)
 
         state = DatasetIndexingFile.PROCESSED
     except ValueError:
@@ -58,33 +103,82 @@ def bulk_whitelist(indexing_file_id):
 
     indexing_file_model.state = state
     indexing_file_model.logs = logs
+    indexing_file_model.processed_rows = toggler.counts['rows']
+    indexing_file_model.federated_datasets = toggler.counts['federated']
+    indexing_file_model.failed_rows = toggler.counts['errors']
     indexing_file_model.save()
 
 
 @job('indexing')
 def process_node_register_file(register_file_id):
+    """Registra los nodos federados con formato json del archivo que no
+    existan todavía. Los existentes se resuelven en una consulta y los
+    nuevos se crean con un bulk_create. Los logs se escriben una sola vez,
+    al terminar
+    """
     register_file = NodeRegisterFile.objects.get(id=register_file_id)
 
-    indexing_file = register_file.indexing_file
-    yml = indexing_file.read()
-    nodes = yaml.load(yml)
+    nodes = load_yaml(register_file.indexing_file.read())
+    existing = set(Node.objects.filter(catalog_id__in=list(nodes)).values_list('catalog_id', flat=True))
+    new_nodes = []
+    logs = []
+    counts = Counter()
     for node, values in nodes.items():
         try:
             # evitar entrar al branch con un valor truthy
-            if bool(values['federado']) is True and values['formato'] == 'json':
-                Node.objects.get_or_create(catalog_id=node,
-                                           catalog_url=values['url'],
-                                           indexable=True)
-            register_file.logs = register_file.logs + (
-                " - Guardado Node Indexing File %s" % (node, ))
+            if bool(values['federado']) is True and values['formato'] == 'json' \
+                    and node not in existing:
+                new_nodes.append(Node(catalog_id=node, catalog_url=values['url'], indexable=True,
+                                      release_date=timezone.now().date()))
+                continue
+            counts['skipped'] += 1
+            logs.append(NODE_SKIPPED.format(node))
         except Exception as e:
-            register_file.logs = register_file.logs + (
-                " - Error guardando Node Indexing File %s - %s" % (node, e))
-
+            counts['failed'] += 1
+            logs.append(NODE_SAVE_ERROR.format(node, e))
+
+    errors = create_nodes(new_nodes)
+    for node in new_nodes:
+        if node.catalog_id in errors:
+            counts['failed'] += 1
+            logs.append(NODE_SAVE_ERROR.format(node.catalog_id, errors[node.catalog_id]))
+        else:
+            counts['created'] += 1
+            logs.append(NODE_SAVED.format(node.catalog_id))
+    logs.append(NODE_REGISTER_COUNTS.format(counts['created'], counts['skipped'], counts['failed']))
+
+    register_file.logs = '\n'.join(logs)
+    register_file.created_nodes = counts['created']
+    register_file.skipped_nodes = counts['skipped']
+    register_file.failed_nodes = counts['failed']
     register_file.state = NodeRegisterFile.PROCESSED
     register_file.save()
 
 
+def create_nodes(nodes):
+    """Crea los nodos en un bulk_create. Si falla, los crea de a uno para
+    saber cuáles no se pudieron guardar
+
+    Returns:
+        dict: error de cada catalog_id que no se pudo crear
+    """
+    try:
+        with transaction.atomic():
+            Node.objects.bulk_create(nodes)
+        return {}
+    except DatabaseError:
+        pass
+
+    errors = {}
+    for node in nodes:
+        try:
+            with transaction.atomic():
+                node.save()
+        except DatabaseError as e:
+            errors[node.catalog_id] = e
+    return errors
+
+
 def schedule_new_read_datajson_task(mode=None, node=None):
     try:
         task = ReadDataJsonTask.objects.last()
@@ -0,0 +1,51 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from django_datajsonar.models import Catalog, Dataset, Distribution, Field
+
+
+class IdentifierSearchTests(TestCase):
+
+    def setUp(self):
+        catalog = Catalog.objects.create(identifier='catalog', title='catalog', metadata='{}')
+        self.dataset = Dataset.objects.create(identifier='1', catalog=catalog, metadata='{}')
+        other_dataset = Dataset.objects.create(identifier='11', catalog=catalog, metadata='{}')
+        self.distribution = Distribution.objects.create(identifier='1.1', dataset=self.dataset,
+                                                        download_url='http://test.org', metadata='{}')
+        self.other_distribution = Distribution.objects.create(identifier='11.1', dataset=other_dataset,
+                                                              download_url='http://test.org',
+                                                              metadata='{}')
+        self.field = Field.objects.create(identifier='field', distribution=self.distribution,
+                                          metadata='{}')
+        Field.objects.create(identifier='other_field', distribution=self.other_distribution,
+                             metadata='{}')
+
+        self.client.force_login(User.objects.create(username='test_user', is_staff=True,
+                                                    is_superuser=True))
+
+    def search(self, model_name, search_term):
+        response = self.client.get(reverse('admin:django_datajsonar_{}_changelist'.format(model_name)),
+                                   {'q': search_term})
+        return list(response.context['cl'].result_list)
+
+    def test_dataset_search_is_exact(self):
+        self.assertEqual(self.search('dataset', '1'), [self.dataset])
+
+    def test_distribution_search_by_own_identifier(self):
+        self.assertEqual(self.search('distribution', '11.1'), [self.other_distribution])
+
+    def test_distribution_search_by_dataset_identifier(self):
+        self.assertEqual(self.search('distribution', '1'), [self.distribution])
+
+    def test_field_search_by_dataset_identifier(self):
+        self.assertEqual(self.search('field', '1'), [self.field])
+
+    def test_field_search_by_distribution_identifier(self):
+        self.assertEqual(self.search('field', '1.1'), [self.field])
+
+    def test_no_match(self):
+        self.assertEqual(self.search('catalog', 'catal'), [])
+
+    def test_catalog_search_by_default_lookup(self):
+        self.assertEqual(self.search('catalog', 'catalog'), list(Catalog.objects.all()))
@@ -0,0 +1,34 @@
+#! coding: utf-8
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from django_datajsonar.models import Catalog, Distribution
+
+
+class BenchmarkIndexesTests(TestCase):
+
+    def run_benchmark(self):
+        output = StringIO()
+        call_command('benchmark_indexes', distributions=50, distributions_per_dataset=5,
+                     fields_per_distribution=2, repeat=1, stdout=output)
+        return output.getvalue()
+
+    def test_synthetic_data_is_discarded(self):
+        self.run_benchmark()
+        self.assertFalse(Catalog.objects.exists())
+        self.assertFalse(Distribution.objects.exists())
+
+    def test_every_query_is_reported(self):
+        output = self.run_benchmark()
+        self.assertEqual(output.count('1 consultas'), 7)
+
+    @skipUnless(connection.vendor == 'sqlite', 'Planes de ejecución de SQLite')
+    def test_loader_lookups_use_indexes(self):
+        output = self.run_benchmark()
+        self.assertIn('USING INDEX field_lookup_idx', output)
+        self.assertIn('USING INDEX distribution_present_idx', output)
+        self.assertNotIn('SCAN', output)
@@ -7,10 +7,13 @@ from django.test import TestCase
 
 from django_datajsonar.indexing.catalog_reader import CatalogReader
 from django_datajsonar.indexing.constants import CATALOG_ROOT
-from django_datajsonar.models import ReadDataJsonTask, Node
+from django_datajsonar.indexing.utils import source_hash
+from django_datajsonar.models import Catalog, Dataset, Distribution, NodeIndexingProgress, ReadDataJsonTask, \
+    Node
 from django_datajsonar.models.config import IndexingConfig
-from django_datajsonar.tests.helpers import create_node, open_catalog
+from django_datajsonar.tests.helpers import catalog_path, create_node, open_catalog
 from django_datajsonar.utils.catalog_file_generator import CatalogFileGenerator
+from django_datajsonar.utils.fetched_catalog import FetchedCatalog
 
 
 @mock.patch('django_datajsonar.indexing.catalog_reader.DatabaseLoader')
@@ -38,6 +41,26 @@ class CatalogReaderTests(TestCase):
         CatalogReader().index(node, task)
         self.assertEqual(database_loader.call_args[1]['verify_ssl'], True)
 
+    @mock.patch('django_datajsonar.indexing.catalog_reader.BulkDatabaseLoader')
+    def test_bulk_loader_used_if_enabled_in_config(self, bulk_loader, database_loader):
+        config = IndexingConfig.get_solo()
+        config.bulk_loading = True
+        config.save()
+        node = create_node('sample_data.json')
+        task = ReadDataJsonTask.objects.create()
+        CatalogReader().index(node, task)
+        bulk_loader.assert_called_once()
+        database_loader.assert_not_called()
+
+    def test_transactional_loading_read_from_config(self, database_loader):
+        config = IndexingConfig.get_solo()
+        config.transactional_loading = True
+        config.save()
+        node = create_node('sample_data.json')
+        task = ReadDataJsonTask.objects.create()
+        CatalogReader().index(node, task)
+        self.assertEqual(database_loader.call_args[1]['atomic'], True)
+
     def test_catalog_indexation_creates_catalog_files(self, database_loader):
         node = create_node('sample_data.json')
         task = ReadDataJsonTask.objects.create()
@@ -48,6 +71,20 @@ class CatalogReaderTests(TestCase):
         self.assertTrue(os.path.exists(json_file_path))
         self.assertTrue(os.path.exists(xlsx_file_path))
 
+    def test_catalog_fetched_once_per_indexation(self, database_loader):
+        node = Node.objects.create(catalog_id='test_catalog',
+                                   catalog_format='json',
+                                   catalog_url='https://fakeurl.com/data.json',
+                                   indexable=True)
+        task = ReadDataJsonTask.objects.create()
+        with open_catalog('sample_data.json') as sample:
+            text = sample.read()
+        with requests_mock.Mocker() as m:
+            m.get('https://fakeurl.com/data.json', status_code=200, content=text)
+            CatalogReader().index(node, task)
+        self.assertEqual(1, len(m.request_history))
+        database_loader.return_value.run.assert_called_once()
+
     def test_catalog_url_request_does_not_verify_ssl_by_default(self, _database_loader):
         node = Node.objects.create(catalog_id='test_catalog',
                                    catalog_format='json',
@@ -58,7 +95,7 @@ class CatalogReaderTests(TestCase):
         with requests_mock.Mocker() as m:
             m.get('https://fakeurl.com/data.json', status_code=200, content=text)
             CatalogFileGenerator(node).generate_files()
-            self.assertEqual(2, len(m.request_history))
+            self.assertEqual(1, len(m.request_history))
             for request in m.request_history:
                 self.assertFalse(request.verify)
 
@@ -73,7 +110,7 @@ class CatalogReaderTests(TestCase):
         with requests_mock.Mocker() as m:
             m.get('https://fakeurl.com/data.json', status_code=200, content=text)
             CatalogFileGenerator(node).generate_files()
-            self.assertEqual(2, len(m.request_history))
+            self.assertEqual(1, len(m.request_history))
             for request in m.request_history:
                 self.assertFalse(request.verify)
 
@@ -88,6 +125,160 @@ class CatalogReaderTests(TestCase):
         with requests_mock.Mocker() as m:
             m.get('https://fakeurl.com/data.json', status_code=200, content=text)
             CatalogFileGenerator(node).generate_files()
-            self.assertEqual(2, len(m.request_history))
+            self.assertEqual(1, len(m.request_history))
             for request in m.request_history:
                 self.assertTrue(request.verify)
+
+
+class UnchangedCatalogTests(TestCase):
+
+    def setUp(self):
+        self.node = create_node('sample_data.json')
+        CatalogReader().index(self.node, self.metadata_task())
+
+    @staticmethod
+    def metadata_task():
+        return ReadDataJsonTask.objects.create(indexing_mode=ReadDataJsonTask.METADATA_ONLY)
+
+    def test_source_hash_stored_after_load(self):
+        self.assertTrue(Catalog.objects.get(identifier=self.node.catalog_id).source_hash)
+
+    @mock.patch('django_datajsonar.indexing.catalog_reader.DatabaseLoader')
+    def test_unchanged_catalog_not_loaded_on_metadata_run(self, database_loader):
+        Dataset.objects.update(updated=True)
+        CatalogReader().index(self.node, self.metadata_task())
+
+        database_loader.assert_not_called()
+        self.assertFalse(Dataset.objects.filter(updated=True).exists())
+        self.assertTrue(Dataset.objects.filter(present=True).exists())
+        self.assertFalse(Catalog.objects.get(identifier=self.node.catalog_id).updated)
+
+    @mock.patch('django_datajsonar.indexing.catalog_reader.DatabaseLoader')
+    def test_unchanged_catalog_loaded_on_complete_run(self, database_loader):
+        task = ReadDataJsonTask.objects.create(indexing_mode=ReadDataJsonTask.COMPLETE_RUN)
+        CatalogReader().index(self.node, task)
+        database_loader.assert_called_once()
+
+    @mock.patch('django_datajsonar.indexing.catalog_reader.DatabaseLoader')
+    def test_changed_catalog_loaded_on_metadata_run(self, database_loader):
+        self.node.catalog_url = catalog_path('another_catalog.json')
+        self.node.save()
+        CatalogReader().index(self.node, self.metadata_task())
+        database_loader.assert_called_once()
+
+    @mock.patch('django_datajsonar.indexing.catalog_reader.DatabaseLoader')
+    def test_catalog_loaded_if_load_settings_changed(self, database_loader):
+        with self.settings(DATASET_BLACKLIST=['description']):
+            CatalogReader().index(self.node, self.metadata_task())
+        database_loader.assert_called_once()
+
+    def test_catalog_with_failed_datasets_reloaded_on_metadata_run(self):
+        Catalog.objects.all().delete()
+        with mock.patch('django_datajsonar.indexing.catalog_reader.DatabaseLoader._distribution_model',
+                        side_effect=Exception('error')):
+            CatalogReader().index(self.node, self.metadata_task())
+        self.assertFalse(Catalog.objects.get(identifier=self.node.catalog_id).source_hash)
+        self.assertFalse(Distribution.objects.exists())
+
+        CatalogReader().index(self.node, self.metadata_task())
+        self.assertTrue(Catalog.objects.get(identifier=self.node.catalog_id).source_hash)
+        self.assertTrue(Distribution.objects.exists())
+
+    def test_volatile_keys_ignored_in_source_hash(self):
+        catalog = {'title': 'Catálogo', 'dataset': [{'identifier': '1', 'modified': 'ayer'}]}
+        changed = {'title': 'Catálogo', 'dataset': [{'identifier': '1', 'modified': 'hoy'}]}
+        self.assertNotEqual(source_hash(catalog), source_hash(changed))
+        with self.settings(DATAJSON_AR_VOLATILE_KEYS=['modified']):
+            self.assertEqual(source_hash(catalog), source_hash(changed))
+
+
+class NodeIndexingProgressTests(TestCase):
+
+    def setUp(self):
+        self.node = create_node('sample_data.json')
+        self.task = ReadDataJsonTask.objects.create(indexing_mode=ReadDataJsonTask.METADATA_ONLY)
+
+    def test_progress_stores_loaded_entities(self):
+        CatalogReader().index(self.node, self.task)
+        progress = NodeIndexingProgress.objects.get(task=self.task, node=self.node)
+        self.assertEqual(progress.state, NodeIndexingProgress.FINISHED)
+        self.assertEqual(progress.datasets, Dataset.objects.count())
+        self.assertIsNotNone(progress.finished)
+
+    def test_task_finished_after_last_node(self):
+        other = create_node('sample_data.json', catalog_id='other_catalog')
+        NodeIndexingProgress.objects.create(task=self.task, node=other)
+        CatalogReader().index(self.node, self.task)
+        self.assertEqual(self.task.status, ReadDataJsonTask.RUNNING)
+
+        CatalogReader().index(other, self.task)
+        self.assertEqual(self.task.status, ReadDataJsonTask.FINISHED)
+        self.assertIsNotNone(self.task.finished)
+
+    @mock.patch('django_datajsonar.indexing.catalog_reader.DatabaseLoader')
+    def test_progress_failed_on_loader_error(self, database_loader):
+        database_loader.return_value.run.side_effect = Exception('error')
+        CatalogReader().index(self.node, self.task)
+        progress = NodeIndexingProgress.objects.get(task=self.task, node=self.node)
+        self.assertEqual(progress.state, NodeIndexingProgress.FAILED)
+        self.assertEqual(self.task.status, ReadDataJsonTask.FINISHED)
+
+
+class SplitJobsTests(TestCase):
+
+    def setUp(self):
+        config = IndexingConfig.get_solo()
+        config.split_jobs = True
+        config.save()
+        self.node = create_node('sample_data.json')
+        self.task = ReadDataJsonTask.objects.create(indexing_mode=ReadDataJsonTask.COMPLETE_RUN)
+
+    def index(self, **kwargs):
+        with requests_mock.Mocker() as m:
+            m.get(requests_mock.ANY, **kwargs)
+            CatalogReader(whitelist=True).index(self.node, self.task)
+        # Los jobs posteriores finalizan su propia instancia de la tarea
+        self.task.refresh_from_db()
+        return NodeIndexingProgress.objects.get(task=self.task, node=self.node)
+
+    def test_files_downloaded_in_separate_jobs(self):
+        with mock.patch('django_datajsonar.indexing.split_jobs.download_distributions') as download:
+            self.index(content=b'indice_tiempo,valor')
+        self.assertEqual(download.delay.call_count, 1)
+        self.assertFalse(Distribution.objects.exclude(data_hash='').exists())
+
+    def test_progress_finished_after_followup_jobs(self):
+        progress = self.index(content=b'indice_tiempo,valor')
+        self.assertEqual(progress.state, NodeIndexingProgress.FINISHED)
+        self.assertEqual(progress.pending_jobs, 0)
+        self.assertEqual(progress.bytes_downloaded,
+                         len(b'indice_tiempo,valor') * Distribution.objects.count())
+        self.assertFalse(Distribution.objects.filter(data_hash='').exists())
+        self.assertTrue(Distribution.objects.filter(updated=True).exists())
+        self.assertEqual(self.task.status, ReadDataJsonTask.FINISHED)
+
+    def test_catalog_files_generated_in_separate_job(self):
+        with mock.patch('django_datajsonar.indexing.split_jobs.CatalogFileGenerator') as generator:
+            self.index(content=b'indice_tiempo,valor')
+        generator.return_value.generate_derived_files.assert_called_once()
+        self.assertTrue(Node.objects.get(pk=self.node.pk).json_catalog_file)
+
+    def test_catalog_fetched_once(self):
+        with mock.patch.object(FetchedCatalog, '_fetch', autospec=True,
+                               side_effect=FetchedCatalog._fetch) as fetch:
+            self.index(content=b'indice_tiempo,valor')
+        self.assertEqual(fetch.call_count, 1)
+        self.assertTrue(Node.objects.get(pk=self.node.pk).xlsx_catalog_file)
+
+    def test_failed_download_fails_progress(self):
+        progress = self.index(status_code=500)
+        self.assertEqual(progress.state, NodeIndexingProgress.FAILED)
+        self.assertTrue(Distribution.objects.filter(error=True).exists())
+        self.assertEqual(self.task.status, ReadDataJsonTask.FINISHED)
+
+    def test_reading_stays_running_with_pending_jobs(self):
+        with mock.patch('django_datajsonar.indexing.split_jobs.download_distributions'):
+            progress = self.index(content=b'indice_tiempo,valor')
+        self.assertEqual(progress.state, NodeIndexingProgress.RUNNING)
+        self.assertEqual(progress.pending_jobs, 1)
+        self.assertEqual(self.task.status, ReadDataJsonTask.RUNNING)
@@ -4,7 +4,11 @@ import dateutil.tz
 import pytz
 from freezegun import freeze_time
 
-from django_datajsonar.models.data_json_entity_mixin import DataJsonEntityMixin
+from django.test import SimpleTestCase
+
+from django_datajsonar.models import Dataset, Distribution
+from django_datajsonar.models.data_json_entity_mixin import DataJsonEntityMixin, \
+    metadata_column_values
 from django_datajsonar.strings import DEFAULT_TIME_ZONE
 
 from django_datajsonar.tests.mixin_test_case import ModelMixinTestCase
@@ -71,3 +75,29 @@ class DataJsonEntityTests(ModelMixinTestCase):
         self.assertEqual(self.entity.issued,
                          datetime.datetime(2016, 4, 14, 0, 0, 0,
                                            tzinfo=dateutil.tz.gettz(DEFAULT_TIME_ZONE)))
+
+
+class MetadataColumnsTests(SimpleTestCase):
+
+    def test_nested_keys_are_extracted(self):
+        dataset = Dataset()
+        dataset.update_metadata({'publisher': {'name': 'Ministerio', 'mbox': 'a@b.com'}})
+        self.assertEqual(dataset.publisher_name, 'Ministerio')
+        self.assertEqual(dataset.publisher_mbox, 'a@b.com')
+
+    def test_missing_keys_are_null(self):
+        dataset = Dataset()
+        dataset.update_metadata({'publisher': 'sin nombre'})
+        self.assertIsNone(dataset.publisher_name)
+        self.assertIsNone(dataset.license)
+
+    def test_lists_are_joined(self):
+        dataset = Dataset()
+        dataset.update_metadata({'theme': ['eco', 'agr'], 'superTheme': ['ECON']})
+        self.assertEqual(dataset.theme, 'eco,agr')
+        self.assertEqual(dataset.super_theme, 'ECON')
+
+    def test_values_are_cut_to_column_length(self):
+        values = metadata_column_values(Distribution._meta, Distribution.METADATA_COLUMNS,
+                                        {'format': 'x' * 500})
+        self.assertEqual(len(values['format']), Distribution._meta.get_field('format').max_length)
@@ -11,9 +11,16 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.urlresolvers import reverse
 from django.test.client import Client
 
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
 from ..models import DatasetIndexingFile
 from django_datajsonar.tasks import bulk_whitelist
+from django_datajsonar.actions import DatasetIndexableToggler
 from django_datajsonar.models import Catalog, Dataset
+from django_datajsonar.strings import CATALOG_STATUS, DATASET_STATUS
 
 dir_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'samples')
 
@@ -123,6 +130,54 @@ class BulkIndexingTests(TestCase):
         model_indexables = list(Dataset.objects.filter(indexable=True).values_list("identifier", flat=True))
         self.assertListEqual(sorted(csv_indexables), sorted(model_indexables))
 
+    def test_federation_logs_per_row_status(self):
+        federation_file = io.BytesIO(b'catalog_id,dataset_identifier\n'
+                                     b'test,missing\ntest,1\nnonexistant,1\n')
+        logs = DatasetIndexableToggler().process(federation_file)
+        self.assertEqual(logs, [DATASET_STATUS.format('test', 'missing', 'ERROR'),
+                                DATASET_STATUS.format('test', '1', 'OK'),
+                                CATALOG_STATUS.format('nonexistant', 'ERROR')])
+
+    def test_federation_queries_do_not_grow_with_rows(self):
+        rows = b''.join('test,{}\n'.format(i % self.datasets_per_catalog).encode() for i in range(100))
+        federation_file = io.BytesIO(b'catalog_id,dataset_identifier\n' + rows)
+        # catálogos, datasets existentes y update
+        with self.assertNumQueries(3):
+            DatasetIndexableToggler().process(federation_file)
+        self.assertEqual(Dataset.objects.filter(indexable=True).count(), self.datasets_per_catalog)
+
+    @patch('django_datajsonar.actions.FEDERATION_BATCH_SIZE', 2)
+    def test_federation_file_processed_in_batches(self):
+        rows = b'test,0\ntest,1\ntest,missing\nother,2\nnonexistant,1\n'
+        federation_file = io.BytesIO(b'catalog_id,dataset_identifier\n' + rows)
+        progress = []
+        toggler = DatasetIndexableToggler()
+        toggler.process(federation_file, on_progress=lambda counts: progress.append(dict(counts)))
+        self.assertEqual([counts['rows'] for counts in progress], [2, 4, 5])
+        self.assertEqual(progress[-1], {'rows': 5, 'federated': 3, 'errors': 2})
+
+    @patch('django_datajsonar.actions.FEDERATION_BATCH_SIZE', 2)
+    def test_repeated_datasets_counted_once(self):
+        rows = b'test,0\ntest,1\ntest,0\ntest,1\ntest,0\n'
+        federation_file = io.BytesIO(b'catalog_id,dataset_identifier\n' + rows)
+        toggler = DatasetIndexableToggler()
+        toggler.process(federation_file)
+        self.assertEqual(toggler.counts, {'rows': 5, 'federated': 2})
+
+    def test_indexing_file_counters(self):
+        filepath = os.path.join(dir_path, 'test_missing_catalog.csv')
+        with open(filepath, 'rb') as f:
+            idx_file = DatasetIndexingFile(indexing_file=SimpleUploadedFile(filepath, f.read()),
+                                           uploader=self.user)
+            idx_file.save()
+            bulk_whitelist(idx_file.id)
+
+        idx_file.refresh_from_db()
+        self.assertEqual((idx_file.processed_rows, idx_file.federated_datasets, idx_file.failed_rows),
+                         (3, 1, 2))
+        self.assertEqual(idx_file.logs, CATALOG_STATUS.format('nonexistant', 'ERROR') + '\n' +
+                         DATASET_STATUS.format('test', '1', 'OK') + '\n')
+
     def test_new_datasets_are_not_starred(self):
         dataset = Dataset.objects.get(catalog__identifier=self.test_catalog, identifier='1')
 
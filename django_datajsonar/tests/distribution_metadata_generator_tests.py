@@ -1,14 +1,19 @@
 #! coding: utf-8
+import csv
+import io
 import os
 
 from django.conf import settings
 from django.test import TestCase
+from django.urls import reverse
+from openpyxl import load_workbook
 
 from django_datajsonar.indexing.catalog_reader import index_catalog
 from django_datajsonar.models import ReadDataJsonTask, Node, Distribution
 from django_datajsonar.tests.helpers import create_node
 from django_datajsonar.utils.metadata_generator import \
     get_distributions_metadata
+from django_datajsonar.utils.translations import DISTRIBUTIONS_SPANISH_FIELDS
 
 SAMPLES_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'samples')
 
@@ -145,3 +150,31 @@ class DistributionMetadataGenerator(TestCase):
         first_distribution = result[5]
         second_distribution = result[6]
         self.assertTrue(first_distribution['identifier'] <= second_distribution['identifier'])
+
+    def test_csv_is_streamed(self):
+        response = self.client.get(reverse('django_datajsonar:distribuciones_csv'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('distribuciones.csv', response['Content-Disposition'])
+
+    def test_streamed_csv_matches_metadata(self):
+        response = self.client.get(reverse('django_datajsonar:distribuciones_csv'))
+        content = b''.join(response.streaming_content).decode('utf-8')
+        rows = list(csv.DictReader(io.StringIO(content)))
+        metadata = get_distributions_metadata()
+        self.assertEqual(len(metadata), len(rows))
+        for row, distribution in zip(rows, metadata):
+            self.assertEqual(distribution['identifier'],
+                             row[DISTRIBUTIONS_SPANISH_FIELDS['identifier']])
+            self.assertEqual(distribution['catalog_publisher'] or '',
+                             row[DISTRIBUTIONS_SPANISH_FIELDS['catalog_publisher']])
+
+    def test_xlsx_is_served_from_file(self):
+        response = self.client.get(reverse('django_datajsonar:distribuciones_xlsx'))
+        self.assertTrue(response.streaming)
+        self.assertIn('distribuciones.xlsx', response['Content-Disposition'])
+        content = b''.join(response.streaming_content)
+        worksheet = load_workbook(io.BytesIO(content), read_only=True).active
+        rows = list(worksheet.iter_rows(values_only=True))
+        self.assertEqual(list(rows[0]), list(DISTRIBUTIONS_SPANISH_FIELDS.values()))
+        self.assertEqual(len(rows) - 1, Distribution.objects.count())
@@ -2,6 +2,7 @@
 import os
 import datetime
 import requests_mock
+import yaml
 
 from django.test import TestCase
 from django.contrib.auth.models import User
@@ -14,6 +15,29 @@ except ImportError:
 
 from ..models import Node, NodeRegisterFile
 from ..actions import process_node_register_file_action, confirm_delete
+from ..strings import NODE_REGISTER_COUNTS, NODE_SAVE_ERROR, NODE_SAVED, NODE_SKIPPED
+from ..tasks import process_node_register_file
+
+REGISTER_FILE = b"""
+new:
+  url: "http://new.org/data.json"
+  formato: "json"
+  federado: true
+other:
+  url: "http://other.org/data.json"
+  formato: "json"
+  federado: true
+existing:
+  url: "http://existing.org/data.json"
+  formato: "json"
+  federado: true
+xlsx:
+  url: "http://xlsx.org/catalog.xlsx"
+  formato: "xlsx"
+  federado: true
+broken:
+  url: "http://broken.org/data.json"
+"""
 
 dir_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'samples')
 
@@ -43,6 +67,44 @@ class NodeRegisterFileTests(TestCase):
         non_federated = 'datosgobar'  # Marcado como 'federado: False' en el .yml
         self.assertFalse(Node.objects.filter(catalog_id=non_federated))
 
+    def test_register_file_counts(self):
+        Node.objects.create(catalog_id='existing', catalog_url='http://existing.org/data.json',
+                            indexable=False)
+        nrf = self.read_content(REGISTER_FILE)
+
+        self.assertEqual((nrf.created_nodes, nrf.skipped_nodes, nrf.failed_nodes), (2, 2, 1))
+        self.assertIn(NODE_REGISTER_COUNTS.format(2, 2, 1), nrf.logs)
+        self.assertIn(NODE_SAVE_ERROR.format('broken', "'federado'"), nrf.logs)
+        self.assertIn(NODE_SKIPPED.format('existing'), nrf.logs)
+        self.assertIn(NODE_SKIPPED.format('xlsx'), nrf.logs)
+        self.assertNotIn(NODE_SAVED.format('existing'), nrf.logs)
+        self.assertFalse(Node.objects.get(catalog_id='existing').indexable)
+        new_node = Node.objects.get(catalog_id='new')
+        self.assertTrue(new_node.indexable)
+        self.assertIsNotNone(new_node.release_date)
+
+    def test_register_file_creates_nodes_in_bulk(self):
+        nrf = NodeRegisterFile(indexing_file=SimpleUploadedFile('indice.yml', REGISTER_FILE),
+                               uploader=self.user)
+        nrf.save()
+        # archivo, nodos existentes, bulk_create con su savepoint, y guardado
+        # del archivo en sus dos tablas
+        with self.assertNumQueries(7):
+            process_node_register_file(nrf.id)
+
+    def test_register_file_uses_safe_loader(self):
+        content = b'sspm: !!python/object/apply:os.system ["true"]\n'
+        with self.assertRaises(yaml.YAMLError):
+            self.read_content(content)
+
+    def read_content(self, content):
+        nrf = NodeRegisterFile(indexing_file=SimpleUploadedFile('indice.yml', content),
+                               uploader=self.user)
+        nrf.save()
+        process_node_register_file_action(register_file=nrf)
+        nrf.refresh_from_db()
+        return nrf
+
     def read_file(self, filepath):
         with open(filepath, 'rb') as f:
             nrf = NodeRegisterFile(indexing_file=SimpleUploadedFile(filepath, f.read()),
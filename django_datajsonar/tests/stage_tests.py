@@ -1,5 +1,6 @@
 from django.test import TestCase
-from mock import Mock
+from django.db import transaction
+from mock import Mock, patch
 
 from django_datajsonar.models import Stage, Node
 
@@ -10,6 +11,11 @@ class StageTests(TestCase):
 
     def setUp(self) -> None:
         test_job.reset_mock()
+        # TestCase no confirma su transacción: los jobs se encolan en el acto
+        on_commit = patch('django_datajsonar.models.stage.transaction.on_commit',
+                          side_effect=lambda func: func())
+        on_commit.start()
+        self.addCleanup(on_commit.stop)
 
     def test_start_stage_calls_task(self):
         stage = Stage.objects.create(name='test_stage',
@@ -28,3 +34,18 @@ class StageTests(TestCase):
         stage.open_stage(node)
         test_job.delay.assert_called_once()
         test_job.delay.assert_called_with(node)
+
+
+class StageTransactionTests(TestCase):
+
+    def setUp(self):
+        test_job.reset_mock()
+
+    def test_job_not_enqueued_before_commit(self):
+        stage = Stage.objects.create(name='test_stage',
+                                     queue='default',
+                                     callable_str='django_datajsonar.tests.stage_tests.test_job')
+        with transaction.atomic():
+            stage.open_stage()
+        # La transacción externa de TestCase nunca se confirma
+        test_job.delay.assert_not_called()
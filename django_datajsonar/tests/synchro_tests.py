@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from django.utils import timezone
-from django_rq import job
+from django_rq import get_connection, job
+from rq import Queue
+from rq.registry import StartedJobRegistry
 from freezegun import freeze_time
 
 
@@ -15,7 +17,10 @@ from django.core.management import call_command
 from django.conf import settings
 
 from django_datajsonar.models import Synchronizer, Stage, ReadDataJsonTask
-from django_datajsonar.synchronizer import start_synchros, upkeep, create_or_update_synchro
+from django_datajsonar.synchronizer import start_synchros, upkeep, create_or_update_synchro, \
+    on_job_finished
+from django_datajsonar.utils.utils import QueueStatus
+from django_datajsonar.worker import SynchronizerWorker
 
 
 @job("default")
@@ -26,6 +31,13 @@ def callable_method(*_):
 @freeze_time("2019-01-02 00:01:00")
 class SynchronizationTests(TestCase):
 
+    def setUp(self):
+        # TestCase no confirma su transacción: los jobs se encolan en el acto
+        on_commit = patch('django_datajsonar.models.stage.transaction.on_commit',
+                          side_effect=lambda func: func())
+        on_commit.start()
+        self.addCleanup(on_commit.stop)
+
     @classmethod
     @freeze_time("2019-01-01 00:00:00")
     def setUpTestData(cls):
@@ -140,6 +152,80 @@ class SynchronizationTests(TestCase):
             upkeep()
         self.assertEqual(3, ReadDataJsonTask.objects.filter(status=ReadDataJsonTask.FINISHED).count())
 
+    @patch('django_datajsonar.synchronizer.queue_status')
+    @patch('django_datajsonar.models.stage.pending_or_running_jobs')
+    def test_finished_job_advances_stage_if_queue_is_empty(self, mock_queue, queue_status):
+        mock_queue.return_value = False
+        queue_status.return_value = QueueStatus(0, 0)
+        synchro = Synchronizer.objects.get(name='test_synchro')
+        start_synchros()
+        on_job_finished('indexing')
+        synchro.refresh_from_db()
+        self.assertEqual(synchro.actual_stage, synchro.start_stage.next_stage)
+
+    @patch('django_datajsonar.synchronizer.queue_status')
+    @patch('django_datajsonar.models.stage.pending_or_running_jobs')
+    def test_stage_not_skipped_before_its_job_is_enqueued(self, mock_queue, queue_status):
+        mock_queue.return_value = False
+        queue_status.return_value = QueueStatus(0, 0)
+        synchro = Synchronizer.objects.get(name='test_synchro')
+        start_synchros()
+        second_stage = synchro.start_stage.next_stage
+
+        commit_callbacks = []
+        with patch('django_datajsonar.models.stage.transaction.on_commit',
+                   side_effect=commit_callbacks.append):
+            on_job_finished('indexing')
+            # Otro worker termina antes de que se confirme la apertura de la etapa
+            on_job_finished('indexing')
+        synchro.refresh_from_db()
+        self.assertEqual(synchro.actual_stage, second_stage)
+
+        for callback in commit_callbacks:
+            callback()
+        on_job_finished('indexing')
+        synchro.refresh_from_db()
+        self.assertEqual(synchro.actual_stage, second_stage.next_stage)
+
+    @patch('django_datajsonar.synchronizer.queue_status')
+    @patch('django_datajsonar.models.stage.pending_or_running_jobs')
+    def test_finished_job_does_not_advance_stage_if_queue_has_jobs(self, mock_queue, queue_status):
+        mock_queue.return_value = False
+        queue_status.return_value = QueueStatus(3, 0)
+        synchro = Synchronizer.objects.get(name='test_synchro')
+        start_synchros()
+        on_job_finished('indexing')
+        synchro.refresh_from_db()
+        self.assertEqual(synchro.actual_stage, synchro.start_stage)
+
+    @patch('django_datajsonar.synchronizer.queue_status')
+    @patch('django_datajsonar.models.stage.pending_or_running_jobs')
+    def test_finished_job_in_other_queue_does_not_advance_stage(self, mock_queue, queue_status):
+        mock_queue.return_value = False
+        queue_status.return_value = QueueStatus(0, 0)
+        synchro = Synchronizer.objects.get(name='test_synchro')
+        start_synchros()
+        on_job_finished('default')
+        synchro.refresh_from_db()
+        self.assertEqual(synchro.actual_stage, synchro.start_stage)
+
+    @patch('django_datajsonar.synchronizer.queue_status')
+    @patch('django_datajsonar.models.stage.pending_or_running_jobs')
+    def test_finished_job_in_secondary_indexing_queue_checks_all_of_them(self, mock_queue, queue_status):
+        mock_queue.return_value = False
+        queue_status.side_effect = lambda queue: QueueStatus(0, 1 if queue == 'indexing' else 0)
+        synchro = Synchronizer.objects.get(name='test_synchro')
+        start_synchros()
+        with self.settings(DATAJSON_AR_INDEXING_QUEUES=['indexing', 'indexing_small']):
+            on_job_finished('indexing_small')
+            synchro.refresh_from_db()
+            self.assertEqual(synchro.actual_stage, synchro.start_stage)
+
+            queue_status.side_effect = lambda queue: QueueStatus(0, 0)
+            on_job_finished('indexing_small')
+        synchro.refresh_from_db()
+        self.assertEqual(synchro.actual_stage, synchro.start_stage.next_stage)
+
     @freeze_time("2019-01-01 10:00:00")
     def test_synchro_wont_run_if_started_too_early(self):
         synchro = Synchronizer.objects.get(name='test_synchro')
@@ -281,3 +367,32 @@ class SynchronizerUtilsTests(TestCase):
                                         {'name': 'test_name',
                                          'scheduled_time': timezone.now(),
                                          'frequency': Synchronizer.DAILY})
+
+
+class SynchronizerWorkerTests(TestCase):
+
+    def setUp(self):
+        self.queue = Queue('synchronizer_worker_test', connection=get_connection('default'))
+        self.worker = SynchronizerWorker([self.queue], connection=self.queue.connection)
+
+    def tearDown(self):
+        self.queue.empty()
+
+    @patch('django_datajsonar.worker.on_job_finished')
+    def test_successful_job_notifies_its_queue(self, notify):
+        job = self.queue.enqueue(callable_method)
+        job.started_at = job.ended_at = timezone.now()
+        self.worker.handle_job_success(job, self.queue,
+                                       StartedJobRegistry(self.queue.name, connection=self.queue.connection))
+        notify.assert_called_once_with('synchronizer_worker_test')
+
+    @patch('django_datajsonar.worker.on_job_finished')
+    def test_failed_job_notifies_its_queue(self, notify):
+        job = self.queue.enqueue(callable_method)
+        self.worker.handle_job_failure(job, exc_string='Error')
+        notify.assert_called_once_with('synchronizer_worker_test')
+
+    @patch('django_datajsonar.worker.on_job_finished', side_effect=ValueError)
+    def test_notification_errors_are_not_raised(self, _notify):
+        job = self.queue.enqueue(callable_method)
+        self.worker.handle_job_failure(job, exc_string='Error')
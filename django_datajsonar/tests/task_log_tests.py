@@ -0,0 +1,177 @@
+#! coding: utf-8
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+try:
+    from mock import patch
+except ImportError:
+    from unittest.mock import patch
+
+from django_datajsonar.models import ReadDataJsonTask, TaskLogEntry
+from django_datajsonar.tests.helpers import create_node
+
+
+class TaskLogTests(TestCase):
+
+    def setUp(self):
+        self.task = ReadDataJsonTask.objects.create()
+
+    def test_info_creates_log_entry(self):
+        ReadDataJsonTask.info(self.task, 'mensaje')
+
+        entry = self.task.log_entries.get()
+        self.assertEqual('mensaje', entry.msg)
+        self.assertEqual(TaskLogEntry.INFO, entry.level)
+
+    def test_info_does_not_write_task_row(self):
+        ReadDataJsonTask.info(self.task, 'mensaje')
+
+        self.task.refresh_from_db()
+        self.assertEqual('', self.task.logs)
+
+    def test_error_entry_level(self):
+        ReadDataJsonTask.error(self.task, 'error')
+
+        self.assertEqual(TaskLogEntry.ERROR, self.task.log_entries.get().level)
+
+    def test_get_logs_joins_entries_in_order(self):
+        ReadDataJsonTask.info(self.task, 'uno')
+        ReadDataJsonTask.info(self.task, 'dos')
+
+        self.assertEqual('uno\ndos\n', self.task.get_logs())
+
+    def test_get_logs_keeps_previous_logs_field(self):
+        self.task.logs = 'viejo\n'
+        self.task.save(update_fields=['logs'])
+        ReadDataJsonTask.info(self.task, 'nuevo')
+
+        self.assertEqual('viejo\nnuevo\n', self.task.get_logs())
+
+    def test_logs_written_when_task_finishes(self):
+        ReadDataJsonTask.info(self.task, 'uno')
+        self.task.status = ReadDataJsonTask.FINISHED
+        self.task.save()
+        ReadDataJsonTask.info(self.task, 'dos')
+
+        self.task.refresh_from_db()
+        self.assertEqual('uno\n', self.task.logs)
+        self.assertEqual('uno\ndos\n', self.task.get_logs())
+
+    def test_logs_written_once_when_task_finishes_again(self):
+        ReadDataJsonTask.info(self.task, 'uno')
+        self.task.status = ReadDataJsonTask.FINISHED
+        self.task.save()
+        # La tarea se reanuda y vuelve a finalizar
+        self.task.status = ReadDataJsonTask.RUNNING
+        self.task.save()
+        ReadDataJsonTask.info(self.task, 'dos')
+        self.task.status = ReadDataJsonTask.FINISHED
+        self.task.save()
+
+        self.task.refresh_from_db()
+        self.assertEqual('uno\ndos\n', self.task.logs)
+        self.assertEqual('uno\ndos\n', self.task.get_logs())
+
+    def test_stale_instance_does_not_overwrite_written_logs(self):
+        stale = ReadDataJsonTask.objects.get(pk=self.task.pk)
+        ReadDataJsonTask.info(self.task, 'uno')
+        self.task.status = ReadDataJsonTask.FINISHED
+        self.task.save()
+
+        stale.status = ReadDataJsonTask.FINISHED
+        stale.save()
+        self.assertEqual('uno\n', ReadDataJsonTask.objects.get(pk=self.task.pk).logs)
+
+    def test_finished_task_saved_again_does_not_lock(self):
+        self.task.status = ReadDataJsonTask.FINISHED
+        self.task.save()
+        ReadDataJsonTask.info(self.task, 'mensaje')
+
+        with patch.object(ReadDataJsonTask, 'write_logs') as write_logs:
+            self.task.save()
+        write_logs.assert_not_called()
+
+    def test_logs_written_by_finish_if_complete(self):
+        ReadDataJsonTask.info(self.task, 'mensaje')
+        self.task.finish_if_complete()
+
+        self.assertEqual('mensaje\n', ReadDataJsonTask.objects.get(pk=self.task.pk).logs)
+
+    def test_buffered_entries_inserted_on_exit(self):
+        with ReadDataJsonTask.log_buffer(self.task):
+            ReadDataJsonTask.info(self.task, 'uno')
+            ReadDataJsonTask.info(self.task, 'dos')
+            self.assertFalse(self.task.log_entries.exists())
+
+        self.assertEqual(2, self.task.log_entries.count())
+
+    def test_buffered_entries_inserted_in_bulk(self):
+        ContentType.objects.get_for_model(self.task)  # Cachea el content type
+        with self.assertNumQueries(1):
+            with ReadDataJsonTask.log_buffer(self.task):
+                for i in range(10):
+                    ReadDataJsonTask.info(self.task, str(i))
+
+    def test_buffer_flushed_when_full(self):
+        with self.settings(DATAJSON_AR_TASK_LOG_BUFFER_SIZE=2):
+            with ReadDataJsonTask.log_buffer(self.task):
+                for i in range(3):
+                    ReadDataJsonTask.info(self.task, str(i))
+                self.assertEqual(2, self.task.log_entries.count())
+
+        self.assertEqual(3, self.task.log_entries.count())
+
+    def test_buffer_assigns_node_to_entries(self):
+        node = create_node('sample_data.json')
+        with ReadDataJsonTask.log_buffer(self.task, node=node):
+            ReadDataJsonTask.info(self.task, 'mensaje')
+
+        self.assertEqual(node, self.task.log_entries.get().node)
+
+    def test_buffer_only_applies_to_its_task(self):
+        other_task = ReadDataJsonTask.objects.create()
+        with ReadDataJsonTask.log_buffer(self.task):
+            ReadDataJsonTask.info(other_task, 'mensaje')
+            self.assertEqual(1, other_task.log_entries.count())
+
+
+class TaskLogAdminTests(TestCase):
+
+    def setUp(self):
+        User.objects.create_superuser('admin', 'admin@test.com', 'admin')
+        self.client.login(username='admin', password='admin')
+        self.task = ReadDataJsonTask.objects.create()
+        ReadDataJsonTask.info(self.task, 'mensaje')
+
+    def test_task_change_view_links_to_entries(self):
+        response = self.client.get(reverse('admin:django_datajsonar_readdatajsontask_change',
+                                           args=(self.task.pk,)))
+        self.assertContains(response, '1 entradas')
+
+    def test_logs_field_not_editable(self):
+        ReadDataJsonTask.objects.update(status=ReadDataJsonTask.FINISHED)
+        response = self.client.get(reverse('admin:django_datajsonar_readdatajsontask_add'))
+        self.assertNotIn('logs', response.context['adminform'].form.fields)
+
+    def test_entries_changelist_filtered_by_task(self):
+        ReadDataJsonTask.info(ReadDataJsonTask.objects.create(), 'otra tarea')
+        content_type = ContentType.objects.get_for_model(self.task)
+        response = self.client.get(reverse('admin:django_datajsonar_tasklogentry_changelist'),
+                                   {'content_type': content_type.pk, 'object_id': self.task.pk})
+        self.assertContains(response, 'mensaje')
+        self.assertNotContains(response, 'otra tarea')
+
+    def test_entries_changelist_query_count_independent_of_rows(self):
+        url = reverse('admin:django_datajsonar_tasklogentry_changelist')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as one_entry:
+            self.client.get(url)
+        for i in range(5):
+            ReadDataJsonTask.info(ReadDataJsonTask.objects.create(), str(i))
+        with CaptureQueriesContext(connection) as several_entries:
+            self.client.get(url)
+        self.assertEqual(len(one_entry), len(several_entries))
@@ -1,18 +1,20 @@
 #!coding=utf8
 import os
+from datetime import timedelta
 
 import requests
 from django.contrib.auth.models import User
 from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
 from unittest import skipIf
 
-from mock import patch
+from mock import Mock, patch
 
 from django_datajsonar.models import Field
-from django_datajsonar.tasks import read_datajson, schedule_new_read_datajson_task,\
-    schedule_full_read_task, schedule_metadata_read_task
-from django_datajsonar.models import ReadDataJsonTask, Node
+from django_datajsonar.tasks import read_datajson, resume_read_datajson, \
+    schedule_new_read_datajson_task, schedule_full_read_task, schedule_metadata_read_task
+from django_datajsonar.models import NodeIndexingProgress, ReadDataJsonTask, Node
 
 dir_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'samples')
 
@@ -132,3 +134,122 @@ class SchedulingMethodsTest(TestCase):
         self.assertEqual(1, ReadDataJsonTask.objects.all().count())
         task = ReadDataJsonTask.objects.all().first()
         self.assertEqual(ReadDataJsonTask.METADATA_ONLY, task.indexing_mode)
+
+
+# En modo sincrónico read_datajson cierra la tarea al final, se omite el cierre
+# para ver el estado con las lecturas encoladas
+@patch('django_datajsonar.tasks.close_read_datajson_task', Mock())
+@patch('django_datajsonar.tasks.index_catalog')
+class ReadDataJsonProgressTest(TestCase):
+
+    def setUp(self):
+        self.nodes = [Node.objects.create(catalog_id=catalog_id,
+                                          catalog_url='http://{}.com'.format(catalog_id),
+                                          indexable=True)
+                      for catalog_id in ('one_catalog', 'other_catalog')]
+
+    def test_progress_created_for_every_node(self, _index_catalog):
+        task = ReadDataJsonTask.objects.create()
+        read_datajson(task)
+        self.assertEqual(task.node_progress.filter(state=NodeIndexingProgress.PENDING).count(), 2)
+        self.assertEqual(task.status, ReadDataJsonTask.RUNNING)
+
+    def test_task_without_nodes_is_finished(self, _index_catalog):
+        Node.objects.update(indexable=False)
+        task = ReadDataJsonTask.objects.create()
+        read_datajson(task)
+        self.assertEqual(task.status, ReadDataJsonTask.FINISHED)
+
+    def test_enqueue_error_marks_progress_as_failed(self, index_catalog):
+        index_catalog.delay.side_effect = Exception('redis caído')
+        task = ReadDataJsonTask.objects.create()
+        read_datajson(task)
+        self.assertFalse(task.node_progress.exclude(state=NodeIndexingProgress.FAILED).exists())
+        self.assertEqual(task.status, ReadDataJsonTask.FINISHED)
+
+    def test_expire_stale_fails_pending_progress_without_jobs(self, _index_catalog):
+        task = ReadDataJsonTask.objects.create()
+        read_datajson(task)
+        NodeIndexingProgress.expire_stale(task, pending_jobs=1)
+        self.assertEqual(task.node_progress.filter(state=NodeIndexingProgress.PENDING).count(), 2)
+
+        NodeIndexingProgress.expire_stale(task, pending_jobs=0)
+        self.assertFalse(task.node_progress.exclude(state=NodeIndexingProgress.FAILED).exists())
+
+    def test_expire_stale_keeps_pending_progress_while_jobs_run(self, _index_catalog):
+        task = ReadDataJsonTask.objects.create()
+        read_datajson(task)
+        NodeIndexingProgress.expire_stale(task, pending_jobs=0, running_jobs=1)
+        self.assertEqual(task.node_progress.filter(state=NodeIndexingProgress.PENDING).count(), 2)
+
+    def test_expire_stale_fails_timed_out_readings(self, _index_catalog):
+        task = ReadDataJsonTask.objects.create()
+        read_datajson(task)
+        NodeIndexingProgress.start(task, self.nodes[0])
+        NodeIndexingProgress.objects.filter(node=self.nodes[1])\
+            .update(state=NodeIndexingProgress.RUNNING,
+                    started=timezone.now() - timedelta(hours=1))
+
+        with self.settings(INDEX_CATALOG_TIMEOUT=60):
+            NodeIndexingProgress.expire_stale(task, pending_jobs=0)
+        states = dict(task.node_progress.values_list('node', 'state'))
+        self.assertEqual(states[self.nodes[0].pk], NodeIndexingProgress.RUNNING)
+        self.assertEqual(states[self.nodes[1].pk], NodeIndexingProgress.FAILED)
+
+    def test_expire_stale_keeps_readings_with_recent_jobs(self, _index_catalog):
+        task = ReadDataJsonTask.objects.create()
+        read_datajson(task)
+        NodeIndexingProgress.objects.filter(node=self.nodes[0])\
+            .update(state=NodeIndexingProgress.RUNNING, pending_jobs=1,
+                    started=timezone.now() - timedelta(hours=1), last_activity=timezone.now())
+
+        with self.settings(INDEX_CATALOG_TIMEOUT=60):
+            NodeIndexingProgress.expire_stale(task, pending_jobs=0)
+        progress = task.node_progress.get(node=self.nodes[0])
+        self.assertEqual(progress.state, NodeIndexingProgress.RUNNING)
+
+    @patch('django_datajsonar.tasks.get_queue')
+    def test_readings_spread_across_indexing_queues(self, get_queue, index_catalog):
+        task = ReadDataJsonTask.objects.create()
+        with self.settings(DATAJSON_AR_INDEXING_QUEUES=['indexing', 'indexing_small']):
+            read_datajson(task)
+        self.assertEqual(index_catalog.delay.call_count, 1)
+        get_queue.assert_called_once_with('indexing_small')
+        get_queue.return_value.enqueue_call.assert_called_once()
+
+
+@patch('django_datajsonar.tasks.close_read_datajson_task', Mock())
+@patch('django_datajsonar.tasks.index_catalog')
+class ResumeReadDataJsonTest(TestCase):
+
+    def setUp(self):
+        self.task = ReadDataJsonTask.objects.create()
+        ReadDataJsonTask.objects.update(status=ReadDataJsonTask.FINISHED)
+        self.task.refresh_from_db()
+        self.states = (NodeIndexingProgress.FINISHED, NodeIndexingProgress.FAILED,
+                       NodeIndexingProgress.RUNNING)
+        for catalog_id, state in zip(('finished', 'failed', 'running'), self.states):
+            node = Node.objects.create(catalog_id=catalog_id, catalog_url='http://url.com',
+                                       indexable=True)
+            NodeIndexingProgress.objects.create(task=self.task, node=node, state=state)
+
+    @patch('django_datajsonar.tasks.pending_or_running_jobs', Mock(return_value=False))
+    def test_unfinished_nodes_are_enqueued_again(self, index_catalog):
+        self.assertEqual(resume_read_datajson(self.task), 2)
+        enqueued = {call[0][0].catalog_id for call in index_catalog.delay.call_args_list}
+        self.assertEqual(enqueued, {'failed', 'running'})
+        self.assertTrue(all(call[0][4] for call in index_catalog.delay.call_args_list))
+        self.assertEqual(self.task.status, ReadDataJsonTask.RUNNING)
+        self.assertEqual(self.task.node_progress.filter(state=NodeIndexingProgress.PENDING).count(), 2)
+
+    @patch('django_datajsonar.tasks.pending_or_running_jobs', Mock(return_value=True))
+    def test_only_failed_nodes_resumed_while_jobs_are_running(self, index_catalog):
+        self.assertEqual(resume_read_datajson(self.task), 1)
+        self.assertEqual(index_catalog.delay.call_args[0][0].catalog_id, 'failed')
+
+    @patch('django_datajsonar.tasks.pending_or_running_jobs', Mock(return_value=False))
+    def test_finished_task_is_not_resumed(self, index_catalog):
+        self.task.node_progress.update(state=NodeIndexingProgress.FINISHED)
+        self.assertEqual(resume_read_datajson(self.task), 0)
+        index_catalog.delay.assert_not_called()
+        self.assertEqual(self.task.status, ReadDataJsonTask.FINISHED)
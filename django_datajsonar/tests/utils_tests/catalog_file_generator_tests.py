@@ -1,3 +1,4 @@
+import json
 import os
 from unittest.mock import patch
 
@@ -82,7 +83,7 @@ class CatalogFileGeneratorTests(TestCase):
         json_gen_mock.assert_called_once()
         xlsx_gen_mock.assert_called_once()
 
-    @patch('django_datajsonar.utils.catalog_file_generator.DataJson')
+    @patch('django_datajsonar.utils.fetched_catalog.DataJson')
     def test_creates_datajson_with_arguments_specified_in_node(self, datajson_mock):
         node = Node.objects.create(catalog_id='test_catalog',
                                    catalog_format='json',
@@ -94,5 +95,31 @@ class CatalogFileGeneratorTests(TestCase):
         with requests_mock.Mocker() as m:
             m.get('https://fakeurl.com/without_format', status_code=200, content=text)
             CatalogFileGenerator(node).generate_files()
-        datajson_mock.assert_called_once_with(node.catalog_url, catalog_format='json',
-                                              verify_ssl=True)
+        self.assertTrue(m.request_history[0].verify)
+        datajson_mock.assert_called_once_with(json.loads(text.decode('utf-8')), verify_ssl=True)
+
+    def test_catalog_fetched_once_for_json_node(self):
+        node = Node.objects.create(catalog_id='test_catalog',
+                                   catalog_url='https://fakeurl.com/data.json',
+                                   catalog_format='json',
+                                   indexable=True)
+        with open_catalog('sample_data.json') as sample:
+            text = sample.read()
+        with requests_mock.Mocker() as m:
+            m.get('https://fakeurl.com/data.json', status_code=200, content=text)
+            CatalogFileGenerator(node).generate_files()
+        self.assertEqual(1, m.call_count)
+        self.assertEqual(text, node.json_catalog_file.read())
+
+    def test_catalog_fetched_once_for_xlsx_node(self):
+        node = Node.objects.create(catalog_id='test_catalog',
+                                   catalog_url='https://fakeurl.com/catalog.xlsx',
+                                   catalog_format='xlsx',
+                                   indexable=True)
+        with open_catalog('catalog.xlsx') as sample:
+            content = sample.read()
+        with requests_mock.Mocker() as m:
+            m.get('https://fakeurl.com/catalog.xlsx', status_code=200, content=content)
+            CatalogFileGenerator(node).generate_files()
+        self.assertEqual(1, m.call_count)
+        self.assertEqual(content, node.xlsx_catalog_file.read())
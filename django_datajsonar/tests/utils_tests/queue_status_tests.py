@@ -0,0 +1,117 @@
+#! coding: utf-8
+from django.test import TestCase
+from django_rq import get_connection
+from redis import Redis
+from rq import Queue
+from rq.job import Job
+from rq.registry import StartedJobRegistry
+
+try:
+    from mock import Mock, patch
+except ImportError:
+    from unittest.mock import Mock, patch
+
+from django_datajsonar.indexing.tasks import close_read_datajson_task
+from django_datajsonar.models import Node, NodeIndexingProgress, ReadDataJsonTask
+from django_datajsonar.utils.utils import QueueStatus, pending_or_running_jobs, queue_status
+
+
+def sample_job():
+    pass
+
+
+class QueueStatusTests(TestCase):
+
+    def setUp(self):
+        # Cola asincrónica sobre la misma clave de Redis que la cola 'indexing'
+        self.queue = Queue('indexing', connection=get_connection('indexing'))
+        self.queue.empty()
+        self.registry = StartedJobRegistry(name='indexing', connection=self.queue.connection)
+
+    def tearDown(self):
+        self.queue.empty()
+        for job_id in self.registry.get_job_ids():
+            self.registry.connection.zrem(self.registry.key, job_id)
+
+    def enqueue(self, count):
+        for _ in range(count):
+            self.queue.enqueue(sample_job)
+
+    def test_empty_queue_is_idle(self):
+        self.assertTrue(queue_status('indexing').idle)
+        self.assertFalse(pending_or_running_jobs('indexing'))
+
+    def test_pending_jobs_are_counted(self):
+        self.enqueue(3)
+        self.assertEqual(QueueStatus(3, 0), queue_status('indexing'))
+        self.assertTrue(pending_or_running_jobs('indexing'))
+
+    def test_running_jobs_are_counted(self):
+        job = self.queue.enqueue(sample_job)
+        self.queue.remove(job)
+        self.registry.add(job, ttl=60)
+        self.assertEqual(QueueStatus(0, 1), queue_status('indexing'))
+        self.assertTrue(pending_or_running_jobs('indexing'))
+
+    def test_jobs_are_not_read(self):
+        self.enqueue(5)
+        with patch.object(Job, 'fetch', side_effect=AssertionError), \
+                patch.object(Job, 'restore', side_effect=AssertionError):
+            self.assertEqual(5, queue_status('indexing').pending)
+
+    def test_redis_commands_do_not_grow_with_queue_depth(self):
+        commands = []
+        for depth in (10, 1000):
+            self.queue.empty()
+            self.enqueue(depth)
+            with patch.object(Redis, 'execute_command', autospec=True,
+                              side_effect=Redis.execute_command) as execute_command:
+                self.assertEqual(depth, queue_status('indexing').pending)
+            commands.append(execute_command.call_count)
+
+        self.assertTrue(commands[0])
+        self.assertEqual(commands[0], commands[1])
+
+    @patch('django_datajsonar.indexing.tasks.queue_status')
+    def test_read_task_closed_when_no_jobs_pending(self, mock_status):
+        # La propia función corre en la cola 'indexing'
+        mock_status.return_value = QueueStatus(0, 1)
+        task = ReadDataJsonTask.objects.create()
+        close_read_datajson_task()
+        task.refresh_from_db()
+        self.assertEqual(ReadDataJsonTask.FINISHED, task.status)
+
+    @patch('django_datajsonar.indexing.tasks.queue_status')
+    def test_read_task_not_closed_with_pending_jobs(self, mock_status):
+        mock_status.return_value = QueueStatus(2, 0)
+        task = ReadDataJsonTask.objects.create()
+        close_read_datajson_task()
+        task.refresh_from_db()
+        self.assertNotEqual(ReadDataJsonTask.FINISHED, task.status)
+
+    @patch('django_datajsonar.indexing.tasks.get_current_job', Mock(return_value=None))
+    @patch('django_datajsonar.indexing.tasks.queue_status')
+    def test_pending_reading_kept_while_jobs_run(self, mock_status):
+        # Un worker tomó el job de lectura pero todavía no la empezó
+        mock_status.return_value = QueueStatus(0, 1)
+        progress = self.pending_reading()
+        close_read_datajson_task()
+        progress.refresh_from_db()
+        self.assertEqual(NodeIndexingProgress.PENDING, progress.state)
+        self.assertNotEqual(ReadDataJsonTask.FINISHED, progress.task.status)
+
+    @patch('django_datajsonar.indexing.tasks.get_current_job', Mock(return_value=Mock(origin='indexing')))
+    @patch('django_datajsonar.indexing.tasks.queue_status')
+    def test_own_job_not_counted_as_running(self, mock_status):
+        mock_status.return_value = QueueStatus(0, 1)
+        progress = self.pending_reading()
+        close_read_datajson_task()
+        progress.refresh_from_db()
+        self.assertEqual(NodeIndexingProgress.FAILED, progress.state)
+        progress.task.refresh_from_db()
+        self.assertEqual(ReadDataJsonTask.FINISHED, progress.task.status)
+
+    @staticmethod
+    def pending_reading():
+        node = Node.objects.create(catalog_id='test', catalog_url='http://test.com', indexable=True)
+        return NodeIndexingProgress.objects.create(task=ReadDataJsonTask.objects.create(), node=node)
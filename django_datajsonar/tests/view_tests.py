@@ -1,9 +1,14 @@
+import io
 import json
 
 from django.test import TestCase, Client
 from django.urls import reverse
+from openpyxl import load_workbook
 
+from django_datajsonar.admin.node import NodeAdmin
+from django_datajsonar.models import Jurisdiction, Node, NodeMetadata
 from django_datajsonar.utils.catalog_file_generator import CatalogFileGenerator
+from django_datajsonar.utils.nodes_cache import nodes_cache
 from .helpers import create_node, open_catalog
 
 
@@ -36,3 +41,71 @@ class ViewTests(TestCase):
         with open_catalog('another_catalog.json') as file:
             file_json = json.loads(file.read().decode('utf-8'))
             self.assertEquals(response_json, file_json)
+
+
+class NodesExportCacheTests(TestCase):
+
+    def setUp(self):
+        nodes_cache().clear()
+        self.jurisdiction = Jurisdiction.objects.create(jurisdiction_title='Nacional',
+                                                        jurisdiction_id='nacional')
+        NodeMetadata.objects.create(node=create_node('sample_data.json'), label='Nodo',
+                                    jurisdiction=self.jurisdiction)
+
+    def get_nodes(self, url_name='nodes_json', **headers):
+        return self.client.get(reverse('django_datajsonar:' + url_name), **headers)
+
+    def test_response_has_validators(self):
+        response = self.get_nodes()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'])
+        self.assertTrue(response['Last-Modified'])
+
+    def test_cached_export_served_without_queries(self):
+        first = self.get_nodes()
+        with self.assertNumQueries(0):
+            second = self.get_nodes()
+        self.assertEqual(first.content, second.content)
+
+    def test_conditional_request_returns_not_modified(self):
+        etag = self.get_nodes()['ETag']
+        with self.assertNumQueries(0):
+            response = self.get_nodes(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_export_invalidated_on_metadata_change(self):
+        etag = self.get_nodes()['ETag']
+        self.jurisdiction.jurisdiction_title = 'Provincial'
+        self.jurisdiction.save()
+
+        response = self.get_nodes(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Provincial', response.content.decode('utf-8'))
+
+    def test_export_invalidated_on_node_admin_bulk_update(self):
+        etag = self.get_nodes()['ETag']
+        NodeAdmin(Node, None).make_unindexable(None, Node.objects.all())
+
+        response = self.get_nodes(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_export_kept_on_catalog_reading(self):
+        node = Node.objects.get()
+        self.get_nodes()
+        node.save(update_fields=['catalog'])
+        CatalogFileGenerator(node).generate_files()
+        with self.assertNumQueries(0):
+            self.get_nodes()
+
+    def test_csv_export_keeps_attachment(self):
+        self.get_nodes('nodos_csv')
+        response = self.get_nodes('nodos_csv')
+        self.assertIn('attachment;', response['Content-Disposition'])
+        self.assertEqual(response['Content-Type'], 'text/csv')
+
+    def test_xlsx_export_is_valid_workbook(self):
+        response = self.get_nodes('nodes_xlsx')
+        worksheet = load_workbook(io.BytesIO(response.content), read_only=True).active
+        rows = list(worksheet.iter_rows(values_only=True))
+        self.assertEqual(len(rows), 2)
+        self.assertIn('Nodo', rows[1])
@@ -1,52 +1,50 @@
-import json
 import os
-import requests
 from django.conf import settings
 from django.core.files import File
 from django.core.files.base import ContentFile
 
-from pydatajson import DataJson
 from pydatajson.writers import write_xlsx_catalog, write_json_catalog
 
 from django_datajsonar.models import Node
+from django_datajsonar.utils.fetched_catalog import FetchedCatalog
 
 
 class CatalogFileGenerator:
-    def __init__(self, node):
+    def __init__(self, node, fetched_catalog=None):
         self.node = node
         self.verify_ssl = node.verify_ssl
+        self.fetched_catalog = fetched_catalog or FetchedCatalog.from_node(node)
         self.xlsx_catalog_dir = os.path.join(settings.MEDIA_ROOT, 'catalog', self.node.catalog_id, 'catalog.xlsx')
         self.json_catalog_dir = os.path.join(settings.MEDIA_ROOT, 'catalog', self.node.catalog_id, 'data.json')
 
     def generate_files(self):
-        catalog_format = self.node.catalog_format
-        catalog_url = self.node.catalog_url
-
-        catalog = DataJson(catalog_url, catalog_format=catalog_format,
-                           verify_ssl=self.verify_ssl)
+        self.save_fetched_files()
+        self.generate_derived_files()
 
+    def save_fetched_files(self):
+        """Guarda las copias que no requieren convertir el catálogo a xlsx:
+        el contenido descargado y, si el nodo no publica un data.json, el
+        generado a partir del catálogo leído
+        """
+        catalog_format = self.node.catalog_format
         if catalog_format == Node.JSON:
-            self._save_json_file_from_url(catalog_url)
-            self._generate_xlsx_file_into_model(catalog)
+            self._save_json_file_from_content(self.fetched_catalog.content)
         elif catalog_format == Node.XLSX:
-            self._save_xlsx_file_from_url(catalog_url)
-            self._generate_json_file_into_model(catalog)
+            self._save_xlsx_file_from_content(self.fetched_catalog.content)
+            self._generate_json_file_into_model(self.fetched_catalog.data_json())
         else:
-            self._generate_json_file_into_model(catalog)
-            self._generate_xlsx_file_into_model(catalog)
+            self._generate_json_file_into_model(self.fetched_catalog.data_json())
 
-    def _save_json_file_from_url(self, url):
-        file_content = self._get_catalog_content_from_url(url).decode('utf-8')
-        self.node.json_catalog_file.save('data.json', ContentFile(file_content))
+    def generate_derived_files(self):
+        """Genera el catalog.xlsx, si el nodo no lo publica"""
+        if self.node.catalog_format != Node.XLSX:
+            self._generate_xlsx_file_into_model(self.fetched_catalog.data_json())
 
-    def _save_xlsx_file_from_url(self, url):
-        file_content = self._get_catalog_content_from_url(url)
-        self.node.xlsx_catalog_file.save('catalog.xlsx', ContentFile(file_content))
+    def _save_json_file_from_content(self, content):
+        self._save_file(self.node.json_catalog_file, 'data.json', ContentFile(content.decode('utf-8')))
 
-    def _get_catalog_content_from_url(self, url):
-        response = requests.get(url, verify=self.verify_ssl)
-        response.raise_for_status()
-        return response.content
+    def _save_xlsx_file_from_content(self, content):
+        self._save_file(self.node.xlsx_catalog_file, 'catalog.xlsx', ContentFile(content))
 
     def _generate_json_file_into_model(self, catalog):
         write_json_catalog(catalog, self.json_catalog_dir)
@@ -60,4 +58,9 @@ class CatalogFileGenerator:
         file_field = self.node.json_catalog_file if new_file_name == 'data.json' \
             else self.node.xlsx_catalog_file
         with open(file_dir, 'rb') as file:
-            file_field.save(new_file_name, File(file))
+            self._save_file(file_field, new_file_name, File(file))
+
+    def _save_file(self, file_field, name, content):
+        # Guarda solo el campo del archivo, sin invalidar las exportaciones de nodos
+        file_field.save(name, content, save=False)
+        self.node.save(update_fields=[file_field.field.name])
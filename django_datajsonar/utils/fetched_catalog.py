@@ -0,0 +1,101 @@
+#! coding: utf-8
+import copy
+import json
+from tempfile import NamedTemporaryFile
+from urllib.parse import urlparse
+
+import requests
+from pydatajson import DataJson
+from pydatajson.custom_exceptions import NonParseableCatalog
+from pydatajson.readers import read_catalog
+
+from django_datajsonar.indexing.constants import REQUEST_TIMEOUT
+from django_datajsonar.models import Node
+
+
+class FetchedCatalog:
+    """Catálogo de un nodo descargado y parseado una única vez por corrida.
+    Guarda el contenido crudo y el diccionario parseado, para compartirlos
+    entre el CatalogReader, el DatabaseLoader y el CatalogFileGenerator
+    """
+
+    def __init__(self, catalog_url, catalog_format=None, verify_ssl=False, content=None):
+        self.catalog_url = catalog_url
+        self.catalog_format = catalog_format
+        self.verify_ssl = verify_ssl
+        self._content = content
+        self._catalog_dict = None
+
+    @classmethod
+    def from_node(cls, node, verify_ssl=None):
+        if verify_ssl is None:
+            verify_ssl = node.verify_ssl
+        return cls(node.catalog_url, node.catalog_format, verify_ssl)
+
+    @classmethod
+    def from_file(cls, catalog_file, catalog_format):
+        """Catálogo ya guardado en un archivo del storage (por ejemplo, el
+        data.json de un nodo), leído sin volver a descargarlo
+        """
+        catalog_file.open('rb')
+        try:
+            content = catalog_file.read()
+        finally:
+            catalog_file.close()
+        return cls(catalog_file.name, catalog_format, content=content)
+
+    @property
+    def content(self):
+        """Contenido crudo del catálogo, en bytes"""
+        if self._content is None:
+            try:
+                self._content = self._fetch()
+            except IOError as e:
+                raise NonParseableCatalog(self.catalog_url, str(e))
+        return self._content
+
+    @property
+    def catalog_dict(self):
+        """Representación interna del catálogo, tal como la lee pydatajson"""
+        if self._catalog_dict is None:
+            self._catalog_dict = self._parse()
+        return self._catalog_dict
+
+    def data_json(self):
+        """Devuelve un DataJson nuevo sobre una copia del catálogo parseado,
+        de manera que las modificaciones de un consumidor (por ejemplo,
+        generate_distribution_ids) no afecten a los demás
+        """
+        return DataJson(copy.deepcopy(self.catalog_dict), verify_ssl=self.verify_ssl)
+
+    def _fetch(self):
+        if urlparse(self.catalog_url).scheme in ('http', 'https'):
+            response = requests.get(self.catalog_url, verify=self.verify_ssl,
+                                    timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            return response.content
+
+        with open(self.catalog_url, 'rb') as catalog_file:
+            return catalog_file.read()
+
+    def _parse(self):
+        catalog_format = self._resolve_format()
+        if catalog_format == Node.JSON:
+            try:
+                return json.loads(self.content.decode('utf-8'))
+            except ValueError as e:
+                raise NonParseableCatalog(self.catalog_url, str(e))
+
+        if catalog_format == Node.XLSX:
+            with NamedTemporaryFile(suffix='.xlsx') as xlsx_file:
+                xlsx_file.write(self.content)
+                xlsx_file.flush()
+                return read_catalog(xlsx_file.name, catalog_format=Node.XLSX)
+
+        return read_catalog(self.catalog_url, verify=self.verify_ssl)
+
+    def _resolve_format(self):
+        suffix = self.catalog_url.split(".")[-1].strip("/")
+        if suffix in (Node.JSON, Node.XLSX):
+            return self.catalog_format or suffix
+        return self.catalog_format
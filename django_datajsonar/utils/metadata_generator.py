@@ -1,7 +1,7 @@
 #!coding=utf8
 from __future__ import unicode_literals
 
-import json
+from collections import defaultdict
 
 from django.forms.models import model_to_dict
 from django.db.models import Max
@@ -47,15 +47,12 @@ def last_modified_date():
 
 
 def get_jurisdiction_list_metadata():
-    jurisdictions = []
-    jurisdictions_models = Jurisdiction.objects.all()
-    for jurisdiction_model in jurisdictions_models:
-        jurisdictions.append(jurisdiction_metadata(jurisdiction_model))
-    return jurisdictions
-
-
-def jurisdiction_metadata(jurisdiction):
-    nodes_metadata = list(jurisdiction.nodemetadata_set.values(
+    """Metadatos de las jurisdicciones y sus catálogos, con una consulta
+    para las jurisdicciones y otra para los metadatos de todos los nodos
+    """
+    catalogs = defaultdict(list)
+    nodes_metadata = NodeMetadata.objects.filter(jurisdiction__isnull=False).order_by('node').values(
+        'jurisdiction',
         'node__catalog_id',
         'label',
         'category',
@@ -65,64 +62,71 @@ def jurisdiction_metadata(jurisdiction):
         'url_xlsx',
         'url_datosgobar',
         'url_homepage'
-    ))
+    )
     for metadata in nodes_metadata:
         # Traducción de campos
         metadata['id'] = metadata.pop('node__catalog_id')
         metadata['published'] = metadata.pop('node__indexable')
+        catalogs[metadata.pop('jurisdiction')].append(metadata)
+
+    return [jurisdiction_metadata(jurisdiction, catalogs[jurisdiction.pk])
+            for jurisdiction in Jurisdiction.objects.all()]
+
 
+def jurisdiction_metadata(jurisdiction, catalogs):
     result = {
         "argentinagobar_id": jurisdiction.argentinagobar_id,
         "title": jurisdiction.jurisdiction_title,
-        'catalogs': nodes_metadata,
+        'catalogs': catalogs,
     }
     return result
 
 
 def get_distributions_metadata():
-    metadata_list = list(Distribution.objects.all().select_related('dataset__catalog').order_by(
+    return list(iter_distributions_metadata())
+
+
+def iter_distributions_metadata():
+    """Genera los metadatos de cada distribución a medida que se consumen,
+    leyendo las filas de la base con un cursor (iterator), sin cargarlas
+    todas en memoria. Los metadatos salen de sus columnas, sin parsear el
+    JSON de cada entidad
+    """
+    distributions = Distribution.objects.order_by(
         'dataset__catalog__identifier', 'dataset__identifier', 'identifier').values(
         'identifier',
         'title',
         'download_url',
-        'metadata',
+        'description',
+        'access_url',
+        'type',
+        'format',
         'dataset__identifier',
         'dataset__title',
-        'dataset__metadata',
+        'dataset__description',
+        'dataset__publisher_name',
+        'dataset__publisher_mbox',
+        'dataset__source',
+        'dataset__theme',
+        'dataset__super_theme',
+        'dataset__license',
         'dataset__catalog__title',
         'dataset__catalog__identifier',
-        'dataset__catalog__metadata'
-    ))
-
-    for distribution in metadata_list:
-        distribution_metadata = json.loads(distribution.pop('metadata')) \
-            if distribution.get('metadata') else {}
-        distribution['description'] = distribution_metadata.get('description')
-        distribution['accessURL'] = distribution_metadata.get('accessURL')
-        distribution['type'] = distribution_metadata.get('type')
-        distribution['format'] = distribution_metadata.get('format')
-
-        dataset_metadata = json.loads(distribution.pop('dataset__metadata')) \
-            if distribution.get('dataset__metadata') else {}
-        distribution['dataset_description'] = \
-            dataset_metadata.get('description')
-        distribution['dataset_publisher'] = \
-            dataset_metadata.get('publisher', {}).get('name')
-        distribution['dataset_publisher_mail'] = \
-            dataset_metadata.get('publisher', {}).get('mbox')
-        distribution['dataset_source'] = \
-            dataset_metadata.get('source')
-        distribution['dataset_theme'] = \
-            ','.join(dataset_metadata.get('theme', []))
-        distribution['dataset_superTheme'] = \
-            ','.join(dataset_metadata.get('superTheme', []))
-        distribution['dataset_license'] = \
-            dataset_metadata.get('license')
-
-        catalog_metadata = \
-            json.loads(distribution.pop('dataset__catalog__metadata')) \
-            if distribution.get('dataset__catalog__metadata') else {}
-        distribution['catalog_publisher'] = \
-            catalog_metadata.get('publisher', {}).get('name')
-
-    return metadata_list
+        'dataset__catalog__publisher_name'
+    )
+    for distribution in distributions.iterator():
+        yield distribution_metadata(distribution)
+
+
+def distribution_metadata(distribution):
+    distribution['accessURL'] = distribution.pop('access_url')
+    distribution['catalog_publisher'] = distribution.pop('dataset__catalog__publisher_name')
+    distribution['dataset_description'] = distribution.pop('dataset__description')
+    distribution['dataset_publisher'] = distribution.pop('dataset__publisher_name')
+    distribution['dataset_publisher_mail'] = distribution.pop('dataset__publisher_mbox')
+    distribution['dataset_source'] = distribution.pop('dataset__source')
+    distribution['dataset_theme'] = distribution.pop('dataset__theme') or ''
+    distribution['dataset_superTheme'] = distribution.pop('dataset__super_theme') or ''
+    distribution['dataset_license'] = distribution.pop('dataset__license')
+
+    return distribution
@@ -14,16 +14,39 @@ class CSVMetadataWriter:
             self.writer.writerow(catalog)
 
 
+class _Echo:
+    """Pseudo archivo que devuelve lo escrito en lugar de guardarlo"""
+
+    def write(self, value):
+        return value
+
+
+class CSVMetadataStreamer:
+    """Genera las líneas del CSV a medida que se consumen, para usar con
+    un StreamingHttpResponse
+    """
+    def __init__(self, headers):
+        self.headers = list(headers)
+        self.writer = csv.DictWriter(_Echo(), self.headers, extrasaction='ignore')
+
+    def stream_metadata(self, metadata_iter):
+        yield self.writer.writerow(dict(zip(self.headers, self.headers)))
+        for catalog in metadata_iter:
+            yield self.writer.writerow(catalog)
+
+
 class XLSXMetadataWriter:
+    """Escribe las filas en orden con constant_memory: XlsxWriter baja cada
+    fila a disco al pasar a la siguiente, por lo que la memoria usada no
+    depende de la cantidad de filas
+    """
     def __init__(self, output, headers):
         self.headers = headers
-        self.workbook = Workbook(output, {'in_memory': True})
+        self.workbook = Workbook(output, {'constant_memory': True})
 
     def write_metadata(self, metadata_list):
         worksheet = self.workbook.add_worksheet()
-        for column, header in enumerate(self.headers):
-            worksheet.write(0, column, header)
+        worksheet.write_row(0, 0, list(self.headers))
         for row, catalog in enumerate(metadata_list):
-            for column, field in enumerate(catalog.values()):
-                worksheet.write(row + 1, column, field)
+            worksheet.write_row(row + 1, 0, list(catalog.values()))
         self.workbook.close()
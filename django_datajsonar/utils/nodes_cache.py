@@ -0,0 +1,73 @@
+#!coding=utf8
+from __future__ import unicode_literals
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+CACHE_PREFIX = 'django_datajsonar:nodes:'
+
+# Exportaciones cacheadas, invalidadas juntas ante cambios en los metadatos de nodos
+NODES_EXPORTS = ('nodes.json', 'nodes.csv', 'nodos.csv', 'nodes.xlsx', 'nodos.xlsx')
+
+# Campos que se guardan en cada lectura y no forman parte de las exportaciones
+UNEXPORTED_FIELDS = frozenset(('catalog', 'json_catalog_file', 'xlsx_catalog_file'))
+
+
+def nodes_cache():
+    return caches[getattr(settings, 'DATAJSON_AR_NODES_CACHE', 'default')]
+
+
+def get_nodes_export(name, build):
+    """Devuelve la exportación 'name' cacheada, generándola con 'build' si
+    no está en el cache. 'build' devuelve el HttpResponse completo
+
+    Returns:
+        dict: contenido, tipo, Content-Disposition, ETag y fecha de generación
+    """
+    cache = nodes_cache()
+    entry = cache.get(CACHE_PREFIX + name)
+    if entry is None:
+        response = build()
+        content = response.content
+        entry = {
+            'content': content,
+            'content_type': response['Content-Type'],
+            'disposition': response.get('Content-Disposition'),
+            'etag': hashlib.sha1(content).hexdigest(),
+            'last_modified': int(timezone.now().timestamp()),
+        }
+        cache.set(CACHE_PREFIX + name, entry,
+                  getattr(settings, 'DATAJSON_AR_NODES_CACHE_TIMEOUT', 300))
+    return entry
+
+
+def cached_nodes_response(request, name, build):
+    """Respuesta de la exportación 'name' desde el cache, o 304 si el pedido
+    condicional coincide con su ETag o Last-Modified
+    """
+    entry = get_nodes_export(name, build)
+    response = get_conditional_response(request, etag=quote_etag(entry['etag']),
+                                        last_modified=entry['last_modified'])
+    if response is None:
+        response = HttpResponse(entry['content'], content_type=entry['content_type'])
+        if entry['disposition']:
+            response['Content-Disposition'] = entry['disposition']
+    response['ETag'] = quote_etag(entry['etag'])
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    return response
+
+
+def invalidate_nodes_exports(update_fields=None, **_):
+    """Receiver de los cambios en los modelos de los metadatos de nodos.
+    También se llama tras los update() en bloque, que no emiten señales.
+    Ignora los guardados que solo tocan campos no exportados
+    """
+    if update_fields and UNEXPORTED_FIELDS.issuperset(update_fields):
+        return
+    nodes_cache().delete_many([CACHE_PREFIX + name for name in NODES_EXPORTS])
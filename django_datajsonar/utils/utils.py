@@ -1,15 +1,22 @@
 #!coding=utf8
 from __future__ import unicode_literals
 
+from collections import namedtuple
 from importlib import import_module
+from tempfile import SpooledTemporaryFile
 import csv
 
-from django.http import HttpResponse
+import yaml
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
 from django.utils.timezone import localtime
 
 from rq.registry import StartedJobRegistry
 from django_rq import get_queue, get_connection
 
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
 
 def download_config_csv(datasets):
     filename = 'config_%s.csv' % localtime().date()
@@ -24,9 +31,24 @@ def generate_csv_download_response(filename):
 
 
 def generate_xlsx_download_response(filename):
-    response = HttpResponse(content_type='application/'
-                                         'vnd.openxmlformats-officedocument.'
-                                         'spreadsheetml.sheet')
+    response = HttpResponse(content_type=XLSX_CONTENT_TYPE)
+    response['Content-Disposition'] = 'attachment; filename="%s"' % filename
+    return response
+
+
+def xlsx_temporary_file():
+    """Archivo temporal para escribir un XLSX: queda en memoria hasta
+    DATAJSON_AR_XLSX_SPOOL_SIZE bytes, y a partir de ahí pasa a disco
+    """
+    return SpooledTemporaryFile(max_size=getattr(settings, 'DATAJSON_AR_XLSX_SPOOL_SIZE', 10 * 1024 * 1024))
+
+
+def generate_xlsx_file_response(xlsx_file, filename):
+    """Respuesta que envía de a bloques el XLSX ya escrito en xlsx_file, y
+    lo cierra al terminar
+    """
+    xlsx_file.seek(0)
+    response = FileResponse(xlsx_file, content_type=XLSX_CONTENT_TYPE)
     response['Content-Disposition'] = 'attachment; filename="%s"' % filename
     return response
 
@@ -39,16 +61,56 @@ def generate_csv(datasets, output):
     return output
 
 
-def pending_or_running_jobs(queue):
+class QueueStatus(namedtuple('QueueStatus', ['pending', 'running'])):
+    """Cantidad de trabajos encolados y corriendo en una cola"""
+
+    @property
+    def idle(self):
+        return not (self.pending or self.running)
+
+
+def queue_status(queue):
     """
-    Chequea si hay trabajos encolados o corriendo, en la cola
-    pasada por parámetro
+    Devuelve el QueueStatus de la cola pasada por parámetro. Usa el largo
+    de la lista de la cola y del StartedJobRegistry, sin leer los trabajos,
+    por lo que su costo no depende de la cantidad de trabajos encolados
     """
     rq_queue = get_queue(queue)
-    pending = bool(rq_queue.jobs)
     registry = StartedJobRegistry(name=queue, connection=get_connection(queue))
-    running = bool(len(registry))
-    return pending or running
+    return QueueStatus(rq_queue.count, registry.count)
+
+
+def indexing_queues():
+    """Colas entre las que se reparten las lecturas de catálogos"""
+    return list(getattr(settings, 'DATAJSON_AR_INDEXING_QUEUES', ['indexing']))
+
+
+def indexing_stage_queues():
+    """Colas de todos los jobs de una lectura: las de lectura de catálogos,
+    la de descargas de distribuciones y la de archivos de catálogos
+    """
+    queues = indexing_queues()
+    for queue in (getattr(settings, 'DATAJSON_AR_DOWNLOAD_QUEUE', 'indexing'),
+                  getattr(settings, 'DATAJSON_AR_CATALOG_FILES_QUEUE', 'indexing')):
+        if queue not in queues:
+            queues.append(queue)
+    return queues
+
+
+def queue_group(queue):
+    """Colas cuyos trabajos forman parte de la misma etapa que la cola
+    pasada por parámetro: todas las de indexación, o solo esa cola
+    """
+    queues = indexing_stage_queues()
+    return queues if queue in queues else [queue]
+
+
+def pending_or_running_jobs(queue):
+    """
+    Chequea si hay trabajos encolados o corriendo, en la cola
+    pasada por parámetro o en las que comparten su etapa
+    """
+    return not all(queue_status(name).idle for name in queue_group(queue))
 
 
 def run_callable(callable_str):
@@ -88,3 +150,10 @@ def generate_stages(forms, name_prefix):
 
 def get_qualified_name(target_class):
     return target_class.__module__ + '.' + target_class.__name__
+
+
+def load_yaml(content):
+    """Lee un YAML con el loader seguro, usando la versión en C de libyaml
+    si está disponible
+    """
+    return yaml.load(content, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
@@ -1,20 +1,22 @@
 #!coding=utf8
 import os
 
-from django.http import JsonResponse, HttpResponseBadRequest, FileResponse
+from django.http import JsonResponse, HttpResponseBadRequest, FileResponse, StreamingHttpResponse
 
 from django.conf import settings
 
 from django_datajsonar.models import Node
 from django_datajsonar.models.data_json import Dataset
 from django_datajsonar.utils.download_response_writer import \
-    write_node_metadata, write_distributions_metadata
+    write_node_metadata, write_distributions_metadata, stream_distributions_metadata
 from django_datajsonar.utils.metadata_generator import get_project_metadata, \
     get_jurisdiction_list_metadata
-from django_datajsonar.utils.metadata_writer import CSVMetadataWriter, \
+from django_datajsonar.utils.nodes_cache import cached_nodes_response
+from django_datajsonar.utils.metadata_writer import CSVMetadataStreamer, CSVMetadataWriter, \
     XLSXMetadataWriter
 from django_datajsonar.utils.utils import download_config_csv, \
-    generate_csv_download_response, generate_xlsx_download_response
+    generate_csv_download_response, generate_xlsx_download_response, generate_xlsx_file_response, \
+    xlsx_temporary_file
 from django_datajsonar.utils.translations import NODES_ENGLISH_FIELDS, NODES_SPANISH_FIELDS, \
     DISTRIBUTIONS_SPANISH_FIELDS
 
@@ -24,46 +26,48 @@ def config_csv(_):
     return download_config_csv(datasets)
 
 
-def nodes_metadata_json(_):
+def nodes_metadata_json(request):
+    return cached_nodes_response(request, 'nodes.json', build_nodes_metadata_json)
+
+
+def build_nodes_metadata_json():
     response = {'meta': get_project_metadata(),
                 'jurisdictions': get_jurisdiction_list_metadata()}
     return JsonResponse(response)
 
 
-def nodes_english_metadata_csv(_):
-    response = generate_csv_download_response('nodes.csv')
-    return write_node_metadata(response, NODES_ENGLISH_FIELDS,
-                               CSVMetadataWriter)
+def nodes_english_metadata_csv(request):
+    return cached_nodes_response(request, 'nodes.csv', lambda: write_node_metadata(
+        generate_csv_download_response('nodes.csv'), NODES_ENGLISH_FIELDS, CSVMetadataWriter))
 
 
-def nodes_spanish_metadata_csv(_):
-    response = generate_csv_download_response('nodos.csv')
-    return write_node_metadata(response, NODES_SPANISH_FIELDS,
-                               CSVMetadataWriter)
+def nodes_spanish_metadata_csv(request):
+    return cached_nodes_response(request, 'nodos.csv', lambda: write_node_metadata(
+        generate_csv_download_response('nodos.csv'), NODES_SPANISH_FIELDS, CSVMetadataWriter))
 
 
-def nodes_english_metadata_xlsx(_):
-    response = generate_xlsx_download_response('nodes.xlsx')
-    return write_node_metadata(response, NODES_ENGLISH_FIELDS,
-                               XLSXMetadataWriter)
+def nodes_english_metadata_xlsx(request):
+    return cached_nodes_response(request, 'nodes.xlsx', lambda: write_node_metadata(
+        generate_xlsx_download_response('nodes.xlsx'), NODES_ENGLISH_FIELDS, XLSXMetadataWriter))
 
 
-def nodes_spanish_metadata_xlsx(_):
-    response = generate_xlsx_download_response('nodos.xlsx')
-    return write_node_metadata(response, NODES_SPANISH_FIELDS,
-                               XLSXMetadataWriter)
+def nodes_spanish_metadata_xlsx(request):
+    return cached_nodes_response(request, 'nodos.xlsx', lambda: write_node_metadata(
+        generate_xlsx_download_response('nodos.xlsx'), NODES_SPANISH_FIELDS, XLSXMetadataWriter))
 
 
 def distributions_spanish_metadata_csv(_):
-    response = generate_csv_download_response('distribuciones.csv')
-    return write_distributions_metadata(response, DISTRIBUTIONS_SPANISH_FIELDS,
-                                        CSVMetadataWriter)
+    response = StreamingHttpResponse(
+        stream_distributions_metadata(DISTRIBUTIONS_SPANISH_FIELDS, CSVMetadataStreamer),
+        content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="distribuciones.csv"'
+    return response
 
 
 def distributions_spanish_metadata_xlsx(_):
-    response = generate_xlsx_download_response('distribuciones.xlsx')
-    return write_distributions_metadata(response, DISTRIBUTIONS_SPANISH_FIELDS,
-                                        XLSXMetadataWriter)
+    xlsx_file = write_distributions_metadata(xlsx_temporary_file(), DISTRIBUTIONS_SPANISH_FIELDS,
+                                             XLSXMetadataWriter)
+    return generate_xlsx_file_response(xlsx_file, 'distribuciones.xlsx')
 
 
 def json_catalog(_request, catalog_id):
@@ -0,0 +1,31 @@
+#! coding: utf-8
+import logging
+
+from rq import Worker
+
+from django_datajsonar.synchronizer import on_job_finished
+
+logger = logging.getLogger(__name__)
+
+
+class SynchronizerWorker(Worker):
+    """Worker de rq que, al terminar cada trabajo, avanza los synchronizers
+    cuya etapa corre en la cola del trabajo, sin esperar al upkeep periódico.
+    Se habilita con RQ = {'WORKER_CLASS': 'django_datajsonar.worker.SynchronizerWorker'}
+    """
+
+    def handle_job_success(self, job, queue, started_job_registry):
+        super(SynchronizerWorker, self).handle_job_success(job, queue, started_job_registry)
+        self.notify_job_finished(job)
+
+    def handle_job_failure(self, job, started_job_registry=None, exc_string=''):
+        super(SynchronizerWorker, self).handle_job_failure(job, started_job_registry, exc_string)
+        self.notify_job_finished(job)
+
+    @staticmethod
+    def notify_job_finished(job):
+        # Una falla al avanzar las etapas no debe marcar al trabajo como fallido
+        try:
+            on_job_finished(job.origin)
+        except Exception as e:
+            logger.error(u"Error avanzando synchronizers de la cola %s: %s", job.origin, e)